@@ -7,8 +7,14 @@ Created on Sun Nov  9 11:57:12 2025
 """
 
 from banking_system import BankingSystem
+from account_registry import AccountRegistry
+from banking_log import get_logger
+
+logger = get_logger(__name__) # silent unless logging is configured by the caller
 
 class Account:
+    __slots__ = ("_timestamp", "_account_id", "_balance") # no per-instance __dict__, accounts stay compact
+
     def __init__(self, timestamp: str, account_id: str):
         self._timestamp = timestamp
         self._account_id = account_id
@@ -26,17 +32,14 @@ class BankingSystemImpl(BankingSystem):
 
     def __init__(self):
         # TODO: implement
-        self._accounts_list = []
+        self._accounts = AccountRegistry() # accounts keyed by account_id, kept in creation order
         
     def _find_account(self, account_id: str): 
-        for account in self._accounts_list:
-            if account_id == account._account_id:
-                return account
-        return None # if not account found 
+        return self._accounts.get(account_id) # O(1) hash lookup, None if not account found 
     
     # helper function for testing only 
     def _all_accounts(self): 
-        for account in self._accounts_list: 
+        for account in self._accounts: 
             account.print_account_details()
 
 
@@ -47,22 +50,22 @@ class BankingSystemImpl(BankingSystem):
         
         # Create new account
         new_account = Account(timestamp, account_id)
-        self._accounts_list.append(new_account)
+        self._accounts.add(new_account)
         return True
     
     def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
         account = self._find_account(account_id)
         if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
 
         if amount <= 0:
-            print(f"Timestamp: {timestamp} | Error: Invalid deposit amount: {amount}")
+            logger.info("Timestamp: %s | Error: Invalid deposit amount: %s", timestamp, amount)
             return None
 
-        print(f"Timestamp: {timestamp} \nStarting account balance: {account._balance}")
+        logger.debug("Timestamp: %s \nStarting account balance: %s", timestamp, account._balance)
         account._balance += amount
-        print(f"Timestamp: {timestamp} \nNew account balance: {account._balance}\n")
+        logger.debug("Timestamp: %s \nNew account balance: %s\n", timestamp, account._balance)
 
         return account._balance
 
@@ -75,27 +78,27 @@ class BankingSystemImpl(BankingSystem):
         
         #missing accounts 
         if source is None or target is None:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
 
         #cannot transfer to self
         if source == target:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
         
         #change >= to > so full balance transfers are allowed
         if amount <= 0 or amount > source._balance:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
         
         #removed list membership checks because source/target already validated by _find_account
         
-        print(f"Timestamp: {timestamp} \nStarting balance (source): {source._balance} \nStarting balance (target): {target._balance}\n")
+        logger.debug("Timestamp: %s \nStarting balance (source): %s \nStarting balance (target): %s\n", timestamp, source._balance, target._balance)
         
         source._balance -= amount 
         target._balance += amount 
         
-        print(f"Timestamp: {timestamp} \nNew account balance (source): {source._balance} \nNew account balance (target): {target._balance}\n")
+        logger.debug("Timestamp: %s \nNew account balance (source): %s \nNew account balance (target): %s\n", timestamp, source._balance, target._balance)
 
         return source._balance
 
@@ -1,7 +1,16 @@
 import math
 
+from account_registry import AccountRegistry
+from banking_log import get_logger
+from spender_leaderboard import SpenderLeaderboard
+from cashback_scheduler import CASHBACK_DELAY, CashbackScheduler
+
+
+logger = get_logger(__name__) # silent unless logging is configured by the caller
 
 class Account:
+    __slots__ = ("_timestamp", "_account_id", "_balance") # no per-instance __dict__, accounts stay compact
+
     def __init__(self, timestamp: str, account_id: str):
         self._timestamp = timestamp
         self._account_id = account_id
@@ -18,8 +27,8 @@ class Account:
 class BankingSystemImpl:
 
     def __init__(self):
-        self._accounts_list = []
-        self._outgoing = {} # dict, track outgoing transfers + withdrawals 
+        self._accounts = AccountRegistry() # accounts keyed by account_id, kept in creation order
+        self._outgoing = SpenderLeaderboard() # ranked outgoing transfers + withdrawals per account 
 
         self._transaction_number = 0 # counter to keep track of transaction number for unique transac id
         self._payment_ids = {} # dict(key: payment_id; value: account_id) -> track unique payment id's and corresponding account 
@@ -27,16 +36,14 @@ class BankingSystemImpl:
         # track pending cash back as dict: {key: payment_id; value: (timestamp, account_id, cashback_amount, status)} \
         self._pending_cashback = {} # status is either "IN_PROGRESS" or "CASHBACK_RECEIVED"
         self._completed_cashback = {}
+        self._cashback_schedule = CashbackScheduler() # min-heap of pending refunds keyed by due timestamp
 
     def _find_account(self, account_id: str): 
-        for account in self._accounts_list:
-            if account_id == account._account_id:
-                return account # type: Account
-        return None # if not account found 
+        return self._accounts.get(account_id) # O(1) hash lookup, None if not account found 
     
     # helper function for testing only 
     def _all_accounts(self): 
-        for account in self._accounts_list: 
+        for account in self._accounts: 
             account.print_account_details()
 
 
@@ -46,9 +53,9 @@ class BankingSystemImpl:
             return False
         
         new_account = Account(timestamp, account_id)
-        self._accounts_list.append(new_account)
+        self._accounts.add(new_account)
 
-        self._outgoing[account_id] = 0 #initialize outgoing transfer tracker
+        self._outgoing.add(account_id) #initialize outgoing transfer tracker
         return True
     
     def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
@@ -57,16 +64,16 @@ class BankingSystemImpl:
 
         account = self._find_account(account_id)
         if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
 
         if amount <= 0:
-            print(f"Timestamp: {timestamp} | Error: Invalid deposit amount: {amount}")
+            logger.info("Timestamp: %s | Error: Invalid deposit amount: %s", timestamp, amount)
             return None
 
-        print(f"Timestamp: {timestamp} \nStarting account balance: {account._balance}")
+        logger.debug("Timestamp: %s \nStarting account balance: %s", timestamp, account._balance)
         account._balance += amount
-        print(f"Timestamp: {timestamp} \nNew account balance: {account._balance}\n")
+        logger.debug("Timestamp: %s \nNew account balance: %s\n", timestamp, account._balance)
 
         return account._balance
 
@@ -80,40 +87,34 @@ class BankingSystemImpl:
         
         #missing accounts 
         if source is None or target is None:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
 
         #cannot transfer to self
         if source == target:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
         
         #change >= to > so full balance transfers are allowed
         if amount <= 0 or amount > source._balance:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
         
-        print(f"Timestamp: {timestamp} \nStarting balance (source): {source._balance} \nStarting balance (target): {target._balance}\n")
+        logger.debug("Timestamp: %s \nStarting balance (source): %s \nStarting balance (target): %s\n", timestamp, source._balance, target._balance)
         
         source._balance -= amount 
         target._balance += amount 
 
-        self._outgoing[source_account_id] += amount 
+        self._outgoing.add_outgoing(source_account_id, amount) 
         
-        print(f"Timestamp: {timestamp} \nNew account balance (source): {source._balance} \nNew account balance (target): {target._balance}\n")
+        logger.debug("Timestamp: %s \nNew account balance (source): %s \nNew account balance (target): %s\n", timestamp, source._balance, target._balance)
 
         return source._balance
     
     def top_spenders(self, timestamp: int, n: int) -> list[str]:
 
-        #list of tuples: (account_id, outgoing_amount)
-        data = [(acc._account_id, self._outgoing[acc._account_id]) 
-                for acc in self._accounts_list]
-
-        #outgoing desc, then account_id asc, return top n or fewere
-        data.sort(key=lambda x: (-x[1], x[0]))
-        data = data[:n]
-        return [f"{acc_id}({amount})" for acc_id, amount in data]
+        # leaderboard is kept sorted: outgoing desc, then account_id asc, so only the top n are read 
+        return [f"{acc_id}({amount})" for acc_id, amount in self._outgoing.top(n)]
 
 
     def _calculate_cashback(self, amount: int):
@@ -121,23 +122,15 @@ class BankingSystemImpl:
     
 
     def _process_cash_back(self, curr_timestamp): 
-        processed = [] # track for removal 
-
-        # look thru all pending items 
-        for payment_id, data in self._pending_cashback.items(): # {payment_id : (timestamp, account_id, cashback_amount, status)}
-            if curr_timestamp >= data[0] + 86400000: # waiting period elapsed 
-                account = self._find_account(data[1])
-                account._balance += data[2]
-                print(f"Cashback has been processed for account {account._account_id}")
-
-                # mark for deletion once processing is complete so no longer pending 
-                processed.append(payment_id) 
-
-                # move to completed with updated status 
-                self._completed_cashback[payment_id] = (data[0], data[1], data[2], "CASHBACK_RECEIVED") 
+        # only refunds that are due are popped from the scheduler, in payment order 
+        for payment_id in self._cashback_schedule.pop_due(curr_timestamp): 
+            data = self._pending_cashback.pop(payment_id) # {payment_id : (timestamp, account_id, cashback_amount, status)}
+            account = self._find_account(data[1])
+            account._balance += data[2]
+            logger.debug("Cashback has been processed for account %s", account._account_id)
 
-        for p in processed: 
-            del self._pending_cashback[p] # remove payment from dict once processed 
+            # move to completed with updated status 
+            self._completed_cashback[payment_id] = (data[0], data[1], data[2], "CASHBACK_RECEIVED") 
 
     
     def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
@@ -148,29 +141,30 @@ class BankingSystemImpl:
 
         # check: accounts exists 
         if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
         
         # check: funds are sufficient 
         if amount > account._balance:
-            print(f"Timestamp: {timestamp} | Error: Insufficient funds, withdrawal {amount} exceeds account current balance.")
+            logger.info("Timestamp: %s | Error: Insufficient funds, withdrawal %s exceeds account current balance.", timestamp, amount)
             return None
         
         # withdraw given amount from specified account 
         account._balance -= amount 
 
         # added functionality: top_spenders() to account for withdrawals 
-        self._outgoing[account_id] += amount 
+        self._outgoing.add_outgoing(account_id, amount) 
 
         # successful withdrawals return string with unique payment_id
         self._transaction_number += 1 
         payment_id = "payment" + str(self._transaction_number)
         self._payment_ids[payment_id] = account_id # add new entry 
-        print(f"Payment of {amount} to account {account_id} was successful | Payment ID: {payment_id}")
+        logger.debug("Payment of %s to account %s was successful | Payment ID: %s", amount, account_id, payment_id)
 
         # add cashback 
         cashback_owed = self._calculate_cashback(amount)
         self._pending_cashback[payment_id] = (timestamp, account_id, cashback_owed, "IN_PROGRESS") 
+        self._cashback_schedule.schedule(timestamp + CASHBACK_DELAY, self._transaction_number, payment_id)
        
         return payment_id 
     
@@ -183,17 +177,17 @@ class BankingSystemImpl:
 
         # check: accounts exists 
         if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
         
         # check: payment exists 
         if payment not in self._payment_ids: 
-            print(f"Timestamp: {timestamp} | Error: Could not find payment with payment ID {payment}")
+            logger.info("Timestamp: %s | Error: Could not find payment with payment ID %s", timestamp, payment)
             return None 
 
         # check: payment id / account id mismatches
         if self._payment_ids[payment] != account_id:
-            print(f"Timestamp: {timestamp} | Error: Payment ID {payment} could not be located for account {account_id}")
+            logger.info("Timestamp: %s | Error: Payment ID %s could not be located for account %s", timestamp, payment, account_id)
             return None
         
         # is waiting to be processed 
@@ -1,7 +1,39 @@
 import math
+from array import array
+from itertools import accumulate, chain
 
+from account_registry import AccountRegistry, IndexedAccountRegistry
+from balance_history import BalanceHistory
+from bulk_operations import deposit_rows, pay_rows
+from banking_log import get_logger
+from spender_leaderboard import SpenderLeaderboard
+from windowed_leaderboard import WindowedLeaderboard
+from cashback_scheduler import CASHBACK_DELAY, CashbackQueue, CashbackScheduler
+from columnar_account_store import ColumnarAccountStore
+from payment_ledger import CASHBACK_RECEIVED, IN_PROGRESS, STATUS_CODES, STATUS_NAMES, PaymentLedger, parse_payment_id
+from snapshot import read_snapshot, write_snapshot
+
+
+logger = get_logger(__name__) # silent unless logging is configured by the caller
+
+SNAPSHOT_VERSION = 1
+JOURNALED_OPERATIONS = frozenset(("create_account", "deposit", "transfer", "pay", "merge_accounts"))
+
+
+class OutOfOrderTimestampError(ValueError):
+    """
+    Raised in monotonic mode (`BankingSystemImpl(monotonic=True)`) for an
+    operation whose timestamp is earlier than one already applied.
+    """
+
+    def __init__(self, timestamp: int, clock: int):
+        super().__init__(f"Timestamp {timestamp} is before the latest applied timestamp {clock}")
+        self.timestamp = timestamp
+        self.clock = clock
 
 class Account:
+    __slots__ = ("_timestamp", "_account_id", "_balance") # no per-instance __dict__, accounts stay compact
+
     def __init__(self, timestamp: str, account_id: str):
         self._timestamp = timestamp
         self._account_id = account_id
@@ -17,193 +49,778 @@ class Account:
 
 class BankingSystemImpl:
 
-    def __init__(self):
-        self._accounts_list = []
-        self._outgoing = {} # dict, track outgoing transfers + withdrawals 
-
-        self._transaction_number = 0 # counter to keep track of transaction number for unique transac id
-        self._payment_ids = {} # dict(key: payment_id; value: account_id) -> track unique payment id's and corresponding account 
-
-        # track pending cash back as dict: {key: payment_id; value: (timestamp, account_id, cashback_amount, status)} \
-        self._pending_cashback = {} # status is either "IN_PROGRESS" or "CASHBACK_RECEIVED"
-        self._completed_cashback = {}
+    def __init__(self, account_store=None, history_retention: int | None = None, payment_ledger=None,
+                 lazy_cashback: bool = False, monotonic: bool = False, spender_windows=()):
+        # accounts in handle-indexed columns (a ColumnarAccountStore or a store with its create/restore and columns) 
+        # every account gets a dense integer handle when it is created, never reused (a re-created account_id 
+        # gets a new one); internal tables are keyed by handle, account_id strings are only looked up at the API 
+        # the engine works on the store's own maps and columns, there is no per-account object 
+        # an AccountRegistry keeps __slots__ Account objects instead, indexed by handle the same way 
+        if account_store is None:
+            account_store = ColumnarAccountStore()
+        elif isinstance(account_store, AccountRegistry):
+            account_store = IndexedAccountRegistry(account_store, Account)
+        elif not hasattr(account_store, "create"):
+            raise TypeError(f"Unsupported account store: {type(account_store).__name__}")
+        self._accounts = account_store
+        self._handles = self._accounts._handles # dict(key: account_id; value: handle of the live account with that id)
+        self._account_ids = self._accounts._account_ids # handle -> account_id
+        self._balances = self._accounts._balances # handle -> balance
+
+        self._outgoing = SpenderLeaderboard(names=self._account_ids) # ranked outgoing transfers + withdrawals per handle 
+        # the same over sliding windows (spender_windows, in ms, e.g. (3600000, 86400000)) for top_spenders_window
+        self._windows = {window: WindowedLeaderboard(window, names=self._account_ids) for window in spender_windows}
+
+        # every payment by ordinal ("payment<N>" -> N): paying handle, status code, timestamp, cashback owed 
+        # plus a per-account index of ordinals; the ledger also hands out the unique payment numbers 
+        # pass a configured PaymentLedger to change compaction or archive compacted payments to disk 
+        self._payments = payment_ledger if payment_ledger is not None else PaymentLedger()
+        self._payments.account_ids = self._account_ids
+
+        # merged accounts alias the account they were merged into (union-find parent links) 
+        # payments keep their original handle and resolve to the surviving one lazily via _resolve 
+        self._merged_into = {} # dict(key: merged handle; value: handle it was merged into)
+
+        # monotonic clock (monotonic=True): timestamps never go back, checked in O(1) per operation 
+        # (OutOfOrderTimestampError otherwise); refunds then come due in payment order, so a FIFO replaces the heap 
+        self._monotonic = monotonic
+        self._clock = 0 # latest timestamp applied (monotonic mode)
+        self._schedule_type = CashbackQueue if monotonic else CashbackScheduler
+
+        self._cashback_schedule = self._schedule_type() # pending refund ordinals keyed by due timestamp
+
+        # lazy settlement (lazy_cashback=True): instead of the global schedule, each account keeps its own 
+        # pending refunds and they are applied only when that account is touched (see _settle); 
+        # _settled_to is the latest sweep timestamp, every refund due by then counts as received (and its payment 
+        # may be compacted out of the ledger, so the schedules carry (ordinal, due, cashback) refunds themselves) 
+        self._refunds = {} if lazy_cashback else None # dict(key: handle; value: CashbackScheduler of its refunds)
+        self._settled_to = 0
+
+        # handle -> BalanceHistory (closed once merged away) -> point-in-time balances for get_balance; 
+        # None until the account's first balance change, an untouched account costs one list slot 
+        self._histories = []
+        self._closed_histories = {} # dict(key: account_id; value: list of BalanceHistory of merged-away accounts)
+        self._history_retention = history_retention # optional window (ms) of balance history to keep per account
+
+        self._event_sink = None # optional callable receiving one dict per state change (audit output)
+        self._journal = None # optional journal.OperationJournal, written ahead of every state change
+        self._metrics = None # optional banking_metrics.BankingMetrics, timing operations and cashback sweeps
 
     def _find_account(self, account_id: str): 
-        for account in self._accounts_list:
-            if account_id == account._account_id:
-                return account # type: Account
-        return None # if not account found 
+        return self._accounts.get(account_id) # view of the account's row, None if not account found 
+
+    def _is_live(self, handle: int) -> bool:
+        # handle belongs to an existing account (not merged away) 
+        account_ids = self._account_ids
+        return 0 <= handle < len(account_ids) and self._handles.get(account_ids[handle]) == handle
+
+    def _remove_account(self, handle: int):
+        # drops a merged-away account from the store, its handle stays allocated to the closed history 
+        self._accounts.remove(self._account_ids[handle])
+
+    def _tick(self, timestamp: int):
+        # monotonic mode: rejects a timestamp earlier than the clock, then advances it 
+        if timestamp < self._clock:
+            raise OutOfOrderTimestampError(timestamp, self._clock)
+        self._clock = timestamp
+
+    def _history(self, handle: int) -> BalanceHistory:
+        # balance log of handle, allocated on its first balance change 
+        history = self._histories[handle]
+        if history is None:
+            history = self._histories[handle] = BalanceHistory(self._accounts._timestamps[handle], self._history_retention)
+        return history
+
+    def _resolve(self, handle: int) -> int:
+        # follow merge links to the surviving account, halving the path as we go (amortized ~O(1))
+        merged_into = self._merged_into
+        while handle in merged_into:
+            parent = merged_into[handle]
+            if parent in merged_into:
+                merged_into[handle] = merged_into[parent]
+            handle = parent
+        return handle
     
     # helper function for testing only 
     def _all_accounts(self): 
-        for account in self._accounts_list: 
+        for account in self._accounts: 
             account.print_account_details()
 
+    def set_event_sink(self, sink) -> None:
+        # sink is any callable taking a dict, e.g. banking_log.JsonLinesEventSink; None disables events 
+        self._event_sink = sink
+
+    def set_journal(self, journal) -> None:
+        # journal is a journal.OperationJournal (see journal.recover for restarts); None disables journaling 
+        self._journal = journal
+
+    def set_metrics(self, metrics) -> None:
+        # metrics is a banking_metrics.BankingMetrics, which wraps this instance's operations in timers; 
+        # None removes them, so with metrics off the hot paths are untouched 
+        if self._metrics is not None:
+            self._metrics.uninstrument(self)
+        self._metrics = metrics
+        if metrics is not None:
+            metrics.instrument(self)
+
+    def get_metrics(self) -> dict | None:
+        # counters, gauges and latency summaries of the attached metrics (see set_metrics), None if off 
+        return self._metrics.snapshot() if self._metrics is not None else None
+
 
     # TODO: implement interface methods here
     def create_account(self, timestamp: int, account_id: str) -> bool:
-        if self._find_account(account_id) is not None:
+        if self._monotonic:
+            self._tick(timestamp)
+        if self._journal is not None:
+            self._journal.append(("create_account", timestamp, account_id))
+        return self._create_account(timestamp, account_id)
+
+    def _create_account(self, timestamp: int, account_id: str) -> bool:
+        # create_account without the journal entry, shared with apply_batch 
+
+        # intern the id: the only string-keyed entry, everything else is indexed by handle 
+        handle = self._accounts.create(account_id, timestamp)
+        if handle is None:
             return False
-        
-        new_account = Account(timestamp, account_id)
-        self._accounts_list.append(new_account)
 
-        self._outgoing[account_id] = 0 #initialize outgoing transfer tracker
+        self._outgoing.add(handle) #initialize outgoing transfer tracker
+        self._histories.append(None)
+
+        if self._event_sink is not None:
+            self._event_sink({"event": "create_account", "timestamp": timestamp, "account_id": account_id})
         return True
     
     def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
-
+        if self._monotonic:
+            self._tick(timestamp)
         self._process_cash_back(timestamp)
+        if self._journal is not None:
+            self._journal.append(("deposit", timestamp, account_id, amount))
+        return self._deposit(timestamp, account_id, amount)
 
-        account = self._find_account(account_id)
-        if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+    def _deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
+        # deposit without the cashback sweep, shared with apply_batch 
+
+        handle = self._handles.get(account_id)
+        if handle is None:
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
+        if self._refunds is not None:
+            self._settle(handle)
 
         if amount <= 0:
-            print(f"Timestamp: {timestamp} | Error: Invalid deposit amount: {amount}")
+            logger.info("Timestamp: %s | Error: Invalid deposit amount: %s", timestamp, amount)
             return None
 
-        print(f"Timestamp: {timestamp} \nStarting account balance: {account._balance}")
-        account._balance += amount
-        print(f"Timestamp: {timestamp} \nNew account balance: {account._balance}\n")
+        logger.debug("Timestamp: %s \nStarting account balance: %s", timestamp, self._balances[handle])
+        balances = self._balances
+        balances[handle] += amount
+        self._history(handle).add(timestamp, amount)
+        logger.debug("Timestamp: %s \nNew account balance: %s\n", timestamp, self._balances[handle])
+
+        if self._event_sink is not None:
+            self._event_sink({"event": "deposit", "timestamp": timestamp, "account_id": account_id,
+                              "amount": amount, "balance": self._balances[handle]})
 
-        return account._balance
+        return self._balances[handle]
 
 
     def transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
-        
+        if self._monotonic:
+            self._tick(timestamp)
         self._process_cash_back(timestamp)
+        if self._journal is not None:
+            self._journal.append(("transfer", timestamp, source_account_id, target_account_id, amount))
+        return self._transfer(timestamp, source_account_id, target_account_id, amount)
+
+    def _transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
+        # transfer without the cashback sweep, shared with apply_batch 
 
-        source = self._find_account(source_account_id)
-        target = self._find_account(target_account_id)
+        source_handle = self._handles.get(source_account_id)
+        target_handle = self._handles.get(target_account_id)
         
         #missing accounts 
-        if source is None or target is None:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+        if source_handle is None or target_handle is None:
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
 
         #cannot transfer to self
-        if source == target:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+        if source_handle == target_handle:
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
+
+        if self._refunds is not None:
+            self._settle(source_handle)
+            self._settle(target_handle)
         
         #change >= to > so full balance transfers are allowed
-        if amount <= 0 or amount > source._balance:
-            print("Error: Please enter a valid amount or source/target account IDs.")
+        balances = self._balances
+        if amount <= 0 or amount > balances[source_handle]:
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
             return None
         
-        print(f"Timestamp: {timestamp} \nStarting balance (source): {source._balance} \nStarting balance (target): {target._balance}\n")
+        logger.debug("Timestamp: %s \nStarting balance (source): %s \nStarting balance (target): %s\n", timestamp, balances[source_handle], balances[target_handle])
         
-        source._balance -= amount 
-        target._balance += amount 
-
-        self._outgoing[source_account_id] += amount 
+        balances[source_handle] -= amount 
+        balances[target_handle] += amount 
+        self._history(source_handle).add(timestamp, -amount)
+        self._history(target_handle).add(timestamp, amount)
+
+        self._outgoing.add_outgoing(source_handle, amount) 
+        for windowed in self._windows.values():
+            windowed.add_outgoing(source_handle, timestamp, amount)
         
-        print(f"Timestamp: {timestamp} \nNew account balance (source): {source._balance} \nNew account balance (target): {target._balance}\n")
+        logger.debug("Timestamp: %s \nNew account balance (source): %s \nNew account balance (target): %s\n", timestamp, balances[source_handle], balances[target_handle])
 
-        return source._balance
+        if self._event_sink is not None:
+            self._event_sink({"event": "transfer", "timestamp": timestamp, "source_account_id": source_account_id,
+                              "target_account_id": target_account_id, "amount": amount,
+                              "source_balance": balances[source_handle], "target_balance": balances[target_handle]})
+
+        return balances[source_handle]
     
     def top_spenders(self, timestamp: int, n: int) -> list[str]:
-
-        #list of tuples: (account_id, outgoing_amount)
-        data = [(acc._account_id, self._outgoing[acc._account_id]) 
-                for acc in self._accounts_list]
-
-        #outgoing desc, then account_id asc, return top n or fewere
-        data.sort(key=lambda x: (-x[1], x[0]))
-        data = data[:n]
-        return [f"{acc_id}({amount})" for acc_id, amount in data]
+        if self._monotonic:
+            self._tick(timestamp)
+        # leaderboard is kept sorted: outgoing desc, then account_id asc, so only the top n are read 
+        return [f"{acc_id}({amount})" for acc_id, amount in self._outgoing.top(n)]
+
+    def top_spenders_window(self, timestamp: int, n: int, window: int) -> list[str] | None:
+        """
+        Like `top_spenders`, ranked by outgoing amount over the `window`
+        (ms) ending at `timestamp` instead of all time; accounts that spent
+        nothing in the window are left out. `window` must be one of the
+        engine's `spender_windows`; windows are bucketed, see
+        `windowed_leaderboard.py`.
+        """
+        if self._monotonic:
+            self._tick(timestamp)
+        windowed = self._windows.get(window)
+        if windowed is None:
+            logger.info("Timestamp: %s | Error: No spender window of %s ms configured.", timestamp, window)
+            return None
+        return [f"{acc_id}({amount})" for acc_id, amount in windowed.top(timestamp, n)]
 
 
     def _calculate_cashback(self, amount: int):
         return math.floor(amount * 0.02) # round down 
     
 
-    def _process_cash_back(self, curr_timestamp): 
-        processed = [] # track for removal 
-
-        # look thru all pending items 
-        for payment_id, data in self._pending_cashback.items(): # {payment_id : (timestamp, account_id, cashback_amount, status)}
-            if curr_timestamp >= data[0] + 86400000: # waiting period elapsed 
-                account = self._find_account(data[1])
-                account._balance += data[2]
-                print(f"Cashback has been processed for account {account._account_id}")
-
-                # mark for deletion once processing is complete so no longer pending 
-                processed.append(payment_id) 
-
-                # move to completed with updated status 
-                self._completed_cashback[payment_id] = (data[0], data[1], data[2], "CASHBACK_RECEIVED") 
-
-        for p in processed: 
-            del self._pending_cashback[p] # remove payment from dict once processed 
+    def _process_cash_back(self, curr_timestamp) -> int: 
+        if self._refunds is not None: 
+            # lazy: only the watermark moves, accounts settle their own refunds when touched; 
+            # 1 if it moved, so a read that moved it is journaled like a read that settled refunds 
+            if curr_timestamp <= self._settled_to:
+                return 0
+            self._settled_to = curr_timestamp
+            self._payments.settled_through = curr_timestamp - CASHBACK_DELAY # due payments no longer pin compaction
+            return 1
+
+        # only refunds that are due are popped from the scheduler, in payment order 
+        payments = self._payments
+        due = self._cashback_schedule.pop_due(curr_timestamp)
+        for ordinal in due: 
+            # refunds of merged accounts go to the account they were merged into 
+            self._credit_refund(self._resolve(payments.owner(ordinal)), ordinal, payments.timestamp(ordinal) + CASHBACK_DELAY,
+                                payments.cashback(ordinal), curr_timestamp)
+        return len(due) # number of refunds settled
+
+    def _settle(self, handle: int):
+        # lazy mode: applies the refunds of handle that are due by the watermark, in due order 
+        refunds = self._refunds.get(handle)
+        if refunds is not None and refunds.next_due() is not None and refunds.next_due() <= self._settled_to:
+            for ordinal, due, cashback in refunds.pop_due(self._settled_to):
+                self._credit_refund(handle, ordinal, due, cashback, self._settled_to)
+
+    def _settle_all(self):
+        # lazy mode: settles every account, afterwards the pending refunds are exactly the in-progress payments 
+        for handle in list(self._refunds):
+            self._settle(handle)
+
+    def _credit_refund(self, handle: int, ordinal: int, due: int, cashback: int, curr_timestamp: int):
+        self._balances[handle] += cashback
+        self._history(handle).add(due, cashback) # refund belongs to its due time, not the sweep time
+        logger.debug("Cashback has been processed for account %s", self._account_ids[handle])
+
+        # update status in place, no longer pending (completed rows are compacted by the ledger) 
+        self._payments.complete(ordinal)
+
+        if self._event_sink is not None:
+            self._event_sink({"event": "cashback", "timestamp": curr_timestamp, "account_id": self._account_ids[handle],
+                              "payment_id": "payment" + str(ordinal), "amount": cashback, "balance": self._balances[handle]})
 
     
     def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
-
+        if self._monotonic:
+            self._tick(timestamp)
         self._process_cash_back(timestamp)
+        if self._journal is not None:
+            self._journal.append(("pay", timestamp, account_id, amount))
+        return self._pay(timestamp, account_id, amount)
+
+    def _pay(self, timestamp: int, account_id: str, amount: int, ordinal: int | None = None) -> str | None:
+        # pay without the cashback sweep, shared with apply_batch 
+        # ordinal numbers the payment when numbering is done elsewhere (a 5th element of a batched "pay", see sharded_banking_system) 
 
-        account = self._find_account(account_id)
+        handle = self._handles.get(account_id)
 
         # check: accounts exists 
-        if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+        if handle is None:
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
+        if self._refunds is not None:
+            self._settle(handle)
         
         # check: funds are sufficient 
-        if amount > account._balance:
-            print(f"Timestamp: {timestamp} | Error: Insufficient funds, withdrawal {amount} exceeds account current balance.")
+        balances = self._balances
+        if amount > balances[handle]:
+            logger.info("Timestamp: %s | Error: Insufficient funds, withdrawal %s exceeds account current balance.", timestamp, amount)
             return None
         
         # withdraw given amount from specified account 
-        account._balance -= amount 
+        balances[handle] -= amount 
+        self._history(handle).add(timestamp, -amount)
 
         # added functionality: top_spenders() to account for withdrawals 
-        self._outgoing[account_id] += amount 
+        self._outgoing.add_outgoing(handle, amount) 
+        for windowed in self._windows.values():
+            windowed.add_outgoing(handle, timestamp, amount)
 
-        # successful withdrawals return string with unique payment_id
-        self._transaction_number += 1 
-        payment_id = "payment" + str(self._transaction_number)
-        self._payment_ids[payment_id] = account_id # add new entry 
-        print(f"Payment of {amount} to account {account_id} was successful | Payment ID: {payment_id}")
+        # successful withdrawals return string with unique payment_id, numbered by the ledger 
+        cashback_owed = self._calculate_cashback(amount)
+        ordinal = self._payments.add(handle, timestamp, cashback_owed, ordinal)
+        payment_id = "payment" + str(ordinal)
+        logger.debug("Payment of %s to account %s was successful | Payment ID: %s", amount, account_id, payment_id)
 
         # add cashback 
-        cashback_owed = self._calculate_cashback(amount)
-        self._pending_cashback[payment_id] = (timestamp, account_id, cashback_owed, "IN_PROGRESS") 
+        if self._refunds is None:
+            self._cashback_schedule.schedule(timestamp + CASHBACK_DELAY, ordinal, ordinal)
+        else:
+            refunds = self._refunds.get(handle)
+            if refunds is None:
+                refunds = self._refunds[handle] = self._schedule_type()
+            refunds.schedule(timestamp + CASHBACK_DELAY, ordinal, (ordinal, timestamp + CASHBACK_DELAY, cashback_owed))
+
+        if self._event_sink is not None:
+            self._event_sink({"event": "pay", "timestamp": timestamp, "account_id": account_id, "amount": amount,
+                              "payment_id": payment_id, "cashback": cashback_owed, "balance": balances[handle]})
        
         return payment_id 
     
 
     def get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        if self._monotonic:
+            self._tick(timestamp)
+        if self._process_cash_back(timestamp) and self._journal is not None:
+            self._journal.append(("get_payment_status", timestamp, account_id, payment)) # settled refunds, replaying it repeats the sweep
+        return self._get_payment_status(timestamp, account_id, payment)
 
-        self._process_cash_back(timestamp)
+    def _get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        # get_payment_status without the cashback sweep, shared with apply_batch 
 
-        account = self._find_account(account_id)
+        handle = self._handles.get(account_id)
 
         # check: accounts exists 
-        if account is None:
-            print(f"Timestamp: {timestamp} | Error: Account '{account_id}' not found.")
+        if handle is None:
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
         
-        # check: payment exists 
-        if payment not in self._payment_ids: 
-            print(f"Timestamp: {timestamp} | Error: Could not find payment with payment ID {payment}")
+        # check: payment exists (single probe into the ledger's status column)
+        ordinal = parse_payment_id(payment)
+        status = self._payments.status(ordinal) if ordinal is not None else 0
+        if not status: 
+            logger.info("Timestamp: %s | Error: Could not find payment with payment ID %s", timestamp, payment)
             return None 
 
-        # check: payment id / account id mismatches
-        if self._payment_ids[payment] != account_id:
-            print(f"Timestamp: {timestamp} | Error: Payment ID {payment} could not be located for account {account_id}")
+        # check: payment id / account id mismatches (payments of merged accounts belong to the surviving account)
+        if self._resolve(self._payments.owner(ordinal)) != handle:
+            logger.info("Timestamp: %s | Error: Payment ID %s could not be located for account %s", timestamp, payment, account_id)
             return None
+
+        # lazy mode: due by the watermark means received, whether or not the account has been settled since 
+        if status == IN_PROGRESS and self._refunds is not None and self._payments.timestamp(ordinal) + CASHBACK_DELAY <= self._settled_to:
+            status = CASHBACK_RECEIVED
         
-        # is waiting to be processed 
-        if payment in self._pending_cashback:
-            return self._pending_cashback[payment][3] 
-        
-        # has already been processed 
-        elif payment in self._completed_cashback:
-            return self._completed_cashback[payment][3]
-        
-        # if not in either list (i.e., payment_id does not exist)
-        else: 
+        # "IN_PROGRESS" while waiting to be processed, "CASHBACK_RECEIVED" once refunded 
+        return STATUS_NAMES[status]
+
+
+    def list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        if self._monotonic:
+            self._tick(timestamp)
+        if self._process_cash_back(timestamp) and self._journal is not None:
+            self._journal.append(("list_payments", timestamp, account_id, status)) # settled refunds, replaying it repeats the sweep
+        return self._list_payments(timestamp, account_id, status)
+
+    def _list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        # list_payments without the cashback sweep, shared with apply_batch 
+        # returns the payment ids of account_id (including accounts merged into it) in payment order, 
+        # optionally only those with status "IN_PROGRESS" or "CASHBACK_RECEIVED" 
+
+        handle = self._handles.get(account_id)
+
+        # check: accounts exists 
+        if handle is None:
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
+            return None
+
+        # check: status filter is valid 
+        if status is not None and status not in STATUS_CODES:
+            logger.info("Timestamp: %s | Error: Invalid payment status: %s", timestamp, status)
+            return None
+        if self._refunds is not None:
+            self._settle(handle) # statuses of this account's payments are exact once it is settled
+
+        ordinals = self._payments.payments_of(handle, STATUS_CODES.get(status))
+        return ["payment" + str(ordinal) for ordinal in ordinals]
+
+
+    def merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        if self._monotonic:
+            self._tick(timestamp)
+        self._process_cash_back(timestamp)
+        if self._journal is not None:
+            self._journal.append(("merge_accounts", timestamp, account_id_1, account_id_2))
+        return self._merge_accounts(timestamp, account_id_1, account_id_2)
+
+    def _merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        # merge_accounts without the cashback sweep, shared with apply_batch 
+
+        # check: cannot merge an account into itself 
+        if account_id_1 == account_id_2:
+            logger.info("Timestamp: %s | Error: Cannot merge account '%s' into itself.", timestamp, account_id_1)
+            return False
+
+        handle_1 = self._handles.get(account_id_1)
+        handle_2 = self._handles.get(account_id_2)
+
+        # check: both accounts exist 
+        if handle_1 is None or handle_2 is None:
+            logger.info("Timestamp: %s | Error: Account '%s' or '%s' not found.", timestamp, account_id_1, account_id_2)
+            return False
+        if self._refunds is not None: # settle both, then account_1 takes over account_2's pending refunds
+            self._settle(handle_1)
+            self._settle(handle_2)
+            refunds_2 = self._refunds.pop(handle_2, None)
+            if refunds_2 is not None:
+                self._refunds.setdefault(handle_1, self._schedule_type()).merge(refunds_2)
+
+        # balance moves to account_1, which also continues account_2's balance history from here 
+        balances = self._balances
+        balances[handle_1] += balances[handle_2]
+        self._history(handle_1).add(timestamp, balances[handle_2])
+
+        # account_2's own history stays queryable up to the merge 
+        history_2 = self._history(handle_2) # allocated if it never changed, it is queryable up to the merge
+        history_2.close(timestamp)
+        self._closed_histories.setdefault(account_id_2, []).append(history_2)
+
+        # top_spenders: merged account spends the sum of both 
+        self._outgoing.add_outgoing(handle_1, self._outgoing.remove(handle_2))
+        for windowed in self._windows.values():
+            windowed.merge(handle_1, handle_2)
+
+        # O(1) alias instead of rewriting account_2's payments and pending refunds 
+        self._remove_account(handle_2)
+        self._merged_into[handle_2] = handle_1
+        self._payments.merge(handle_1, handle_2)
+
+        logger.debug("Timestamp: %s | Merged account %s into %s, new balance: %s", timestamp, account_id_2, account_id_1, balances[handle_1])
+
+        if self._event_sink is not None:
+            self._event_sink({"event": "merge_accounts", "timestamp": timestamp, "account_id_1": account_id_1,
+                              "account_id_2": account_id_2, "balance": balances[handle_1]})
+        return True
+
+
+    def get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        if self._monotonic:
+            self._tick(timestamp)
+        if self._process_cash_back(timestamp) and self._journal is not None:
+            self._journal.append(("get_balance", timestamp, account_id, time_at)) # settled refunds, replaying it repeats the sweep
+        return self._get_balance(timestamp, account_id, time_at)
+
+    def _get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        # get_balance without the cashback sweep, shared with apply_batch 
+
+        handle = self._handles.get(account_id)
+        if handle is not None and self._refunds is not None:
+            self._settle(handle)
+        closed = self._closed_histories.get(account_id, [])
+        if handle is None and not closed:
+            logger.info("Timestamp: %s | Error: Account '%s' not found.", timestamp, account_id)
             return None
+
+        # binary search in each balance log this account_id has had (current one first); 
+        # their lifetimes don't overlap, so at most one returns a balance for time_at 
+        if handle is not None:
+            history = self._histories[handle]
+            if history is None: # no balance change yet: 0 since creation
+                if time_at >= self._accounts._timestamps[handle]:
+                    return 0
+            else:
+                balance = history.balance_at(time_at)
+                if balance is not None:
+                    return balance
+        for candidate in closed[::-1]:
+            balance = candidate.balance_at(time_at)
+            if balance is not None:
+                return balance
+        return None # account did not exist at time_at
+
+
+    def apply_batch(self, ops, reorder: bool = False, return_exceptions: bool = False) -> list:
+        """
+        Applies a sequence of timestamped commands in order and returns
+        their results as a list, e.g.
+        `[("create_account", 1, "account1"), ("deposit", 2, "account1", 500)]`.
+        Each command is `(operation, timestamp, *args)` with the same
+        arguments as the method of that name, and gives the same result.
+        The cashback sweep runs once per distinct timestamp instead of once
+        per command; a refund scheduled in between is never due at the same
+        timestamp, so skipping the repeated sweep cannot change results.
+        With a journal attached, the batch is journaled as one group and
+        synced before returning.
+        With `reorder`, the commands are applied in timestamp order (stable,
+        so commands with equal timestamps keep their order) and the results
+        are still returned in the order given. In monotonic mode a batch
+        with a timestamp out of order is rejected as a whole before any of
+        it is applied.
+        With `return_exceptions`, an exception raised by a command is
+        returned as its result and the rest of the batch still runs, so
+        the results tell which commands were applied.
+        """
+        # operation name -> (bound method without the sweep, whether the public method sweeps first)
+        handlers = {
+            "create_account": (self._create_account, False),
+            "deposit": (self._deposit, True),
+            "transfer": (self._transfer, True),
+            "top_spenders": (self.top_spenders, False),
+            "top_spenders_window": (self.top_spenders_window, False),
+            "pay": (self._pay, True),
+            "get_payment_status": (self._get_payment_status, True),
+            "list_payments": (self._list_payments, True),
+            "merge_accounts": (self._merge_accounts, True),
+            "get_balance": (self._get_balance, True),
+        }
+
+        # unknown operations reject the whole batch before any of it is applied (or journaled) 
+        ops = list(ops)
+        for op in ops:
+            if op[0] not in handlers:
+                raise ValueError(f"Unknown operation: {op[0]}")
+
+        if reorder:
+            order = sorted(range(len(ops)), key=lambda i: ops[i][1])
+            results = self.apply_batch([ops[i] for i in order], return_exceptions=return_exceptions)
+            reordered = [None] * len(ops)
+            for i, result in zip(order, results):
+                reordered[i] = result
+            return reordered
+        if self._monotonic:
+            clock = self._clock
+            for op in ops:
+                if op[1] < clock:
+                    raise OutOfOrderTimestampError(op[1], clock)
+                clock = op[1]
+
+        results = []
+        journal = self._journal
+        swept_at = None # timestamp of the last cashback sweep in this batch
+        try:
+            for op in ops:
+                method, sweeps = handlers[op[0]]
+                timestamp = op[1]
+                settled = 0
+                if sweeps and timestamp != swept_at:
+                    settled = self._process_cash_back(timestamp)
+                    swept_at = timestamp
+
+                # same rule as the public methods: state changes, and reads whose sweep settled refunds 
+                if journal is not None and (op[0] in JOURNALED_OPERATIONS or settled):
+                    journal.append(op)
+                try:
+                    results.append(method(timestamp, *op[2:]))
+                except Exception as error:
+                    if not return_exceptions:
+                        raise
+                    results.append(error)
+        finally:
+            if self._monotonic: # also when a command raised: the commands before it are applied 
+                self._clock = clock
+
+        if journal is not None:
+            journal.sync() # group commit: the whole batch is durable on return
+        return results
+
+
+    def account_handles(self, account_ids) -> list[int]:
+        """
+        Returns the handle of each account_id (-1 if it does not exist),
+        for `bulk_deposit` and `bulk_pay`. A handle stays valid until its
+        account is merged away; a re-created account_id gets a new one.
+        """
+        handles = self._handles
+        return [handles.get(account_id, -1) for account_id in account_ids]
+
+    def bulk_deposit(self, timestamp: int, handles, amounts) -> list:
+        """
+        Deposits `amounts[i]` to the account with handle `handles[i]`
+        (sequences or NumPy arrays), all at `timestamp`, and returns the
+        results `deposit` would give row by row in order. Vectorized with
+        NumPy when it is installed, see `bulk_operations.py`.
+        """
+        if self._monotonic:
+            self._tick(timestamp)
+        self._process_cash_back(timestamp) # once for the whole bulk
+        self._journal_rows("deposit", timestamp, handles, amounts)
+        return deposit_rows(self, timestamp, handles, amounts)
+
+    def bulk_pay(self, timestamp: int, handles, amounts) -> list:
+        """
+        Pays `amounts[i]` from the account with handle `handles[i]`, all
+        at `timestamp`, and returns the results `pay` would give row by
+        row in order: successful rows get consecutive payment ids, rows
+        without sufficient funds at their turn get None.
+        """
+        if self._monotonic:
+            self._tick(timestamp)
+        self._process_cash_back(timestamp)
+        self._journal_rows("pay", timestamp, handles, amounts)
+        return pay_rows(self, timestamp, handles, amounts)
+
+    def _journal_rows(self, operation: str, timestamp: int, handles, amounts):
+        # bulk rows are journaled as the equivalent commands; rows of unknown handles change nothing and are left out 
+        if self._journal is None:
+            return
+        handles = handles.tolist() if hasattr(handles, "tolist") else handles # plain ints for the JSON records
+        amounts = amounts.tolist() if hasattr(amounts, "tolist") else amounts
+        account_ids = self._account_ids
+        for handle, amount in zip(handles, amounts):
+            if self._is_live(handle):
+                self._journal.append((operation, timestamp, account_ids[handle], amount))
+        self._journal.sync()
+
+
+    def save_snapshot(self, path: str) -> None:
+        """
+        Writes the full state of the system to `path` in the compact
+        binary format of `snapshot.py`: account ids, balances, outgoing
+        totals, merge links, the payment ledger columns and every balance
+        history. Pending refunds are not stored separately, they are the
+        payments still `IN_PROGRESS` (in lazy mode every account is
+        settled first, so that holds there too).
+        With a journal attached, it is synced first and the snapshot
+        records its sequence number, so recovery replays only what came
+        after.
+        """
+        journal_sequence = 0
+        if self._journal is not None:
+            self._journal.sync()
+            journal_sequence = self._journal.sequence
+        if self._refunds is not None:
+            self._settle_all() # due refunds of compacted payments live only in the per-account schedules
+
+        handles = self._handles.values() # live accounts in creation order
+        encoded = [account_id.encode() for account_id in self._account_ids]
+        payments = self._payments
+        index_accounts, index_lengths, index_ordinals = payments.index_columns()
+        histories = [history for history in self._histories if history is not None]
+
+        write_snapshot(path, {
+            "header": array("q", [SNAPSHOT_VERSION, payments._watermark]),
+            "journal_seq": array("q", [journal_sequence]),
+            "settled_to": array("q", [self._settled_to]), # lazy settlement watermark (0 when eager)
+            "id_offsets": array("q", accumulate(map(len, encoded), initial=0)),
+            "ids": b"".join(encoded),
+            "live": array("q", handles),
+            "created": array("q", (self._accounts._timestamps[handle] for handle in handles)),
+            "balances": array("q", (self._balances[handle] for handle in handles)),
+            "outgoing": array("q", (self._outgoing[handle] for handle in handles)),
+            "merged_into": array("q", chain.from_iterable(self._merged_into.items())), # (merged, parent) pairs
+            "pay_owners": payments._owners,
+            "pay_status": array("B", payments._status),
+            "pay_times": payments._timestamps,
+            "pay_cashback": payments._cashback,
+            "pay_idx_accounts": index_accounts,
+            "pay_idx_lengths": index_lengths,
+            "pay_idx_ordinals": index_ordinals,
+            "hist_lengths": array("q", (len(history) if history is not None else 0 for history in self._histories)), # 0: never changed
+            "hist_times": array("q", chain.from_iterable(history._times for history in histories)),
+            "hist_deltas": array("q", chain.from_iterable(history._deltas for history in histories)),
+            "hist_balances": array("q", (history.balance if history is not None else 0 for history in self._histories)),
+            "hist_closed": array("q", (history.closed_at or 0 if history is not None else 0 for history in self._histories)),
+            **{f"win_{window}": windowed.state() for window, windowed in self._windows.items()}, # bucketed spending
+        })
+
+    def _schedule_pending(self):
+        # rebuilds the refund schedules from the ledger: pending refunds are the payments still in progress, 
+        # in lazy mode scheduled per (surviving) account; in due order, which the FIFO schedules of monotonic mode rely on 
+        self._cashback_schedule = self._schedule_type()
+        pending = sorted((self._payments.timestamp(ordinal) + CASHBACK_DELAY, ordinal) for ordinal in self._payments.pending())
+        if self._refunds is not None:
+            self._refunds = {}
+            for due, ordinal in pending:
+                handle = self._resolve(self._payments.owner(ordinal))
+                refunds = self._refunds.get(handle)
+                if refunds is None:
+                    refunds = self._refunds[handle] = self._schedule_type()
+                refunds.schedule(due, ordinal, (ordinal, due, self._payments.cashback(ordinal)))
+        else:
+            self._cashback_schedule.schedule_many([(due, ordinal, ordinal) for due, ordinal in pending])
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Replaces the state of the system with the snapshot at `path`.
+        The account store type, history retention, payment ledger
+        settings, spender windows, event sink and journal of this instance
+        are kept.
+        Returns the journal sequence number the snapshot covers (0 if it
+        was saved without a journal).
+        """
+        sections = read_snapshot(path)
+        version, watermark = sections["header"]
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {version}")
+
+        offsets, blob = sections["id_offsets"], sections["ids"].tobytes()
+        account_ids = [blob[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+        pairs = sections["merged_into"]
+        merged_into = dict(zip(pairs[::2], pairs[1::2]))
+
+        # accounts, restored in place into the store (its maps and columns are shared with the engine's tables) 
+        live = sections["live"]
+        self._accounts.restore(account_ids, live, sections["created"], sections["balances"])
+        account_ids = self._account_ids
+        self._outgoing = SpenderLeaderboard(names=account_ids)
+        self._outgoing.load(dict(zip(live, sections["outgoing"])))
+        self._windows = {window: WindowedLeaderboard(window, names=account_ids) for window in self._windows}
+        for window, windowed in self._windows.items(): # empty if the snapshot was saved without this window
+            windowed.load(sections.get(f"win_{window}", array("q")))
+
+        self._merged_into = merged_into
+        self._payments.restore(sections["pay_owners"], bytearray(sections["pay_status"]), sections["pay_times"],
+                               sections["pay_cashback"], watermark, ((parent, merged) for merged, parent in merged_into.items()),
+                               (sections["pay_idx_accounts"], sections["pay_idx_lengths"], sections["pay_idx_ordinals"]))
+        self._payments.account_ids = account_ids
+
+        self._schedule_pending()
+        self._settled_to = sections["settled_to"][0] if "settled_to" in sections else 0
+        if self._refunds is not None:
+            self._payments.settled_through = self._settled_to - CASHBACK_DELAY
+
+        self._closed_histories = {}
+        times, deltas, retention = sections["hist_times"], sections["hist_deltas"], self._history_retention
+        bounds = list(accumulate(sections["hist_lengths"], initial=0))
+        self._histories = [BalanceHistory.from_columns(times[bounds[i]:bounds[i + 1]], deltas[bounds[i]:bounds[i + 1]], balance, retention)
+                           if bounds[i + 1] > bounds[i] else None for i, balance in enumerate(sections["hist_balances"])]
+        # monotonic mode: operations continue from the latest change in the snapshot 
+        self._clock = max(self._settled_to, max(times, default=0), max(sections["created"], default=0))
+        hist_closed = sections["hist_closed"]
+        for handle in sorted(merged_into): # handles of one account_id are merged away in creation order 
+            history = self._histories[handle]
+            history.closed_at = hist_closed[handle]
+            self._closed_histories.setdefault(account_ids[handle], []).append(history)
+
+        return sections["journal_seq"][0] if "journal_seq" in sections else 0
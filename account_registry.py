@@ -0,0 +1,127 @@
+class AccountRegistry:
+    """
+    Hash-indexed store of `Account` objects keyed by `account_id`.
+    Lookup, insert and removal are O(1); iteration follows account
+    creation order (dicts preserve insertion order).
+    """
+
+    def __init__(self):
+        self._accounts = {} # dict(key: account_id; value: Account)
+
+    def get(self, account_id: str):
+        return self._accounts.get(account_id) # None if account not found
+
+    def add(self, account) -> bool:
+        if account._account_id in self._accounts:
+            return False
+        self._accounts[account._account_id] = account
+        return True
+
+    def remove(self, account_id: str):
+        return self._accounts.pop(account_id, None) # removed Account or None
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._accounts
+
+    def __iter__(self):
+        return iter(self._accounts.values())
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+
+class AccountColumn:
+    """
+    One attribute (e.g. `_balance`) of a handle-indexed list of account
+    objects, read and written like an array column of
+    `ColumnarAccountStore`.
+    """
+
+    __slots__ = ("_accounts", "_name")
+
+    def __init__(self, accounts: list, name: str):
+        self._accounts = accounts # handle -> account object (None once removed)
+        self._name = name
+
+    def __getitem__(self, handle: int):
+        return getattr(self._accounts[handle], self._name)
+
+    def __setitem__(self, handle: int, value) -> None:
+        setattr(self._accounts[handle], self._name, value)
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+
+class IndexedAccountRegistry:
+    """
+    `AccountRegistry` behind the handle interface of
+    `ColumnarAccountStore` (`create`, `restore`, the id <-> handle maps
+    and the `_balances`/`_timestamps` columns), so the Level 4 engine
+    can keep its accounts as objects. Accounts already in the registry
+    get handles in creation order; handles are never reused.
+    """
+
+    def __init__(self, registry: AccountRegistry, account_type):
+        self._registry = registry
+        self._account_type = account_type # called as account_type(timestamp, account_id)
+        self._handles = {} # dict(key: account_id; value: handle)
+        self._account_ids = [] # handle -> account_id
+        self._by_handle = [] # handle -> account (None once removed)
+        self._balances = AccountColumn(self._by_handle, "_balance")
+        self._timestamps = AccountColumn(self._by_handle, "_timestamp")
+        for account in registry:
+            self._index(account)
+
+    def _index(self, account) -> int:
+        handle = len(self._account_ids)
+        self._handles[account._account_id] = handle
+        self._account_ids.append(account._account_id)
+        self._by_handle.append(account)
+        return handle
+
+    def create(self, account_id: str, timestamp: int) -> int | None:
+        # new account with balance 0, returns its handle (None if account_id is taken)
+        account = self._account_type(timestamp, account_id)
+        if not self._registry.add(account):
+            return None
+        return self._index(account)
+
+    def restore(self, account_ids: list, live, created, balances):
+        # same as ColumnarAccountStore.restore, with new account objects for the live handles
+        for account_id in self._handles:
+            self._registry.remove(account_id)
+        self._handles.clear()
+        self._account_ids[:] = account_ids
+        self._by_handle[:] = [None] * len(account_ids)
+        for handle, timestamp, balance in zip(live, created, balances):
+            account = self._account_type(timestamp, account_ids[handle])
+            account._balance = balance
+            self._registry.add(account)
+            self._handles[account._account_id] = handle
+            self._by_handle[handle] = account
+
+    def get(self, account_id: str):
+        return self._registry.get(account_id) # None if account not found
+
+    def add(self, account) -> bool:
+        if not self._registry.add(account):
+            return False
+        self._index(account)
+        return True
+
+    def remove(self, account_id: str):
+        handle = self._handles.pop(account_id, None)
+        if handle is None:
+            return None
+        self._by_handle[handle] = None
+        return self._registry.remove(account_id) # removed account
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._handles
+
+    def __iter__(self):
+        return iter(self._registry)
+
+    def __len__(self) -> int:
+        return len(self._registry)
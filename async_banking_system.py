@@ -0,0 +1,142 @@
+"""
+asyncio front-end for the Level 4 `BankingSystemImpl`.
+
+Calls are queued to a single writer task, which drains every command
+queued so far (waiting up to `linger` seconds for more, at most
+`max_batch` per batch) and runs them as one `apply_batch` call on a
+dedicated worker thread. The event loop never runs engine code itself,
+so a long cashback sweep delays results but never stalls other
+coroutines; commands still apply one at a time in call order. Each
+caller gets its own command's result or exception: a failing command
+does not fail the others in its batch.
+
+    async with AsyncBankingSystem() as bank:
+        await bank.create_account(1, "account1")
+        await bank.deposit(2, "account1", 500)
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from Level_4.level_4_banking_system_impl import BankingSystemImpl, OutOfOrderTimestampError
+
+
+class AsyncBankingSystem:
+    """
+    Coroutine interface to a `BankingSystemImpl` (a new one by default,
+    or any engine with its `apply_batch` options, e.g. a
+    `ConcurrentBankingSystem`) with the same methods and results; see
+    the module docstring.
+    """
+
+    def __init__(self, system=None, max_batch: int = 1024, linger: float = 0.0):
+        self._system = system if system is not None else BankingSystemImpl()
+        self._max_batch = max_batch
+        self._linger = linger # seconds to wait for more commands before running a batch
+        self._queue = asyncio.Queue() # (command, future); None stops the writer
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="banking-writer")
+        self._writer = None # writer task, started by the first call
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        # applies everything already queued, then stops the writer
+        if self._writer is not None:
+            self._queue.put_nowait(None)
+            await self._writer
+            self._writer = None
+        self._executor.shutdown()
+
+    async def _call(self, *command):
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._write())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((command, future))
+        return await future
+
+    def _apply(self, commands: list) -> list:
+        # runs on the worker thread; errors are returned rather than raised through the writer task, 
+        # whose frame would otherwise end up in tracebacks handed to callers (clearing it kills the task) 
+        try:
+            return self._system.apply_batch(commands, return_exceptions=True)
+        except (ValueError, OutOfOrderTimestampError): # rejected before any command ran: run them one by one 
+            pass
+        except Exception as error: # raised once the commands ran (e.g. a failed journal sync), they must not run again 
+            return [error] * len(commands)
+        results = []
+        for command in commands:
+            try:
+                results.extend(self._system.apply_batch([command], return_exceptions=True))
+            except Exception as error:
+                results.append(error)
+        return results
+
+    async def _write(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+
+            # coalesce: take whatever else is queued, lingering briefly for more
+            deadline = loop.time() + self._linger
+            while len(batch) < self._max_batch:
+                if self._queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except TimeoutError:
+                        break
+                else:
+                    item = self._queue.get_nowait()
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            results = await loop.run_in_executor(self._executor, self._apply, [command for command, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if future.done(): # the caller may have been cancelled
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+    async def create_account(self, timestamp: int, account_id: str) -> bool:
+        return await self._call("create_account", timestamp, account_id)
+
+    async def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
+        return await self._call("deposit", timestamp, account_id, amount)
+
+    async def transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
+        return await self._call("transfer", timestamp, source_account_id, target_account_id, amount)
+
+    async def top_spenders(self, timestamp: int, n: int) -> list[str]:
+        return await self._call("top_spenders", timestamp, n)
+
+    async def top_spenders_window(self, timestamp: int, n: int, window: int) -> list[str] | None:
+        return await self._call("top_spenders_window", timestamp, n, window)
+
+    async def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
+        return await self._call("pay", timestamp, account_id, amount)
+
+    async def get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        return await self._call("get_payment_status", timestamp, account_id, payment)
+
+    async def list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        return await self._call("list_payments", timestamp, account_id, status)
+
+    async def merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        return await self._call("merge_accounts", timestamp, account_id_1, account_id_2)
+
+    async def get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        return await self._call("get_balance", timestamp, account_id, time_at)
@@ -0,0 +1,130 @@
+from array import array
+from bisect import bisect_right
+
+
+CHECKPOINT_INTERVAL = 64 # entries between absolute balance checkpoints
+
+
+class BalanceHistory:
+    """
+    Timestamp-sorted balance log of one account.
+    Entries are stored as int64 columns of change timestamps and balance
+    deltas, with the absolute balance checkpointed every
+    `CHECKPOINT_INTERVAL` entries. A point-in-time query is a binary
+    search over the timestamps plus at most `CHECKPOINT_INTERVAL - 1`
+    delta additions. Changes at the same timestamp share one entry.
+    With `retention` set, entries older than `retention` before the
+    latest change are folded into a single checkpoint, which bounds the
+    storage of long-lived accounts; queries before the retained window
+    return `None`.
+    """
+
+    def __init__(self, created_at: int, retention: int | None = None):
+        self._times = array("q", [created_at]) # entry timestamps, ascending
+        self._deltas = array("q", [0]) # balance change of each entry
+        self._checkpoints = array("q", [0]) # balance after entry i * CHECKPOINT_INTERVAL
+        self._balance = 0 # balance after the latest entry
+        self._retention = retention
+        self.closed_at = None # timestamp the account was removed at (merged away), if any
+
+    @classmethod
+    def from_columns(cls, times: array, deltas: array, balance: int, retention: int | None = None, closed_at: int | None = None):
+        """
+        Rebuilds a history from its saved timestamp and delta columns and
+        latest balance (e.g. from a snapshot); checkpoints are recomputed.
+        """
+        history = cls.__new__(cls)
+        history._times = times
+        history._deltas = deltas
+        history._balance = balance
+        history._retention = retention
+        history.closed_at = closed_at
+        if len(deltas) <= CHECKPOINT_INTERVAL: # short history, the only checkpoint is the first entry
+            history._checkpoints = array("q", deltas[:1])
+        else:
+            history._checkpoints = array("q")
+            history._rebuild_checkpoints(0)
+        return history
+
+    @property
+    def balance(self) -> int:
+        return self._balance
+
+    def add(self, timestamp: int, delta: int):
+        """
+        Records a balance change of `delta` at `timestamp`.
+        Changes are expected in timestamp order (an append); an earlier
+        timestamp is inserted in place and shifts every later balance.
+        """
+        times = self._times
+        last = len(times) - 1
+        self._balance += delta
+
+        if timestamp == times[last]:
+            self._deltas[last] += delta
+            if last % CHECKPOINT_INTERVAL == 0:
+                self._checkpoints[-1] += delta
+        elif timestamp > times[last]:
+            times.append(timestamp)
+            self._deltas.append(delta)
+            if (last + 1) % CHECKPOINT_INTERVAL == 0:
+                self._checkpoints.append(self._balance)
+                if self._retention is not None:
+                    self.compact(timestamp - self._retention)
+        else:
+            self._insert(timestamp, delta)
+
+    def balance_at(self, time_at: int) -> int | None:
+        """
+        Returns the balance after all changes at or before `time_at`, or
+        `None` if `time_at` is before the (retained) history or at/after
+        the account was closed.
+        """
+        if time_at < self._times[0] or (self.closed_at is not None and time_at >= self.closed_at):
+            return None
+        return self._balance_at_index(bisect_right(self._times, time_at) - 1)
+
+    def close(self, timestamp: int):
+        self.closed_at = timestamp
+
+    def compact(self, horizon: int):
+        """
+        Folds every entry before the last one at or before `horizon`
+        into that entry, so balances from `horizon` on stay exact.
+        """
+        keep_from = bisect_right(self._times, horizon) - 1
+        if keep_from <= 0:
+            return
+        base = self._balance_at_index(keep_from)
+        del self._times[:keep_from]
+        del self._deltas[:keep_from]
+        self._deltas[0] = base
+        self._rebuild_checkpoints(0)
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    def _balance_at_index(self, index: int) -> int:
+        block = index // CHECKPOINT_INTERVAL
+        start = block * CHECKPOINT_INTERVAL + 1
+        return self._checkpoints[block] + sum(self._deltas[start:index + 1])
+
+    def _insert(self, timestamp: int, delta: int):
+        # slow path for out-of-order changes
+        index = bisect_right(self._times, timestamp)
+        if index > 0 and self._times[index - 1] == timestamp:
+            self._deltas[index - 1] += delta
+            self._rebuild_checkpoints(index - 1)
+        else:
+            self._times.insert(index, timestamp)
+            self._deltas.insert(index, delta)
+            self._rebuild_checkpoints(index)
+
+    def _rebuild_checkpoints(self, from_index: int):
+        block = from_index // CHECKPOINT_INTERVAL
+        del self._checkpoints[block:]
+        balance = self._balance_at_index(block * CHECKPOINT_INTERVAL - 1) if block > 0 else 0
+        for i in range(block * CHECKPOINT_INTERVAL, len(self._deltas)):
+            balance += self._deltas[i]
+            if i % CHECKPOINT_INTERVAL == 0:
+                self._checkpoints.append(balance)
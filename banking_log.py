@@ -0,0 +1,29 @@
+import json
+import logging
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns the logger for `name` with a `NullHandler` attached, so
+    the banking system stays silent unless the application configures
+    logging (e.g. `logging.basicConfig(level=logging.DEBUG)`).
+    Messages use %-style arguments, which are only formatted when the
+    level is enabled.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.addHandler(logging.NullHandler())
+    return logger
+
+
+class JsonLinesEventSink:
+    """
+    Structured event sink that writes each event as one JSON object per
+    line to `stream`, for audit output.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def __call__(self, event: dict):
+        self._stream.write(json.dumps(event) + "\n")
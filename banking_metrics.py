@@ -0,0 +1,207 @@
+"""
+Operation metrics for the Level 4 `BankingSystemImpl`.
+
+    metrics = BankingMetrics()
+    system.set_metrics(metrics)
+    ...
+    system.get_metrics() # dict of counters, gauges and latency summaries
+    metrics.write_prometheus("bank.prom") # Prometheus text exposition format
+
+Attaching metrics replaces the engine's operation bodies and its
+cashback sweep with timed wrappers on that instance only; with no
+metrics attached the class methods run untouched, so instrumentation
+off costs nothing. Operation latencies exclude the cashback sweep that
+runs before them, which is timed on its own, so a latency spike can be
+told apart from a large refund sweep.
+"""
+import os
+import time
+from bisect import bisect_left
+
+
+# histogram bucket upper bounds (Prometheus `le`), seconds for latencies
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+                   1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+REFUND_BUCKETS = (0, 1, 2, 5, 10, 50, 100, 500, 1000, 5000, 10000) # refunds settled by one sweep
+
+# operation name -> engine method timed for it (the body without the sweep where there is one)
+INSTRUMENTED_OPERATIONS = {
+    "create_account": "_create_account",
+    "deposit": "_deposit",
+    "transfer": "_transfer",
+    "top_spenders": "top_spenders",
+    "top_spenders_window": "top_spenders_window",
+    "pay": "_pay",
+    "get_payment_status": "_get_payment_status",
+    "list_payments": "_list_payments",
+    "merge_accounts": "_merge_accounts",
+    "get_balance": "_get_balance",
+}
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram: a count per bucket plus the sum and count
+    of all observations.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # last bucket is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float):
+        # upper bound of the bucket holding the q-quantile (None if empty, inf past the last bound)
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self) -> dict:
+        return {"count": self.count, "sum": self.sum, "mean": self.sum / self.count if self.count else None,
+                "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99)}
+
+
+class BankingMetrics:
+    """
+    Counters, gauges and histograms of one engine: per-operation
+    latency and failure counts (calls returning None or False), cashback
+    sweep latency and refunds per sweep, cashback queue depth and the
+    total n requested from `top_spenders`.
+    """
+
+    def __init__(self):
+        self.operations = {name: Histogram(LATENCY_BUCKETS) for name in INSTRUMENTED_OPERATIONS}
+        self.failures = dict.fromkeys(INSTRUMENTED_OPERATIONS, 0)
+        self.sweep_seconds = Histogram(LATENCY_BUCKETS)
+        self.sweep_refunds = Histogram(REFUND_BUCKETS)
+        self.top_spenders_requested = 0
+        self._system = None # instrumented engine, read for the cashback queue depth
+
+    def instrument(self, system):
+        """
+        Installs timed wrappers of the operation bodies and the cashback
+        sweep on `system` (normally via `system.set_metrics`).
+        """
+        self._system = system
+        for name, attribute in INSTRUMENTED_OPERATIONS.items():
+            setattr(system, attribute, self._timed(name, getattr(system, attribute)))
+        system._process_cash_back = self._timed_sweep(system._process_cash_back)
+
+    @property
+    def cashback_queue_depth(self) -> int:
+        # refunds scheduled and not yet settled, read when asked: in lazy mode they wait in per-account schedules
+        system = self._system
+        if system is None:
+            return 0
+        if system._refunds is not None:
+            return sum(len(refunds) for refunds in system._refunds.values())
+        return len(system._cashback_schedule)
+
+    @staticmethod
+    def uninstrument(system):
+        # drops the wrappers, the class methods apply again
+        for attribute in (*INSTRUMENTED_OPERATIONS.values(), "_process_cash_back"):
+            system.__dict__.pop(attribute, None)
+
+    def _timed(self, name: str, method):
+        clock, histogram, failures = time.perf_counter, self.operations[name], self.failures
+
+        def timed(*args, **kwargs):
+            start = clock()
+            result = method(*args, **kwargs)
+            histogram.observe(clock() - start)
+            if result is None or result is False:
+                failures[name] += 1
+            return result
+
+        if name == "top_spenders":
+            def timed_top_spenders(timestamp, n):
+                self.top_spenders_requested += n
+                return timed(timestamp, n)
+            return timed_top_spenders
+        return timed
+
+    def _timed_sweep(self, sweep):
+        clock = time.perf_counter
+
+        def timed_sweep(curr_timestamp):
+            start = clock()
+            settled = sweep(curr_timestamp)
+            self.sweep_seconds.observe(clock() - start)
+            self.sweep_refunds.observe(settled)
+            return settled
+
+        return timed_sweep
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current values: per operation the call count,
+        failures and latency (seconds: sum, mean, bucket-bound p50/p90/p99),
+        and the cashback and top_spenders figures.
+        """
+        return {
+            "operations": {name: {**histogram.summary(), "failures": self.failures[name]}
+                           for name, histogram in self.operations.items()},
+            "cashback_sweep": {**self.sweep_seconds.summary(), "refunds": self.sweep_refunds.sum,
+                               "max_refunds_bucket": self.sweep_refunds.quantile(1.0)},
+            "cashback_queue_depth": self.cashback_queue_depth,
+            "top_spenders_requested": self.top_spenders_requested,
+        }
+
+    def prometheus_text(self, prefix: str = "banking") -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def histogram_lines(name: str, histogram: Histogram, labels: str = ""):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {histogram.sum}")
+            lines.append(f"{name}_count{suffix} {histogram.count}")
+
+        lines.append(f"# HELP {prefix}_operation_seconds Operation latency, excluding the cashback sweep before it.")
+        lines.append(f"# TYPE {prefix}_operation_seconds histogram")
+        for name, histogram in self.operations.items():
+            histogram_lines(f"{prefix}_operation_seconds", histogram, f'operation="{name}"')
+        lines.append(f"# HELP {prefix}_operation_failures_total Operations that returned None or False.")
+        lines.append(f"# TYPE {prefix}_operation_failures_total counter")
+        for name, failures in self.failures.items():
+            lines.append(f'{prefix}_operation_failures_total{{operation="{name}"}} {failures}')
+
+        lines.append(f"# HELP {prefix}_cashback_sweep_seconds Latency of one cashback sweep.")
+        lines.append(f"# TYPE {prefix}_cashback_sweep_seconds histogram")
+        histogram_lines(f"{prefix}_cashback_sweep_seconds", self.sweep_seconds)
+        lines.append(f"# HELP {prefix}_cashback_sweep_refunds Refunds settled per cashback sweep.")
+        lines.append(f"# TYPE {prefix}_cashback_sweep_refunds histogram")
+        histogram_lines(f"{prefix}_cashback_sweep_refunds", self.sweep_refunds)
+        lines.append(f"# HELP {prefix}_cashback_queue_depth Refunds scheduled and not yet credited.")
+        lines.append(f"# TYPE {prefix}_cashback_queue_depth gauge")
+        lines.append(f"{prefix}_cashback_queue_depth {self.cashback_queue_depth}")
+        lines.append(f"# HELP {prefix}_top_spenders_requested_total Sum of n over top_spenders calls.")
+        lines.append(f"# TYPE {prefix}_top_spenders_requested_total counter")
+        lines.append(f"{prefix}_top_spenders_requested_total {self.top_spenders_requested}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "banking"):
+        # atomic replace, so a scraper (e.g. the node exporter textfile collector) never reads a partial file
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as output:
+            output.write(self.prometheus_text(prefix))
+        os.replace(tmp_path, path)
@@ -0,0 +1,57 @@
+"""
+Memory benchmark for the account representations.
+
+Run from the repository root:
+    python3 benchmarks/account_memory.py [number_of_accounts]
+"""
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import gc
+import tracemalloc
+
+from account_registry import AccountRegistry
+from columnar_account_store import ColumnarAccountStore
+from Level_4.level_4_banking_system_impl import Account
+
+
+class DictAccount:
+    # the original Account layout, with a per-instance __dict__
+    def __init__(self, timestamp: int, account_id: str):
+        self._timestamp = timestamp
+        self._account_id = account_id
+
+        self._balance = 0
+
+
+def measure(make_store, account_cls, n: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    store = make_store()
+    for i in range(n):
+        account = account_cls(i, f"account{i}")
+        account._balance = i * 7 # non-trivial balances, like a live book
+        store.add(account)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del store
+    return size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = [
+        ("dict Account + AccountRegistry", measure(AccountRegistry, DictAccount, n)),
+        ("__slots__ Account + AccountRegistry", measure(AccountRegistry, Account, n)),
+        ("ColumnarAccountStore", measure(ColumnarAccountStore, Account, n)),
+    ]
+    baseline = results[0][1]
+    print(f"{n} accounts")
+    for name, size in results:
+        print(f"{name:40s} {size / 2**20:8.1f} MiB  {size / n:6.1f} B/account  {100 * size / baseline:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Micro-benchmarks for every operation of each Level's `BankingSystemImpl`.
+
+Every scenario (level x account count x payment backlog x top-n size)
+starts from the same synthetic book: `accounts` funded accounts with
+some transfer history and `backlog` payments whose cashback is still
+pending. Each supported operation is then timed call by call on a fresh
+copy of that book, followed by each operation mix. Results (ops/sec and
+latency percentiles) are printed and can be saved as JSON and compared
+against an earlier run.
+
+Run from the repository root:
+    python3 benchmarks/operations.py --levels 3 4 --accounts 1000 100000 --backlog 0 50000 --output run.json
+    python3 benchmarks/operations.py --compare run.json # exits 1 if any benchmark got slower than --threshold
+"""
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import argparse
+import importlib
+import json
+import platform
+import random
+import time
+from itertools import product
+
+from banking_system import BankingSystem
+
+
+OPERATIONS = ("create_account", "deposit", "transfer", "top_spenders", "pay", "get_payment_status",
+              "list_payments", "merge_accounts", "get_balance")
+
+# operation mixes, as relative weights; operations a level does not implement are left out
+MIXES = {
+    "balanced": {"deposit": 25, "transfer": 25, "pay": 15, "get_payment_status": 10, "get_balance": 15,
+                 "top_spenders": 5, "list_payments": 4, "create_account": 1},
+    "read_heavy": {"get_balance": 40, "get_payment_status": 25, "list_payments": 15, "top_spenders": 10,
+                   "deposit": 5, "transfer": 5},
+    "write_heavy": {"deposit": 35, "transfer": 35, "pay": 25, "create_account": 4, "merge_accounts": 1},
+}
+
+DAY = 86400000 # milliseconds
+
+
+def load_level(level: int):
+    module = importlib.import_module(f"Level_{level}.level_{level}_banking_system_impl")
+    return module.BankingSystemImpl
+
+
+def supported_operations(system_cls) -> list[str]:
+    # operations the level implements itself, not the interface's default stubs
+    return [name for name in OPERATIONS
+            if hasattr(system_cls, name) and getattr(system_cls, name) is not getattr(BankingSystem, name, None)]
+
+
+class Workload:
+    """
+    Synthetic book for one scenario plus deterministic argument
+    generators for each operation.
+    """
+
+    def __init__(self, system_cls, accounts: int, backlog: int, top_n: int, seed: int = 0):
+        self.system_cls = system_cls
+        self.accounts = accounts
+        self.backlog = backlog
+        self.top_n = top_n
+        self.seed = seed
+        self.operations = supported_operations(system_cls)
+
+    def build(self):
+        """
+        Returns a fresh system holding the scenario's book. Setup runs at
+        timestamps below `DAY`, so no refund comes due while measuring.
+        """
+        rng = random.Random(self.seed)
+        system = self.system_cls()
+        self.ids = [f"account{i}" for i in range(self.accounts)]
+        self.payments = [] # (account_id, payment_id) of the backlog
+        timestamp = 1
+        for account_id in self.ids:
+            system.create_account(timestamp, account_id)
+            system.deposit(timestamp, account_id, 1_000_000)
+        for _ in range(min(self.accounts, 10_000)): # outgoing totals for the leaderboard
+            timestamp += 1
+            system.transfer(timestamp, rng.choice(self.ids), rng.choice(self.ids), rng.randint(1, 1000))
+        if "pay" in self.operations:
+            for _ in range(self.backlog):
+                timestamp += 1
+                account_id = rng.choice(self.ids)
+                payment_id = system.pay(timestamp, account_id, rng.randint(1, 100))
+                if payment_id is not None:
+                    self.payments.append((account_id, payment_id))
+        self.timestamp = timestamp
+        self.created = 0
+        self.merged = 0
+        self.rng = rng
+        return system
+
+    def arguments(self, operation: str) -> tuple:
+        # arguments of the next call of operation, at the next timestamp
+        rng, ids = self.rng, self.ids
+        self.timestamp += 1
+        timestamp = self.timestamp
+        if operation == "create_account":
+            self.created += 1
+            return timestamp, f"new{self.created}"
+        if operation == "deposit":
+            return timestamp, rng.choice(ids), rng.randint(1, 1000)
+        if operation == "transfer":
+            return timestamp, rng.choice(ids), rng.choice(ids), rng.randint(1, 1000)
+        if operation == "top_spenders":
+            return timestamp, self.top_n
+        if operation == "pay":
+            return timestamp, rng.choice(ids), rng.randint(1, 100)
+        if operation == "get_payment_status":
+            if self.payments:
+                return (timestamp, *rng.choice(self.payments))
+            return timestamp, rng.choice(ids), "payment1"
+        if operation == "list_payments":
+            account_id = rng.choice(self.payments)[0] if self.payments else rng.choice(ids)
+            return timestamp, account_id
+        if operation == "merge_accounts":
+            # disjoint pairs, so every merge is a real one while accounts last
+            self.merged += 2
+            return timestamp, ids[(self.merged - 2) % len(ids)], ids[(self.merged - 1) % len(ids)]
+        if operation == "get_balance":
+            return timestamp, rng.choice(ids), rng.randint(1, timestamp)
+        raise ValueError(f"Unknown operation: {operation}")
+
+
+def percentile(sorted_values: list, fraction: float):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def summarize(latencies_ns: list) -> dict:
+    latencies_ns = sorted(latencies_ns)
+    total = sum(latencies_ns)
+    return {
+        "calls": len(latencies_ns),
+        "ops_per_sec": round(len(latencies_ns) / (total / 1e9), 1) if total else None,
+        "p50_us": round(percentile(latencies_ns, 0.50) / 1e3, 2),
+        "p90_us": round(percentile(latencies_ns, 0.90) / 1e3, 2),
+        "p99_us": round(percentile(latencies_ns, 0.99) / 1e3, 2),
+        "max_us": round(latencies_ns[-1] / 1e3, 2),
+    }
+
+
+def time_calls(system, workload: Workload, operations: list) -> dict:
+    # times each call of the operations sequence, returns latencies (ns) per operation
+    clock = time.perf_counter_ns
+    latencies = {}
+    for operation in operations:
+        args = workload.arguments(operation)
+        method = getattr(system, operation)
+        start = clock()
+        method(*args)
+        latencies.setdefault(operation, []).append(clock() - start)
+    return latencies
+
+
+def run_scenario(level: int, accounts: int, backlog: int, top_n: int, calls: int, mixes: list, seed: int) -> list[dict]:
+    workload = Workload(load_level(level), accounts, backlog, top_n, seed)
+    scenario = {"level": level, "accounts": accounts, "backlog": backlog, "top_n": top_n}
+    results = []
+
+    for operation in workload.operations:
+        system = workload.build()
+        count = min(calls, accounts // 2) if operation == "merge_accounts" else calls
+        latencies = time_calls(system, workload, [operation] * count)
+        results.append({**scenario, "benchmark": operation, **summarize(latencies[operation])})
+
+    for mix in mixes:
+        weights = {name: weight for name, weight in MIXES[mix].items() if name in workload.operations}
+        system = workload.build()
+        sequence = random.Random(seed).choices(list(weights), list(weights.values()), k=calls)
+        latencies = time_calls(system, workload, sequence)
+        overall = summarize([latency for values in latencies.values() for latency in values])
+        results.append({**scenario, "benchmark": f"mix:{mix}", **overall,
+                        "operations": {name: summarize(values) for name, values in sorted(latencies.items())}})
+    return results
+
+
+def result_key(result: dict) -> tuple:
+    return result["level"], result["accounts"], result["backlog"], result["top_n"], result["benchmark"]
+
+
+def compare(results: list[dict], baseline_path: str, threshold: float) -> list[dict]:
+    """
+    Prints the ops/sec change of every benchmark also in the baseline
+    run and returns those slower by more than `threshold` (a fraction).
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = {result_key(result): result for result in json.load(baseline_file)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get(result_key(result))
+        if before is None or not before["ops_per_sec"] or not result["ops_per_sec"]:
+            continue
+        change = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressions.append(result)
+            flag = "  REGRESSION"
+        print(f"L{result['level']} {result['accounts']:>8} {result['backlog']:>8} {result['top_n']:>4} "
+              f"{result['benchmark']:20s} {before['ops_per_sec']:>12.0f} -> {result['ops_per_sec']:>12.0f} {100 * change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every BankingSystemImpl operation.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--accounts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backlog", type=int, nargs="+", default=[0, 10000], help="pending payments before measuring")
+    parser.add_argument("--top-n", type=int, nargs="+", default=[10])
+    parser.add_argument("--mix", nargs="*", default=list(MIXES), choices=list(MIXES))
+    parser.add_argument("--calls", type=int, default=2000, help="calls per operation and per mix")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown counted as a regression")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'level':>5} {'accounts':>8} {'backlog':>8} {'top_n':>5} {'benchmark':20s} {'ops/sec':>12} "
+          f"{'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'max us':>10}")
+    for level, accounts, backlog, top_n in product(args.levels, args.accounts, args.backlog, args.top_n):
+        for result in run_scenario(level, accounts, backlog, top_n, args.calls, args.mix, args.seed):
+            results.append(result)
+            print(f"{level:>5} {accounts:>8} {backlog:>8} {top_n:>5} {result['benchmark']:20s} {result['ops_per_sec'] or 0:>12.0f} "
+                  f"{result['p50_us']:>9.2f} {result['p90_us']:>9.2f} {result['p99_us']:>9.2f} {result['max_us']:>10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                                "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args)},
+                       "results": results}, output, indent=1)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
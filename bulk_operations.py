@@ -0,0 +1,143 @@
+"""
+Bulk deposits and payments for the Level 4 `BankingSystemImpl`, used by
+its `bulk_deposit` and `bulk_pay` methods.
+
+Rows are `(handle, amount)` pairs, all at one timestamp, with the same
+per-row results as calling `deposit` / `pay` row by row. With NumPy
+installed the rows are processed as arrays: the balances of the
+distinct accounts are gathered into one column, validity and funds
+checks, running balances (prefix sums per account) and cashback are
+computed vectorized, and every account, balance history and leaderboard
+entry is written once per bulk instead of once per row. Payments of an
+account whose running total would overdraw it at some row are replayed
+row by row for that account only, which keeps per-row success exact.
+Without NumPy (or with an event sink attached, which wants one event
+per row) the rows go through the per-row operation bodies.
+"""
+from cashback_scheduler import CASHBACK_DELAY
+
+try:
+    import numpy as np
+except ImportError: # optional, the row-by-row path is used instead
+    np = None
+
+
+def _live_of(system, handles) -> list:
+    # whether each handle is an existing account (False for unknown or merged-away handles)
+    is_live = system._is_live
+    return [is_live(handle) for handle in handles]
+
+
+def deposit_rows(system, timestamp: int, handles, amounts) -> list:
+    if np is None or system._event_sink is not None:
+        account_ids = system._account_ids
+        return [system._deposit(timestamp, account_ids[handle], amount) if live else None
+                for handle, amount, live in zip(handles, amounts, _live_of(system, handles))]
+
+    handles, amounts = np.asarray(handles, dtype=np.int64), np.asarray(amounts, dtype=np.int64)
+    if not len(handles):
+        return []
+    unique, inverse, balances, exists = _gather(system, handles)
+    ok = exists[inverse] & (amounts > 0)
+    running, totals = _running_totals(np.where(ok, amounts, 0), _groups(inverse, len(unique)))
+    after = balances[inverse] + running
+
+    column = system._balances
+    for handle, total in zip(unique.tolist(), totals.tolist()):
+        if total:
+            column[handle] += total
+            system._history(handle).add(timestamp, total)
+    return [balance if success else None for balance, success in zip(after.tolist(), ok.tolist())]
+
+
+def pay_rows(system, timestamp: int, handles, amounts) -> list:
+    if np is None or system._event_sink is not None:
+        account_ids = system._account_ids
+        return [system._pay(timestamp, account_ids[handle], amount) if live else None
+                for handle, amount, live in zip(handles, amounts, _live_of(system, handles))]
+
+    handles, amounts = np.asarray(handles, dtype=np.int64), np.asarray(amounts, dtype=np.int64)
+    if not len(handles):
+        return []
+    unique, inverse, balances, exists = _gather(system, handles)
+    groups = _groups(inverse, len(unique))
+    live = exists[inverse]
+
+    # if an account's running total of payments never exceeds its balance, every one of its payments succeeds
+    running, _ = _running_totals(np.where(live, amounts, 0), groups)
+    ok = live & (running <= balances[inverse])
+    order, starts, ends = groups
+    for group in np.unique(inverse[live & ~ok]).tolist(): # overdrawn: replay that account's payments row by row
+        rows = order[starts[group]:ends[group] + 1]
+        balance = int(balances[group])
+        for row, amount in zip(rows.tolist(), amounts[rows].tolist()):
+            success = amount <= balance
+            ok[row] = success
+            if success:
+                balance -= amount
+
+    _, totals = _running_totals(np.where(ok, amounts, 0), groups)
+    paying = np.bincount(inverse[ok], minlength=len(unique))
+    outgoing, windows = system._outgoing, system._windows.values()
+    column = system._balances
+    for handle, total, count in zip(unique.tolist(), totals.tolist(), paying.tolist()):
+        if count:
+            column[handle] -= total
+            system._history(handle).add(timestamp, -total)
+            outgoing.add_outgoing(handle, total)
+            for windowed in windows:
+                windowed.add_outgoing(handle, timestamp, total)
+
+    # successful rows are numbered in row order, as consecutive pay calls would be
+    rows = np.flatnonzero(ok)
+    cashback = np.floor(amounts[rows] * 0.02).astype(np.int64) # same float rounding as _calculate_cashback
+    first = system._payments.add_many(handles[rows].tolist(), timestamp, cashback.tolist())
+    ordinals = range(first, first + len(rows))
+    due = timestamp + CASHBACK_DELAY
+    if system._refunds is None:
+        system._cashback_schedule.schedule_many([(due, ordinal, ordinal) for ordinal in ordinals])
+    else: # lazy settlement, refunds wait with their account
+        refunds = system._refunds
+        for handle, ordinal, owed in zip(handles[rows].tolist(), ordinals, cashback.tolist()):
+            schedule = refunds.get(handle)
+            if schedule is None:
+                schedule = refunds[handle] = system._schedule_type()
+            schedule.schedule(due, ordinal, (ordinal, due, owed))
+
+    results = [None] * len(handles)
+    for row, ordinal in zip(rows.tolist(), ordinals):
+        results[row] = "payment" + str(ordinal)
+    return results
+
+
+def _gather(system, handles):
+    # distinct handles, row -> distinct index, and per distinct handle: balance, whether it exists
+    # (the only per-account Python work besides the write back)
+    unique, inverse = np.unique(handles, return_inverse=True)
+    handles, live = unique.tolist(), _live_of(system, unique.tolist())
+    if system._refunds is not None: # lazy settlement: touched accounts settle first, like the row-by-row bodies
+        for handle, exists in zip(handles, live):
+            if exists:
+                system._settle(handle)
+    column = system._balances
+    balances = np.fromiter((column[handle] if exists else 0 for handle, exists in zip(handles, live)), np.int64, len(handles))
+    return unique, inverse, balances, np.array(live, dtype=bool)
+
+
+def _groups(inverse, groups: int) -> tuple:
+    # rows sorted by group keeping row order, and the first and last sorted position of each group
+    order = np.argsort(inverse, kind="stable")
+    starts = np.searchsorted(inverse[order], np.arange(groups))
+    ends = np.append(starts[1:], len(order)) - 1
+    return order, starts, ends
+
+
+def _running_totals(values, groups: tuple) -> tuple:
+    # per row: sum of its group's values up to and including the row, in row order; per group: the total
+    order, starts, ends = groups
+    grouped = values[order]
+    cumulative = np.cumsum(grouped)
+    before = cumulative[starts] - grouped[starts] # sum of the earlier groups
+    running = np.empty_like(cumulative)
+    running[order] = cumulative - np.repeat(before, ends - starts + 1)
+    return running, cumulative[ends] - before
@@ -0,0 +1,99 @@
+import heapq
+from collections import deque
+
+
+CASHBACK_DELAY = 86400000 # 24 hours in milliseconds, the unit for timestamps
+
+
+class CashbackScheduler:
+    """
+    Min-heap of pending cashback refunds keyed by due timestamp.
+    Each sweep only touches the refunds that are actually due, so its
+    cost does not grow with the number of payments still in flight.
+    """
+
+    def __init__(self):
+        self._heap = [] # entries: (due_timestamp, payment_number, payment), payment is the caller's key (e.g. payment id)
+
+    def schedule(self, due_timestamp: int, payment_number: int, payment):
+        heapq.heappush(self._heap, (due_timestamp, payment_number, payment))
+
+    def schedule_many(self, entries: list):
+        # entries: (due_timestamp, payment_number, payment) tuples; one heapify when they outnumber the heap
+        if len(entries) > len(self._heap):
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+    def merge(self, other: "CashbackScheduler"):
+        # moves every refund scheduled in other into this schedule
+        self.schedule_many(other._heap)
+        other._heap = []
+
+    def pop_due(self, curr_timestamp: int) -> list:
+        """
+        Removes and returns the payments of all refunds due at or before
+        `curr_timestamp`, in payment order.
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= curr_timestamp:
+            due.append(heapq.heappop(self._heap))
+
+        # heap pops by due time; refunds must still apply in payment order
+        due.sort(key=lambda entry: entry[1])
+        return [entry[2] for entry in due]
+
+    def next_due(self) -> int | None:
+        # due timestamp of the earliest pending refund, None if nothing is pending
+        return self._heap[0][0] if self._heap else None
+
+    def discard(self, payments: set):
+        # drops the refunds of the given payments, e.g. moved to another engine
+        self._heap = [entry for entry in self._heap if entry[2] not in payments]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class CashbackQueue:
+    """
+    FIFO of pending cashback refunds, for schedules that receive them in
+    due order (monotonic timestamps, see `BankingSystemImpl(monotonic=True)`):
+    the due time is the payment time plus a fixed delay, so scheduling is
+    an append and a sweep pops from the front in payment order, with no
+    heap and no re-sorting. Same interface as `CashbackScheduler`.
+    """
+
+    def __init__(self):
+        self._queue = deque() # entries: (due_timestamp, payment_number, payment), ascending
+
+    def schedule(self, due_timestamp: int, payment_number: int, payment):
+        self._queue.append((due_timestamp, payment_number, payment))
+
+    def schedule_many(self, entries: list):
+        # entries: (due_timestamp, payment_number, payment) tuples in due order, none due before the queued ones
+        self._queue.extend(entries)
+
+    def merge(self, other: "CashbackQueue"):
+        # moves every refund queued in other into this queue (both are sorted, one linear merge)
+        self._queue = deque(heapq.merge(self._queue, other._queue))
+        other._queue = deque()
+
+    def pop_due(self, curr_timestamp: int) -> list:
+        queue = self._queue
+        due = []
+        while queue and queue[0][0] <= curr_timestamp:
+            due.append(queue.popleft()[2])
+        return due
+
+    def next_due(self) -> int | None:
+        return self._queue[0][0] if self._queue else None
+
+    def discard(self, payments: set):
+        self._queue = deque(entry for entry in self._queue if entry[2] not in payments)
+
+    def __len__(self) -> int:
+        return len(self._queue)
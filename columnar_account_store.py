@@ -0,0 +1,124 @@
+from array import array
+
+
+class ColumnarAccount:
+    """
+    Lightweight view of one row of a `ColumnarAccountStore`.
+    Views are created on lookup and not kept, so the store holds no
+    per-account Python object besides the id string.
+    """
+
+    __slots__ = ("_store", "_handle")
+
+    def __init__(self, store, handle: int):
+        self._store = store
+        self._handle = handle
+
+    @property
+    def _timestamp(self) -> int:
+        return self._store._timestamps[self._handle]
+
+    @property
+    def _account_id(self) -> str:
+        return self._store._account_ids[self._handle]
+
+    @property
+    def _balance(self) -> int:
+        return self._store._balances[self._handle]
+
+    @_balance.setter
+    def _balance(self, value: int):
+        self._store._balances[self._handle] = value
+
+    # two views of the same row are the same account
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ColumnarAccount) and other._store is self._store and other._handle == self._handle
+
+    def __hash__(self) -> int:
+        return hash(self._handle)
+
+    # helper function for testing only
+    def print_account_details(self):
+        print(f"Timestamp: {self._timestamp}")
+        print(f"Account ID: {self._account_id}")
+        print(f"Balance: {self._balance}\n")
+
+
+class ColumnarAccountStore:
+    """
+    Account store with the same interface as `AccountRegistry`, keeping
+    balances and creation timestamps in `array`-backed columns indexed
+    by an integer handle (signed 64-bit values).
+    Handles are dense and never reused: removing an account only drops
+    its id from the index.
+    The Level 4 engine works on the columns and the id <-> handle maps
+    directly (`create`, `_handles`, `_account_ids`, `_balances`,
+    `_timestamps`); views are only made by `get`, `remove` and iteration.
+    """
+
+    def __init__(self):
+        self._handles = {} # dict(key: account_id; value: handle) for live accounts, in creation order
+        self._account_ids = [] # handle -> account_id
+        self._timestamps = array("q") # handle -> creation timestamp
+        self._balances = array("q") # handle -> balance
+
+    def get(self, account_id: str):
+        handle = self._handles.get(account_id)
+        if handle is None:
+            return None # if not account found
+        return ColumnarAccount(self, handle)
+
+    def add(self, account) -> bool:
+        # copies the account into the columns; the passed object is not kept
+        handle = self.create(account._account_id, account._timestamp)
+        if handle is None:
+            return False
+        self._balances[handle] = account._balance
+        return True
+
+    def create(self, account_id: str, timestamp: int) -> int | None:
+        # new account with balance 0, returns its handle (None if account_id is taken)
+        if account_id in self._handles:
+            return None
+        handle = len(self._account_ids)
+        self._account_ids.append(account_id)
+        self._timestamps.append(timestamp)
+        self._balances.append(0)
+        self._handles[account_id] = handle
+        return handle
+
+    def restore(self, account_ids: list, live, created, balances):
+        """
+        Replaces the contents with `account_ids` (every handle's id) of
+        which the handles `live` exist, with their creation timestamps and
+        balances (e.g. from a snapshot). The maps and columns are updated
+        in place, so references to them stay valid.
+        """
+        self._account_ids[:] = account_ids
+        self._handles.clear()
+        del self._timestamps[:]
+        del self._balances[:]
+        self._timestamps.extend(array("q", bytes(8 * len(account_ids)))) # removed handles read as 0
+        self._balances.extend(array("q", bytes(8 * len(account_ids))))
+        for handle, timestamp, balance in zip(live, created, balances):
+            self._handles[account_ids[handle]] = handle
+            self._timestamps[handle] = timestamp
+            self._balances[handle] = balance
+
+    def remove(self, account_id: str):
+        handle = self._handles.pop(account_id, None)
+        if handle is None:
+            return None
+        return ColumnarAccount(self, handle) # view of the removed row, still readable
+
+    def handle(self, account_id: str) -> int | None:
+        return self._handles.get(account_id)
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._handles
+
+    def __iter__(self):
+        return (ColumnarAccount(self, handle) for handle in self._handles.values())
+
+    def __len__(self) -> int:
+        return len(self._handles)
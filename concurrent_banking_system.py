@@ -0,0 +1,278 @@
+"""
+Thread-safe variant of the Level 4 `BankingSystemImpl`.
+
+Locking:
+  * per-account state (balance, balance history, the account_id -> handle
+    entry) is guarded by one of `stripes` locks picked by the hash of the
+    account_id, so deposits and transfers on accounts in different
+    stripes run concurrently
+  * shared structures (spender leaderboards, payment ledger and payment
+    numbering, cashback schedule, merge links, account tables, journal,
+    event sink) are guarded by one re-entrant lock, held only for the
+    part of an operation that touches them
+  * the cashback sweep credits refunds to any account, so it takes the
+    sweep lock and then every stripe; so do `bulk_deposit` and
+    `bulk_pay`, whose rows may be on any stripe
+
+Locks are always taken in the order sweep -> stripes (ascending index)
+-> shared, so threads never wait on each other in a cycle. Single dict
+and list operations on the account tables (lookups racing with an
+insert for an account of another stripe) rely on being atomic.
+"""
+import threading
+
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+OPERATIONS = frozenset(("create_account", "deposit", "transfer", "top_spenders", "top_spenders_window", "pay",
+                        "get_payment_status", "list_payments", "merge_accounts", "get_balance"))
+
+
+class SynchronizedLeaderboard:
+    """
+    `SpenderLeaderboard` wrapper running every operation under `lock`.
+    """
+
+    def __init__(self, leaderboard, lock):
+        self._leaderboard = leaderboard
+        self._lock = lock
+
+    def add(self, key, outgoing: int = 0):
+        with self._lock:
+            self._leaderboard.add(key, outgoing)
+
+    def add_outgoing(self, key, amount: int):
+        with self._lock:
+            self._leaderboard.add_outgoing(key, amount)
+
+    def remove(self, key) -> int:
+        with self._lock:
+            return self._leaderboard.remove(key)
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._leaderboard.top(n)
+
+    def __getitem__(self, key) -> int:
+        with self._lock:
+            return self._leaderboard[key]
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._leaderboard
+
+    def __len__(self) -> int:
+        return len(self._leaderboard)
+
+
+class SynchronizedWindowedLeaderboard:
+    """
+    `WindowedLeaderboard` wrapper running every operation under `lock`.
+    """
+
+    def __init__(self, leaderboard, lock):
+        self._leaderboard = leaderboard
+        self._lock = lock
+        self.window = leaderboard.window
+
+    def add_outgoing(self, key, timestamp: int, amount: int):
+        with self._lock:
+            self._leaderboard.add_outgoing(key, timestamp, amount)
+
+    def merge(self, key_1, key_2):
+        with self._lock:
+            self._leaderboard.merge(key_1, key_2)
+
+    def advance(self, timestamp: int):
+        with self._lock:
+            self._leaderboard.advance(timestamp)
+
+    def top(self, timestamp: int, n: int) -> list[tuple[str, int]]:
+        with self._lock:
+            return self._leaderboard.top(timestamp, n)
+
+    def __getitem__(self, key) -> int:
+        with self._lock:
+            return self._leaderboard[key]
+
+    def state(self):
+        with self._lock:
+            return self._leaderboard.state()
+
+    def load(self, state):
+        with self._lock:
+            self._leaderboard.load(state)
+
+
+class _Locks:
+    # acquires the given locks in list order, releases them in reverse
+    __slots__ = ("_locks",)
+
+    def __init__(self, locks: list):
+        self._locks = locks
+
+    def __enter__(self):
+        for lock in self._locks:
+            lock.acquire()
+
+    def __exit__(self, *exc):
+        for lock in reversed(self._locks):
+            lock.release()
+
+
+class ConcurrentBankingSystem(BankingSystemImpl):
+    """
+    `BankingSystemImpl` that can be called from many threads at once.
+    Every call gives the result of the serial engine applied in lock
+    acquisition order; `stripes` sets the number of account locks.
+    """
+
+    def __init__(self, *args, stripes: int = 64, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self._refunds is not None:
+            raise ValueError("ConcurrentBankingSystem supports eager cashback settlement only")
+        if self._monotonic: # the stripe-locked bodies would race on the clock and the FIFO schedule
+            raise ValueError("ConcurrentBankingSystem does not support monotonic mode")
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._sweep_lock = threading.Lock()
+        self._shared = threading.RLock()
+        self._synchronize_leaderboards()
+
+    def _synchronize_leaderboards(self):
+        # spending is ranked across stripes, so every leaderboard runs under the shared lock
+        self._outgoing = SynchronizedLeaderboard(self._outgoing, self._shared)
+        self._windows = {window: SynchronizedWindowedLeaderboard(windowed, self._shared)
+                         for window, windowed in self._windows.items()}
+
+    def _account_locks(self, *account_ids) -> _Locks:
+        # stripe locks of the given accounts, each once, in ascending order
+        n = len(self._stripes)
+        return _Locks([self._stripes[i] for i in sorted({hash(account_id) % n for account_id in account_ids})])
+
+    def _all_locks(self) -> _Locks:
+        return _Locks([self._sweep_lock, *self._stripes, self._shared])
+
+    def _journal_op(self, op):
+        if self._journal is not None:
+            with self._shared:
+                self._journal.append(op)
+
+    def _sweep(self, timestamp: int, op=None) -> int:
+        # settles due refunds under every lock; op (a read) is journaled if it settled any
+        with self._shared:
+            next_due = self._cashback_schedule.next_due()
+        if next_due is None or next_due > timestamp:
+            return 0 # nothing due, the common case takes no account locks
+
+        with self._all_locks():
+            settled = self._process_cash_back(timestamp)
+            if settled and op is not None and self._journal is not None:
+                self._journal.append(op)
+            return settled
+
+    def set_event_sink(self, sink) -> None:
+        # events are emitted from many threads, calls into the sink are serialized
+        if sink is not None:
+            unlocked_sink = sink
+
+            def sink(event: dict):
+                with self._shared:
+                    unlocked_sink(event)
+        super().set_event_sink(sink)
+
+
+    def create_account(self, timestamp: int, account_id: str) -> bool:
+        with self._account_locks(account_id), self._shared:
+            return super().create_account(timestamp, account_id)
+
+    def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
+        self._sweep(timestamp)
+        with self._account_locks(account_id):
+            self._journal_op(("deposit", timestamp, account_id, amount))
+            return self._deposit(timestamp, account_id, amount)
+
+    def transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
+        self._sweep(timestamp)
+        with self._account_locks(source_account_id, target_account_id):
+            self._journal_op(("transfer", timestamp, source_account_id, target_account_id, amount))
+            return self._transfer(timestamp, source_account_id, target_account_id, amount)
+
+    def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
+        self._sweep(timestamp)
+        # the shared lock covers journaling too, so payments are journaled in numbering order
+        with self._account_locks(account_id), self._shared:
+            self._journal_op(("pay", timestamp, account_id, amount))
+            return self._pay(timestamp, account_id, amount)
+
+    def get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        self._sweep(timestamp, ("get_payment_status", timestamp, account_id, payment))
+        with self._account_locks(account_id), self._shared:
+            return self._get_payment_status(timestamp, account_id, payment)
+
+    def list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        self._sweep(timestamp, ("list_payments", timestamp, account_id, status))
+        with self._account_locks(account_id), self._shared:
+            return self._list_payments(timestamp, account_id, status)
+
+    def merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        self._sweep(timestamp)
+        with self._account_locks(account_id_1, account_id_2), self._shared:
+            self._journal_op(("merge_accounts", timestamp, account_id_1, account_id_2))
+            return self._merge_accounts(timestamp, account_id_1, account_id_2)
+
+    def get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        self._sweep(timestamp, ("get_balance", timestamp, account_id, time_at))
+        with self._account_locks(account_id):
+            return self._get_balance(timestamp, account_id, time_at)
+
+    def bulk_deposit(self, timestamp: int, handles, amounts) -> list:
+        # the rows may be on any stripe and the sweep runs first, so a bulk holds every lock
+        with self._all_locks():
+            return super().bulk_deposit(timestamp, handles, amounts)
+
+    def bulk_pay(self, timestamp: int, handles, amounts) -> list:
+        with self._all_locks():
+            return super().bulk_pay(timestamp, handles, amounts)
+
+    def apply_batch(self, ops, reorder: bool = False, return_exceptions: bool = False) -> list:
+        """
+        Applies commands in order like `BankingSystemImpl.apply_batch`
+        (with the same `reorder` and `return_exceptions` options), each
+        through its locking public method; with a journal attached it is
+        synced once at the end of the batch.
+        """
+        ops = list(ops)
+        for op in ops: # a batch with an unknown operation is rejected before any of it is applied
+            if op[0] not in OPERATIONS:
+                raise ValueError(f"Unknown operation: {op[0]}")
+        if reorder:
+            order = sorted(range(len(ops)), key=lambda i: ops[i][1])
+            results = self.apply_batch([ops[i] for i in order], return_exceptions=return_exceptions)
+            reordered = [None] * len(ops)
+            for i, result in zip(order, results):
+                reordered[i] = result
+            return reordered
+
+        results = []
+        for op in ops:
+            try:
+                results.append(getattr(self, op[0])(*op[1:]))
+            except Exception as error:
+                if not return_exceptions:
+                    raise
+                results.append(error)
+
+        if self._journal is not None:
+            with self._shared:
+                self._journal.sync()
+        return results
+
+    def save_snapshot(self, path: str) -> None:
+        with self._all_locks():
+            super().save_snapshot(path)
+
+    def load_snapshot(self, path: str) -> int:
+        with self._all_locks():
+            sequence = super().load_snapshot(path)
+            self._synchronize_leaderboards()
+            return sequence
@@ -0,0 +1,177 @@
+"""
+Write-ahead operation journal for the Level 4 `BankingSystemImpl`.
+
+Every state-changing command is appended as one JSON line
+`[sequence, operation, timestamp, *args]`, the same command format as
+`apply_batch` and `replay.py`. A line holding only `[sequence]` marks
+where a truncated journal continues numbering.
+
+Appends are group-committed: records are buffered and written with a
+single fsync once `group_size` records are pending or `sync_interval`
+seconds have passed since the last sync, and on every `sync()`
+(`apply_batch` syncs once per batch). When appends stop, a background
+flusher syncs the last group `sync_interval` seconds after its first
+record, so no record stays unsynced longer than that. A crash loses
+at most the unsynced tail, never a record in the middle.
+
+Recovery loads the latest snapshot and replays the journaled commands
+recorded after it:
+
+    system = BankingSystemImpl()
+    journal = recover(system, "bank.journal", "bank.snap")
+    ...
+    system.save_snapshot("bank.snap") # checkpoint, then drop the replayed prefix
+    journal.truncate()
+"""
+import json
+import os
+import threading
+import time
+from itertools import islice
+
+
+_encode = json.JSONEncoder(separators=(",", ":")).encode # reused, json.dumps with options builds an encoder per call
+
+
+class OperationJournal:
+    """
+    Append-only journal file of commands with group commit; see the
+    module docstring for the format and durability guarantees.
+    """
+
+    def __init__(self, path: str, group_size: int = 512, sync_interval: float = 0.005):
+        self._path = path
+        self._group_size = group_size
+        self._sync_interval = sync_interval
+        self.sequence, valid_length = _scan(path) # last sequence number written
+        self._file = open(path, "ab")
+        if self._file.tell() != valid_length: # drop a torn record left by a crash mid-write
+            self._file.truncate(valid_length)
+        self._pending = [] # encoded records not yet written
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock() # appends vs the flusher thread
+        self._unsynced = threading.Event() # set while records are pending
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_idle, name="journal-flusher", daemon=True)
+        self._flusher.start()
+
+    def append(self, op) -> int:
+        """
+        Journals the command `op` and returns its sequence number.
+        """
+        with self._lock:
+            self.sequence += 1
+            self._pending.append(_encode([self.sequence, *op]).encode() + b"\n")
+            if len(self._pending) >= self._group_size or time.monotonic() - self._last_sync >= self._sync_interval:
+                self._sync()
+            elif not self._unsynced.is_set():
+                self._unsynced.set() # first record of a group: the flusher syncs it if no append does
+            return self.sequence
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        # one write + fsync for the whole group of pending records
+        if self._pending:
+            self._file.write(b"".join(self._pending))
+            self._pending.clear()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced.clear()
+        self._last_sync = time.monotonic()
+
+    def _flush_idle(self):
+        # flusher thread: syncs a group sync_interval after its first record, when traffic stopped before it filled
+        while True:
+            self._unsynced.wait()
+            if self._closed.wait(self._sync_interval):
+                return
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                self._sync()
+
+    def truncate(self):
+        """
+        Empties the journal, e.g. after a snapshot covering every record
+        in it; numbering continues from the current sequence.
+        """
+        with self._lock:
+            self._sync()
+            self._file.close()
+            tmp_path = self._path + ".tmp"
+            with open(tmp_path, "wb") as journal:
+                journal.write(_encode([self.sequence]).encode() + b"\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            os.replace(tmp_path, self._path)
+            self._file = open(self._path, "ab")
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._file.close()
+            self._closed.set()
+        self._unsynced.set() # wakes the flusher so it exits
+        self._flusher.join()
+
+
+def _records(path: str):
+    # yields (end offset, record) for every complete, well-formed line
+    if not os.path.exists(path):
+        return
+    offset = 0
+    with open(path, "rb") as journal:
+        for line in journal:
+            if not line.endswith(b"\n"):
+                return
+            try:
+                record = json.loads(line)
+            except ValueError:
+                return
+            offset += len(line)
+            yield offset, record
+
+
+def _scan(path: str) -> tuple[int, int]:
+    # last sequence number and byte length of the valid prefix of the journal
+    sequence, length = 0, 0
+    for length, record in _records(path):
+        sequence = record[0]
+    return sequence, length
+
+
+def read_journal(path: str, after: int = 0):
+    """
+    Yields the journaled commands with a sequence number above `after`,
+    in order, as `(operation, timestamp, *args)` tuples.
+    """
+    for _, record in _records(path):
+        if len(record) > 1 and record[0] > after:
+            yield tuple(record[1:])
+
+
+def recover(system, journal_path: str, snapshot_path: str | None = None, batch_size: int = 10000, **journal_options) -> OperationJournal:
+    """
+    Restores `system` from the snapshot at `snapshot_path` (if it
+    exists) and the journal commands recorded after it, then attaches
+    and returns the journal, reopened for appending.
+    """
+    after = 0
+    if snapshot_path is not None and os.path.exists(snapshot_path):
+        after = system.load_snapshot(snapshot_path)
+
+    system.set_journal(None) # replayed commands are already journaled
+    operations = read_journal(journal_path, after)
+    while True:
+        chunk = list(islice(operations, batch_size))
+        if not chunk:
+            break
+        system.apply_batch(chunk)
+
+    journal = OperationJournal(journal_path, **journal_options)
+    journal.sequence = max(journal.sequence, after)
+    system.set_journal(journal)
+    return journal
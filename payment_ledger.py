@@ -0,0 +1,281 @@
+import csv
+from array import array
+from bisect import bisect_left
+from heapq import merge
+from itertools import accumulate, chain, groupby
+
+
+# compact payment status codes, 0 means "no such payment"
+IN_PROGRESS = 1
+CASHBACK_RECEIVED = 2
+STATUS_NAMES = {IN_PROGRESS: "IN_PROGRESS", CASHBACK_RECEIVED: "CASHBACK_RECEIVED"}
+STATUS_CODES = {name: code for code, name in STATUS_NAMES.items()}
+
+
+def parse_payment_id(payment: str) -> int | None:
+    """
+    Returns the ordinal `N` of a `"paymentN"` identifier, or `None` if
+    `payment` is not in that format.
+    """
+    digits = payment[7:] if payment.startswith("payment") else ""
+    if not digits.isdigit() or digits != str(int(digits)): # rejects e.g. "payment01"
+        return None
+    return int(digits)
+
+
+class CsvPaymentArchive:
+    """
+    Appends compacted payment records to a CSV file as
+    `ordinal,account_id,timestamp,cashback` rows.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+
+    def write(self, rows):
+        with open(self._path, "a", newline="") as archive:
+            csv.writer(archive).writerows(rows)
+
+
+class PaymentLedger:
+    """
+    Every payment ever made, stored as columns indexed by its ordinal
+    (`"paymentN"` has ordinal `N`): the integer handle of the paying
+    account, a one-byte status code, the payment timestamp and the
+    cashback owed.
+    A per-account index lists the ordinals of each account's payments,
+    so status lookups are a single probe and account-scoped queries do
+    not scan other accounts' payments.
+    Completed payments are compacted: once the oldest payments have all
+    received their cashback, their status, timestamp and cashback rows
+    are dropped and replaced by a watermark ordinal (everything at or
+    below it is `CASHBACK_RECEIVED`). Compaction runs every
+    `compact_threshold` completions (0 disables it); if `archive` is set
+    (e.g. a `CsvPaymentArchive`) the dropped records are written to it
+    first. With `settled_through` set (lazy cashback settlement), an
+    `IN_PROGRESS` payment made at or before it counts as completed for
+    compaction: its refund is due and is kept by the engine until the
+    account settles it.
+    Compaction does not shrink the owner column or the per-account
+    index: `get_payment_status` and `list_payments` answer for every
+    payment ever made, so both keep an 8-byte entry per payment (about
+    16 bytes per payment in all) for the life of the ledger, archive or
+    not. The owner column runs up to the highest ordinal, so a ledger
+    given explicit ordinals (a shard of a `ShardedBankingSystem`) pays
+    8 bytes for every payment of the whole system, not only its own.
+    """
+
+    def __init__(self, compact_threshold: int = 4096, archive=None):
+        self._owners = array("q", [-1]) # ordinal -> handle of the paying account (ordinal 0 unused)
+        # row columns, row i holds ordinal watermark + i (row 0 unused) 
+        self._status = bytearray(1) # status code
+        self._timestamps = array("q", [0]) # payment timestamp
+        self._cashback = array("q", [0]) # cashback owed
+        self._watermark = 0 # every ordinal <= watermark has received its cashback and has no row
+        self._by_account = {} # dict(key: account handle; value: array of its payment ordinals, ascending)
+        self._merged = {} # dict(key: account handle; value: list of handles merged into it)
+        self.account_ids = None # optional handle -> account_id sequence, names owners in the archive
+        self.settled_through = None # optional payment timestamp, see the class docstring
+
+        self._compact_threshold = compact_threshold
+        self._completed = 0 # completions since the last compaction
+        self._archive = archive
+
+    def add(self, account: int, timestamp: int, cashback: int, ordinal: int | None = None, status: int = IN_PROGRESS) -> int:
+        """
+        Records a payment and returns its ordinal, the next one unless
+        `ordinal` is given (numbered elsewhere, e.g. by a shard
+        coordinator, or moved from another ledger with its `status`).
+        Ordinals skipped over are empty rows (status 0, no such payment).
+        """
+        if ordinal is None or ordinal == len(self._owners):
+            ordinal = len(self._owners)
+            self._owners.append(account)
+            self._status.append(status)
+            self._timestamps.append(timestamp)
+            self._cashback.append(cashback)
+        else:
+            self._place(account, timestamp, cashback, ordinal, status)
+
+        ordinals = self._by_account.get(account)
+        if ordinals is None:
+            ordinals = self._by_account[account] = array("q")
+        if ordinals and ordinals[-1] > ordinal:
+            ordinals.insert(bisect_left(ordinals, ordinal), ordinal)
+        else:
+            ordinals.append(ordinal)
+        return ordinal
+
+    def add_many(self, accounts, timestamp: int, cashback) -> int:
+        """
+        Records one payment per entry of `accounts` (handles) at
+        `timestamp` with the matching `cashback`, numbered consecutively
+        in order, and returns the first ordinal.
+        """
+        first = len(self._owners)
+        accounts = array("q", accounts)
+        self._owners.extend(accounts)
+        self._status.extend(bytes([IN_PROGRESS]) * len(accounts))
+        self._timestamps.extend(array("q", [timestamp]) * len(accounts))
+        self._cashback.extend(array("q", cashback))
+        by_account = self._by_account
+        for ordinal, account in enumerate(accounts, first):
+            ordinals = by_account.get(account)
+            if ordinals is None:
+                ordinals = by_account[account] = array("q")
+            ordinals.append(ordinal)
+        return first
+
+    def _place(self, account: int, timestamp: int, cashback: int, ordinal: int, status: int):
+        # slow path for explicit ordinals: pad with empty rows up to it, or fill an empty row before the end
+        gap = ordinal - len(self._owners)
+        if gap > 0:
+            self._owners.extend(array("q", [-1]) * gap)
+            self._status.extend(bytes(gap))
+            self._timestamps.extend(array("q", bytes(8 * gap)))
+            self._cashback.extend(array("q", bytes(8 * gap)))
+            self._owners.append(account)
+            self._status.append(status)
+            self._timestamps.append(timestamp)
+            self._cashback.append(cashback)
+            return
+
+        self._owners[ordinal] = account
+        row = ordinal - self._watermark
+        if row <= 0:
+            if status == CASHBACK_RECEIVED:
+                return # compacted rows already read as received
+            # bring the rows back from the watermark down to this ordinal; the restored rows keep reading as received
+            restored = 1 - row
+            self._status[1:1] = bytes([CASHBACK_RECEIVED]) * restored
+            self._timestamps[1:1] = array("q", bytes(8 * restored))
+            self._cashback[1:1] = array("q", bytes(8 * restored))
+            self._watermark -= restored
+            row = 1
+        self._status[row] = status
+        self._timestamps[row] = timestamp
+        self._cashback[row] = cashback
+
+    def status(self, ordinal: int) -> int:
+        if ordinal <= 0:
+            return 0 # no such payment
+        row = ordinal - self._watermark
+        if row <= 0:
+            return CASHBACK_RECEIVED # compacted
+        if row < len(self._status):
+            return self._status[row]
+        return 0 # no such payment
+
+    def complete(self, ordinal: int):
+        row = ordinal - self._watermark
+        if row <= 0:
+            return # compacted while its refund was due (settled_through), already reads as received
+        self._status[row] = CASHBACK_RECEIVED
+        self._completed += 1
+        if self._compact_threshold and self._completed >= self._compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """
+        Drops the rows of the longest run of completed payments at the
+        start of the ledger and advances the watermark past them.
+        """
+        self._completed = 0
+        status, timestamps, settled_through = self._status, self._timestamps, self.settled_through
+        first_pending = status.find(IN_PROGRESS, 1)
+        if settled_through is not None: # due refunds do not hold the watermark back
+            while first_pending != -1 and timestamps[first_pending] <= settled_through:
+                first_pending = status.find(IN_PROGRESS, first_pending + 1)
+        end = len(status) if first_pending == -1 else first_pending
+        if end <= 1:
+            return
+
+        if self._archive is not None:
+            base, names = self._watermark, self.account_ids
+            self._archive.write(
+                (base + row, self._owners[base + row] if names is None else names[self._owners[base + row]],
+                 self._timestamps[row], self._cashback[row])
+                for row in range(1, end) if self._status[row]) # empty rows are not payments
+
+        del self._status[1:end]
+        del self._timestamps[1:end]
+        del self._cashback[1:end]
+        self._watermark += end - 1
+
+    def pending(self):
+        # ordinals still waiting for their cashback, ascending
+        status, base = self._status, self._watermark
+        row = status.find(IN_PROGRESS, 1)
+        while row != -1:
+            yield base + row
+            row = status.find(IN_PROGRESS, row + 1)
+
+    def index_columns(self) -> tuple[array, array, array]:
+        # per-account index flattened to (accounts, number of ordinals of each, concatenated ordinals) 
+        return (array("q", self._by_account), array("q", map(len, self._by_account.values())),
+                array("q", chain.from_iterable(self._by_account.values())))
+
+    def restore(self, owners: array, status: bytearray, timestamps: array, cashback: array, watermark: int,
+                merges=(), index: tuple | None = None):
+        """
+        Replaces the ledger contents with saved columns (e.g. from a
+        snapshot): the owner column for every ordinal, the status,
+        timestamp and cashback rows above `watermark` (row 0 unused),
+        `(account, merged_account)` pairs and optionally the per-account
+        index from `index_columns` (rebuilt from the owners if omitted).
+        Compaction settings are kept.
+        """
+        self._owners = owners
+        self._status = status
+        self._timestamps = timestamps
+        self._cashback = cashback
+        self._watermark = watermark
+        self._completed = 0
+
+        if index is not None:
+            accounts, lengths, ordinals = index
+            bounds = list(accumulate(lengths, initial=0))
+            self._by_account = {account: ordinals[bounds[i]:bounds[i + 1]] for i, account in enumerate(accounts)}
+        else: # stable sort by owner keeps each account's ordinals ascending 
+            self._by_account = {
+                account: array("q", ordinals)
+                for account, ordinals in groupby(sorted(range(1, len(owners)), key=owners.__getitem__), key=owners.__getitem__)}
+
+        self._merged = {}
+        for account, merged_account in merges:
+            self.merge(account, merged_account)
+
+    def owner(self, ordinal: int) -> int:
+        return self._owners[ordinal]
+
+    # timestamp and cashback are kept until the payment is compacted (pending payments always have them) 
+    def timestamp(self, ordinal: int) -> int:
+        return self._timestamps[ordinal - self._watermark]
+
+    def cashback(self, ordinal: int) -> int:
+        return self._cashback[ordinal - self._watermark]
+
+    def merge(self, account: int, merged_account: int):
+        # O(1): merged_account's payments are listed under account from now on
+        self._merged.setdefault(account, []).append(merged_account)
+
+    def payments_of(self, account: int, status: int | None = None) -> list[int]:
+        """
+        Returns the ordinals of `account`'s payments, including those of
+        accounts merged into it, in payment order, optionally only those
+        with the given status code.
+        """
+        stack, sources = [account], []
+        while stack:
+            current = stack.pop()
+            if current in self._by_account:
+                sources.append(self._by_account[current])
+            stack.extend(self._merged.get(current, ()))
+
+        ordinals = merge(*sources) if len(sources) > 1 else (sources[0] if sources else ())
+        if status is None:
+            return list(ordinals)
+        return [ordinal for ordinal in ordinals if self.status(ordinal) == status]
+
+    def __len__(self) -> int:
+        return len(self._owners) - 1
@@ -0,0 +1,162 @@
+"""
+Read replicas of the Level 4 `BankingSystemImpl`.
+
+The primary publishes its state changes through its event sink: each
+event (create_account, deposit, transfer, pay, cashback, merge_accounts)
+goes to a channel with a sequence number. A `ReadReplica` applies them,
+in order, to its own engine on a background thread and answers reporting
+queries (`top_spenders`, `get_payment_status`, `list_payments`,
+`get_balance`) from that copy, so they never take time from the
+primary's write path. A query waits until the replica is at most
+`max_lag` events behind the primary.
+
+    replica = ReadReplica.fork(primary, "replica.snap") # snapshot + event stream
+    replica.top_spenders(timestamp, 10)
+    replica.stop()
+
+The channel is any queue with `put`/`get`; with a `multiprocessing`
+queue and a `multiprocessing.Value("q")` as the published counter the
+replica can run in another process (started from the same snapshot).
+"""
+import queue
+import threading
+
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class _Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+
+class ReplicationSink:
+    """
+    Event sink for the primary: publishes every event to `channel` as
+    `(sequence, event)` and counts them in `published.value`; events are
+    also passed on to `forward` (e.g. an audit sink) if given.
+    """
+
+    def __init__(self, channel, published=None, forward=None):
+        self._channel = channel
+        self.published = published if published is not None else _Counter()
+        self._forward = forward
+
+    def __call__(self, event: dict):
+        self.published.value += 1
+        self._channel.put((self.published.value, event))
+        if self._forward is not None:
+            self._forward(event)
+
+
+class ReadReplica:
+    """
+    Copy of a primary engine kept up to date from its event stream; see
+    the module docstring. `system` is the replica's engine holding the
+    state the stream starts from (e.g. loaded from a snapshot of the
+    primary), a new empty one by default.
+    """
+
+    def __init__(self, channel, published, system=None, max_lag: int = 0, batch_size: int = 1024):
+        self._channel = channel
+        self._published = published # the primary's ReplicationSink.published
+        self._system = system if system is not None else BankingSystemImpl()
+        self._max_lag = max_lag
+        self._batch_size = batch_size
+        self._applied = 0 # sequence number of the last applied event
+        self._lock = threading.Lock() # replica engine: applier thread vs queries
+        self._progress = threading.Condition(self._lock)
+        self._thread = None
+
+    @classmethod
+    def fork(cls, primary, snapshot_path: str, **options) -> "ReadReplica":
+        """
+        Starts a replica of `primary` in a thread of this process: the
+        primary's state is saved to `snapshot_path` and loaded by the
+        replica, and from then on every event of the primary is streamed
+        to it. An event sink already set on the primary keeps receiving
+        its events.
+        """
+        channel = queue.SimpleQueue()
+        primary.save_snapshot(snapshot_path)
+        sink = ReplicationSink(channel, forward=primary._event_sink)
+        primary.set_event_sink(sink)
+
+        system = BankingSystemImpl()
+        system.load_snapshot(snapshot_path)
+        replica = cls(channel, sink.published, system, **options)
+        replica.start()
+        return replica
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="banking-replica", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # applies every event already published, then stops the applier
+        self._channel.put(None)
+        self._thread.join()
+
+    def lag(self) -> int:
+        # number of published events not applied yet
+        return self._published.value - self._applied
+
+    def sync(self):
+        # waits until every event published so far is applied
+        target = self._published.value
+        with self._progress:
+            self._progress.wait_for(lambda: self._applied >= target)
+
+    def _run(self):
+        while True:
+            batch = [self._channel.get()]
+            while batch[-1] is not None and len(batch) < self._batch_size:
+                try:
+                    batch.append(self._channel.get_nowait())
+                except queue.Empty:
+                    break
+            with self._progress:
+                for item in batch:
+                    if item is None:
+                        self._progress.notify_all()
+                        return
+                    sequence, event = item
+                    self._apply(event)
+                    self._applied = sequence
+                self._progress.notify_all()
+
+    def _apply(self, event: dict):
+        # replays one state change with the operation body that made it (no sweep, the stream carries refunds)
+        system, kind, timestamp = self._system, event["event"], event["timestamp"]
+        if kind == "create_account":
+            system._create_account(timestamp, event["account_id"])
+        elif kind == "deposit":
+            system._deposit(timestamp, event["account_id"], event["amount"])
+        elif kind == "transfer":
+            system._transfer(timestamp, event["source_account_id"], event["target_account_id"], event["amount"])
+        elif kind == "pay":
+            system._pay(timestamp, event["account_id"], event["amount"])
+        elif kind == "cashback":
+            system._process_cash_back(timestamp) # settles the whole sweep, its later events find nothing due
+        elif kind == "merge_accounts":
+            system._merge_accounts(timestamp, event["account_id_1"], event["account_id_2"])
+
+    def _query(self, method: str, *args):
+        # runs a read on the replica engine once it is at most max_lag events behind
+        target = self._published.value - self._max_lag
+        with self._progress:
+            self._progress.wait_for(lambda: self._applied >= target)
+            return getattr(self._system, method)(*args)
+
+    def top_spenders(self, timestamp: int, n: int) -> list[str]:
+        return self._query("top_spenders", timestamp, n)
+
+    def get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        return self._query("get_payment_status", timestamp, account_id, payment)
+
+    def list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        return self._query("list_payments", timestamp, account_id, status)
+
+    def get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        return self._query("get_balance", timestamp, account_id, time_at)
@@ -0,0 +1,141 @@
+"""
+Streaming replay of operation logs through the Level 4 `BankingSystemImpl`.
+
+Each line of a log is one command `(operation, timestamp, *args)`:
+  * JSON lines: `["deposit", 3, "account1", 2500]`
+  * CSV: `deposit,3,account1,2500` (an optional `operation,...` header
+    line is skipped)
+Files ending in `.gz` are decompressed on the fly. Lines are parsed
+lazily and applied in fixed-size chunks, so memory stays bounded by
+`batch_size` whatever the size of the log.
+
+Usage:
+    python3 replay.py LOG [--format jsonl|csv] [--output RESULTS] [--batch-size N]
+"""
+import argparse
+import csv
+import gzip
+import json
+import sys
+from itertools import islice
+
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+def _optional_str(field: str) -> str | None:
+    # optional trailing argument: an empty or missing CSV field is None
+    return field or None
+
+
+# argument types after the timestamp, used to convert CSV fields
+ARG_TYPES = {
+    "create_account": (str,),
+    "deposit": (str, int),
+    "transfer": (str, str, int),
+    "top_spenders": (int,),
+    "pay": (str, int),
+    "get_payment_status": (str, str),
+    "list_payments": (str, _optional_str),
+    "merge_accounts": (str, str),
+    "get_balance": (str, int),
+    "top_spenders_window": (int, int),
+}
+
+
+def _parse_fields(fields: list[str]) -> tuple:
+    operation = fields[0]
+    types = ARG_TYPES.get(operation)
+    if types is None:
+        raise ValueError(f"Unknown operation: {operation}")
+    args = fields[2:]
+    missing = types[len(args):]
+    if missing and all(t is _optional_str for t in missing):
+        args += [""] * len(missing)
+    if len(args) != len(types):
+        raise ValueError(f"Expected {len(types)} arguments for {operation}, got {len(args)}")
+    return (operation, int(fields[1])) + tuple(t(arg) for t, arg in zip(types, args))
+
+
+def iter_operations(lines, fmt: str = "jsonl"):
+    """
+    Yields `(operation, timestamp, *args)` tuples from an iterable of
+    text lines, one at a time. Blank lines are skipped.
+    """
+    if fmt == "jsonl":
+        for line in lines:
+            if line.strip():
+                yield tuple(json.loads(line))
+    elif fmt == "csv":
+        for fields in csv.reader(lines):
+            if not fields or fields[0] == "operation":
+                continue
+            yield _parse_fields(fields)
+    else:
+        raise ValueError(f"Unknown log format: {fmt}")
+
+
+def replay(operations, system=None, output=None, batch_size: int = 10000) -> int:
+    """
+    Applies `operations` to `system` (a new `BankingSystemImpl` by
+    default) in chunks of `batch_size` through `apply_batch`.
+    If `output` is a writable text stream, each result is written to it
+    as one JSON line, in operation order.
+    Returns the number of operations applied.
+    """
+    if system is None:
+        system = BankingSystemImpl()
+
+    count = 0
+    operations = iter(operations)
+    while True:
+        chunk = list(islice(operations, batch_size))
+        if not chunk:
+            return count
+
+        results = system.apply_batch(chunk)
+        count += len(results)
+        if output is not None:
+            output.writelines(json.dumps(result) + "\n" for result in results)
+
+
+def open_log(path: str):
+    if path == "-":
+        return sys.stdin
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, "r", newline="")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay an operation log through BankingSystemImpl.")
+    parser.add_argument("log", help="operation log (JSON lines or CSV, optionally .gz); '-' reads stdin")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="log format (default: from the file extension)")
+    parser.add_argument("--output", help="write one JSON result per line to this file ('-' for stdout)")
+    parser.add_argument("--batch-size", type=int, default=10000, help="commands applied per batch")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "csv" if args.log.removesuffix(".gz").endswith(".csv") else "jsonl"
+
+    log = open_log(args.log)
+    output = None
+    if args.output == "-":
+        output = sys.stdout
+    elif args.output is not None:
+        output = open(args.output, "w")
+
+    try:
+        count = replay(iter_operations(log, fmt), output=output, batch_size=args.batch_size)
+    finally:
+        if log is not sys.stdin:
+            log.close()
+        if output is not None and output is not sys.stdout:
+            output.close()
+
+    print(f"Replayed {count} operations", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
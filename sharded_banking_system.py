@@ -0,0 +1,366 @@
+"""
+Sharded multi-process variant of the Level 4 `BankingSystemImpl`.
+
+Accounts are hash-partitioned by account_id (crc32, stable across
+processes) over `shards` worker processes, each running its own
+`ShardBankingSystem`. The coordinator routes every command:
+  * commands on one account, and transfers/merges between accounts of
+    the same shard, go straight to that shard
+  * transfers and merges across shards run as a two-phase commit: both
+    shards prepare (validate and reserve), then both commit or abort; a
+    merge moves the merged account's balance, outgoing total and
+    payments to the shard of the surviving account
+  * `top_spenders` merges the local top n of every shard
+  * payments are numbered by the coordinator and handed to the shard
+    with the payment, so `payment1`, `payment2`, ... stay in global
+    call order
+
+`apply_batch` sends runs of single-shard commands to all shards at once
+and waits only at the commands that need the result of every earlier
+one (payments, cross-shard commands, `top_spenders`).
+
+    with ShardedBankingSystem(shards=4) as bank:
+        bank.create_account(1, "account1")
+        bank.deposit(2, "account1", 500)
+"""
+import multiprocessing
+import zlib
+from heapq import merge
+from itertools import islice
+
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+from banking_log import get_logger
+from cashback_scheduler import CASHBACK_DELAY
+from payment_ledger import IN_PROGRESS
+
+
+logger = get_logger(__name__)
+
+SHARD_OPERATIONS = frozenset(("create_account", "deposit", "get_payment_status", "list_payments", "get_balance"))
+
+
+class ShardBankingSystem(BankingSystemImpl):
+    """
+    `BankingSystemImpl` holding one shard of the accounts, with the
+    participant side of the two-phase commit used for cross-shard
+    transfers and merges. Prepared transactions are kept by `txn` id
+    until `commit` or `abort`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self._refunds is not None:
+            raise ValueError("ShardBankingSystem supports eager cashback settlement only")
+        if self._monotonic: # prepare/commit bodies skip the clock, and shards see only part of the feed
+            raise ValueError("ShardBankingSystem does not support monotonic mode")
+        if self._windows: # cross-shard legs and merges do not carry windowed spending
+            raise ValueError("ShardBankingSystem does not support spender windows")
+        self._prepared = {} # dict(key: txn id; value: (kind, timestamp, handle, data))
+
+    def prepare_debit(self, txn: int, timestamp: int, account_id: str, amount: int) -> bool:
+        # source side of a transfer: reserves amount by taking it off the balance
+        self._process_cash_back(timestamp)
+        handle = self._handles.get(account_id)
+        if handle is None:
+            return False
+        if amount <= 0 or amount > self._balances[handle]:
+            return False
+        self._balances[handle] -= amount
+        self._prepared[txn] = ("debit", timestamp, handle, amount)
+        return True
+
+    def prepare_credit(self, txn: int, timestamp: int, account_id: str, amount: int) -> bool:
+        # target side of a transfer
+        self._process_cash_back(timestamp)
+        handle = self._handles.get(account_id)
+        if handle is None:
+            return False
+        self._prepared[txn] = ("credit", timestamp, handle, amount)
+        return True
+
+    def prepare_export(self, txn: int, timestamp: int, account_id: str) -> tuple | None:
+        """
+        Merged side of a merge: returns the account's balance, outgoing
+        total and payments `(ordinal, status, timestamp, cashback)`
+        (including those of accounts merged into it), or None if it does
+        not exist.
+        """
+        self._process_cash_back(timestamp)
+        handle = self._handles.get(account_id)
+        if handle is None:
+            return None
+        payments = self._payments
+        moved = []
+        for ordinal in payments.payments_of(handle):
+            status = payments.status(ordinal)
+            if status == IN_PROGRESS:
+                moved.append((ordinal, status, payments.timestamp(ordinal), payments.cashback(ordinal)))
+            else:
+                moved.append((ordinal, status, 0, 0)) # settled, timestamp and cashback are no longer needed
+        self._prepared[txn] = ("export", timestamp, handle, moved)
+        return self._balances[handle], self._outgoing[handle], moved
+
+    def prepare_absorb(self, txn: int, timestamp: int, account_id: str) -> bool:
+        # surviving side of a merge
+        self._process_cash_back(timestamp)
+        handle = self._handles.get(account_id)
+        if handle is None:
+            return False
+        self._prepared[txn] = ("absorb", timestamp, handle, None)
+        return True
+
+    def commit(self, txn: int, state: tuple | None = None) -> int | None:
+        """
+        Applies the prepared transaction `txn`; an absorb takes the
+        `state` returned by the other shard's `prepare_export`. Returns
+        the account's balance after a transfer leg.
+        """
+        kind, timestamp, handle, data = self._prepared.pop(txn)
+        balances = self._balances
+
+        if kind == "debit":
+            self._history(handle).add(timestamp, -data)
+            self._outgoing.add_outgoing(handle, data)
+            return balances[handle]
+
+        if kind == "credit":
+            balances[handle] += data
+            self._history(handle).add(timestamp, data)
+            return balances[handle]
+
+        if kind == "export":
+            # the payments live on in the other shard: settle them here so they leave the schedule and compact away
+            pending = {ordinal for ordinal, status, _, _ in data if status == IN_PROGRESS}
+            self._cashback_schedule.discard(pending)
+            for ordinal in sorted(pending):
+                self._payments.complete(ordinal)
+
+            history = self._history(handle)
+            history.close(timestamp)
+            account_id = self._account_ids[handle]
+            self._closed_histories.setdefault(account_id, []).append(history)
+            self._outgoing.remove(handle)
+            self._remove_account(handle)
+            return None
+
+        # absorb: same as the surviving side of _merge_accounts, with the merged account's payments copied in
+        balance, outgoing, moved = state
+        balances[handle] += balance
+        self._history(handle).add(timestamp, balance)
+        self._outgoing.add_outgoing(handle, outgoing)
+        for ordinal, status, paid_at, cashback in moved:
+            self._payments.add(handle, paid_at, cashback, ordinal, status)
+            if status == IN_PROGRESS:
+                self._cashback_schedule.schedule(paid_at + CASHBACK_DELAY, ordinal, ordinal)
+        return None
+
+    def abort(self, txn: int):
+        # drops the prepared transaction txn (if any), releasing a reserved amount
+        prepared = self._prepared.pop(txn, None)
+        if prepared is not None and prepared[0] == "debit":
+            self._balances[prepared[2]] += prepared[3]
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        # local top n as (account_id, outgoing) pairs in ranking order
+        return self._outgoing.top(n)
+
+
+def _serve(conn, engine_options: dict):
+    # worker process main loop: (method, args) requests in, ("ok", result) or ("error", exception) out, None stops
+    shard = ShardBankingSystem(**engine_options)
+    while True:
+        request = conn.recv()
+        if request is None:
+            break
+        method, args = request
+        try:
+            conn.send(("ok", getattr(shard, method)(*args)))
+        except Exception as error:
+            conn.send(("error", error))
+    conn.close()
+
+
+class ShardedBankingSystem:
+    """
+    Coordinator of `shards` worker processes holding the accounts, with
+    the methods and results of `BankingSystemImpl` (without spender
+    windows); see the module docstring. `engine_options` are passed to
+    every shard's engine. Call `close()` (or use it as a context
+    manager) to stop the workers.
+    """
+
+    def __init__(self, shards: int = 4, **engine_options):
+        # rejected here as well, before any worker starts (a shard engine refuses them in its own process) 
+        if engine_options.get("lazy_cashback") or engine_options.get("monotonic"):
+            raise ValueError("ShardedBankingSystem supports eager cashback settlement without monotonic mode only")
+        if engine_options.get("spender_windows"):
+            raise ValueError("ShardedBankingSystem does not support spender windows, top_spenders_window is not served")
+        self._conns = []
+        self._workers = []
+        for i in range(shards):
+            conn, worker_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_serve, args=(worker_conn, engine_options),
+                                             name=f"banking-shard-{i}", daemon=True)
+            worker.start()
+            worker_conn.close()
+            self._conns.append(conn)
+            self._workers.append(worker)
+        self._payment_count = 0 # payments made so far, the next one is payment_count + 1
+        self._txn = 0 # last two-phase commit transaction id
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conn, worker in zip(self._conns, self._workers):
+            conn.send(None)
+            worker.join()
+            conn.close()
+        self._conns, self._workers = [], []
+
+    def _shard(self, account_id: str) -> int:
+        return zlib.crc32(account_id.encode()) % len(self._conns)
+
+    def _gather(self, requests: list) -> list:
+        # sends (shard, method, *args) requests, one per shard at most, and returns the replies in order;
+        # the shards work on them concurrently
+        for shard, method, *args in requests:
+            self._conns[shard].send((method, args))
+        replies = [self._conns[shard].recv() for shard, *_ in requests]
+        for status, value in replies:
+            if status == "error":
+                raise value
+        return [value for _, value in replies]
+
+    def _call(self, shard: int, method: str, *args):
+        return self._gather([(shard, method, *args)])[0]
+
+
+    def _transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
+        # cross-shard transfer, two-phase
+        self._txn += 1
+        txn, source, target = self._txn, self._shard(source_account_id), self._shard(target_account_id)
+        try:
+            debited, credited = self._gather([(source, "prepare_debit", txn, timestamp, source_account_id, amount),
+                                              (target, "prepare_credit", txn, timestamp, target_account_id, amount)])
+        except Exception:
+            self._gather([(source, "abort", txn), (target, "abort", txn)]) # releases a leg that did prepare
+            raise
+        if not (debited and credited):
+            self._gather([(source, "abort", txn), (target, "abort", txn)])
+            logger.info("Error: Please enter a valid amount or source/target account IDs.")
+            return None
+        balance, _ = self._gather([(source, "commit", txn), (target, "commit", txn)])
+        return balance
+
+    def _merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        # cross-shard merge, two-phase: account_id_2's shard exports it, account_id_1's shard absorbs it
+        self._txn += 1
+        txn, surviving, merged = self._txn, self._shard(account_id_1), self._shard(account_id_2)
+        try:
+            absorbing, state = self._gather([(surviving, "prepare_absorb", txn, timestamp, account_id_1),
+                                             (merged, "prepare_export", txn, timestamp, account_id_2)])
+        except Exception:
+            self._gather([(surviving, "abort", txn), (merged, "abort", txn)])
+            raise
+        if not absorbing or state is None:
+            self._gather([(surviving, "abort", txn), (merged, "abort", txn)])
+            logger.info("Timestamp: %s | Error: Account '%s' or '%s' not found.", timestamp, account_id_1, account_id_2)
+            return False
+        self._gather([(surviving, "commit", txn, state), (merged, "commit", txn)])
+        return True
+
+    def _top_spenders(self, n: int) -> list[str]:
+        # every shard's top n, merged in ranking order (outgoing desc, then account_id asc)
+        tops = self._gather([(shard, "top", n) for shard in range(len(self._conns))])
+        ranked = merge(*tops, key=lambda entry: (-entry[1], entry[0]))
+        return [f"{account_id}({amount})" for account_id, amount in islice(ranked, max(n, 0))]
+
+    def apply_batch(self, ops, reorder: bool = False, return_exceptions: bool = False) -> list:
+        """
+        Applies a sequence of timestamped commands in order and returns
+        their results as a list, like `BankingSystemImpl.apply_batch`
+        (with the same `reorder` and `return_exceptions` options).
+        """
+        ops = list(ops)
+        for op in ops: # a batch with an unknown operation is rejected before any of it is applied
+            if op[0] not in SHARD_OPERATIONS and op[0] not in ("pay", "transfer", "merge_accounts", "top_spenders"):
+                raise ValueError(f"Unknown operation: {op[0]}")
+        if reorder:
+            order = sorted(range(len(ops)), key=lambda i: ops[i][1])
+            results = self.apply_batch([ops[i] for i in order], return_exceptions=return_exceptions)
+            reordered = [None] * len(ops)
+            for i, result in zip(order, results):
+                reordered[i] = result
+            return reordered
+
+        results = [None] * len(ops)
+        batches = {} # shard -> [(position, op)] sent at the next flush
+
+        def flush():
+            if not batches:
+                return
+            sent = list(batches.items())
+            batches.clear()
+            replies = self._gather([(shard, "apply_batch", [op for _, op in batch], False, return_exceptions)
+                                    for shard, batch in sent])
+            for (_, batch), shard_results in zip(sent, replies):
+                for (position, _), result in zip(batch, shard_results):
+                    results[position] = result
+
+        for position, op in enumerate(ops):
+            name = op[0]
+            if name in SHARD_OPERATIONS:
+                batches.setdefault(self._shard(op[2]), []).append((position, op))
+            elif name == "pay":
+                # numbered here; whether it succeeds is only known once its shard has run it
+                batches.setdefault(self._shard(op[2]), []).append((position, (*op[:4], self._payment_count + 1)))
+                flush()
+                if isinstance(results[position], str): # a payment id, not None or a returned exception
+                    self._payment_count += 1
+            elif name in ("transfer", "merge_accounts") and self._shard(op[2]) == self._shard(op[3]):
+                batches.setdefault(self._shard(op[2]), []).append((position, op))
+            else: # cross-shard transfer or merge, top_spenders
+                flush()
+                try:
+                    if name == "top_spenders":
+                        results[position] = self._top_spenders(op[2])
+                    else:
+                        results[position] = getattr(self, "_" + name)(*op[1:])
+                except Exception as error:
+                    if not return_exceptions:
+                        raise
+                    results[position] = error
+        flush()
+        return results
+
+
+    def create_account(self, timestamp: int, account_id: str) -> bool:
+        return self.apply_batch([("create_account", timestamp, account_id)])[0]
+
+    def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
+        return self.apply_batch([("deposit", timestamp, account_id, amount)])[0]
+
+    def transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
+        return self.apply_batch([("transfer", timestamp, source_account_id, target_account_id, amount)])[0]
+
+    def top_spenders(self, timestamp: int, n: int) -> list[str]:
+        return self.apply_batch([("top_spenders", timestamp, n)])[0]
+
+    def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
+        return self.apply_batch([("pay", timestamp, account_id, amount)])[0]
+
+    def get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        return self.apply_batch([("get_payment_status", timestamp, account_id, payment)])[0]
+
+    def list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        return self.apply_batch([("list_payments", timestamp, account_id, status)])[0]
+
+    def merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        return self.apply_batch([("merge_accounts", timestamp, account_id_1, account_id_2)])[0]
+
+    def get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        return self.apply_batch([("get_balance", timestamp, account_id, time_at)])[0]
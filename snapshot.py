@@ -0,0 +1,79 @@
+"""
+Compact binary snapshot files made of named, typed sections.
+
+Layout (little-endian):
+  * `MAGIC` (8 bytes), then the section count as a u64
+  * per section: a 16-byte name (utf-8, NUL padded), a u64 typecode
+    (`"q"` int64 or `"B"` byte), a u64 data length in bytes, then the
+    raw data padded to a multiple of 8 bytes
+
+Every section starts 8-byte aligned and holds raw array data, so a
+reader maps the file and copies each column out in one `frombytes`
+call instead of parsing records one by one.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+
+MAGIC = b"BNKSNAP\x01"
+_SECTION = struct.Struct("<16sQQ") # name, typecode, data length
+
+
+def write_snapshot(path: str, sections: dict) -> None:
+    """
+    Writes `sections` (name -> `array("q")`, `array("B")` or bytes) to
+    `path`. The file is written next to `path` and renamed into place
+    after an fsync, so `path` always holds a complete snapshot.
+    Section names are at most 16 bytes.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as snapshot:
+        snapshot.write(MAGIC + struct.pack("<Q", len(sections)))
+        for name, data in sections.items():
+            if len(name.encode()) > 16:
+                raise ValueError(f"Section name too long: {name}")
+            if isinstance(data, array):
+                typecode = data.typecode
+                if sys.byteorder == "big" and data.itemsize > 1:
+                    data = array(typecode, data)
+                    data.byteswap()
+                data = data.tobytes()
+            else:
+                typecode = "B"
+            snapshot.write(_SECTION.pack(name.encode(), ord(typecode), len(data)))
+            snapshot.write(data)
+            snapshot.write(bytes(-len(data) % 8))
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> dict:
+    """
+    Returns the sections of the snapshot at `path` as name -> `array`.
+    Raises `ValueError` if the file is not a snapshot.
+    """
+    sections = {}
+    with open(path, "rb") as snapshot, mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a banking snapshot: {path}")
+        (count,) = struct.unpack_from("<Q", mapped, len(MAGIC))
+        offset = len(MAGIC) + 8
+
+        view = memoryview(mapped)
+        try:
+            for _ in range(count):
+                name, typecode, length = _SECTION.unpack_from(mapped, offset)
+                offset += _SECTION.size
+                column = array(chr(typecode))
+                column.frombytes(view[offset:offset + length])
+                if sys.byteorder == "big" and column.itemsize > 1:
+                    column.byteswap()
+                sections[name.rstrip(b"\0").decode()] = column
+                offset += length + (-length % 8)
+        finally:
+            view.release()
+    return sections
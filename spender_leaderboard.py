@@ -0,0 +1,103 @@
+from bisect import bisect_left, insort
+from itertools import chain, islice
+
+
+class SpenderLeaderboard:
+    """
+    Total outgoing amount per account, kept ranked by outgoing amount
+    descending and then by `account_id` ascending.
+    Ranking keys `(-outgoing, account_id)` live in a list of sorted
+    sublists of at most `2 * load` keys each, so an update costs a
+    bisect over the sublist maxima plus a bounded in-list shift, and
+    `top(n)` only walks the first `n` keys.
+    Accounts are keyed by `account_id`, or by integer handle if `names`
+    (a sequence mapping handle -> account_id) is given; ties are ranked
+    by `account_id` either way.
+    """
+
+    def __init__(self, load: int = 500, names=None):
+        self._totals = {} # dict(key: account key; value: total outgoing)
+        self._lists = [] # sorted sublists of (-outgoing, account_id)
+        self._maxes = [] # last key of every sublist, used to locate a key
+        self._load = load
+        self._names = names
+
+    def add(self, key, outgoing: int = 0):
+        self._totals[key] = outgoing
+        self._insert((-outgoing, self._name(key)))
+
+    def load(self, totals: dict):
+        """
+        Replaces the contents with `totals` (key -> total outgoing),
+        sorting once instead of inserting keys one by one.
+        """
+        self._totals = dict(totals)
+        ranked = sorted((-outgoing, self._name(key)) for key, outgoing in self._totals.items())
+        self._lists = [ranked[i:i + self._load] for i in range(0, len(ranked), self._load)]
+        self._maxes = [sub[-1] for sub in self._lists]
+
+    def add_outgoing(self, key, amount: int):
+        old = self._totals[key]
+        name = self._name(key)
+        self._discard((-old, name))
+        self._totals[key] = old + amount
+        self._insert((-(old + amount), name))
+
+    def remove(self, key) -> int:
+        outgoing = self._totals.pop(key)
+        self._discard((-outgoing, self._name(key)))
+        return outgoing # total outgoing of the removed account
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        """
+        Returns up to `n` `(account_id, outgoing)` pairs in ranking order.
+        """
+        keys = islice(chain.from_iterable(self._lists), max(n, 0))
+        return [(account_id, -neg_outgoing) for neg_outgoing, account_id in keys]
+
+    def __getitem__(self, key) -> int:
+        return self._totals[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self._totals
+
+    def __len__(self) -> int:
+        return len(self._totals)
+
+    def _name(self, key) -> str:
+        return key if self._names is None else self._names[key]
+
+    def _insert(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            return
+
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes): # larger than every key, append to the last sublist
+            pos -= 1
+            self._lists[pos].append(key)
+            self._maxes[pos] = key
+        else:
+            insort(self._lists[pos], key)
+
+        # split sublists that grew too long so shifts stay bounded
+        sub = self._lists[pos]
+        if len(sub) > 2 * self._load:
+            half = sub[self._load:]
+            del sub[self._load:]
+            self._maxes[pos] = sub[-1]
+            self._lists.insert(pos + 1, half)
+            self._maxes.insert(pos + 1, half[-1])
+
+    def _discard(self, key):
+        pos = bisect_left(self._maxes, key)
+        sub = self._lists[pos]
+        idx = bisect_left(sub, key)
+        del sub[idx]
+
+        if not sub:
+            del self._lists[pos]
+            del self._maxes[pos]
+        elif idx == len(sub): # removed the sublist maximum
+            self._maxes[pos] = sub[-1]
@@ -0,0 +1,422 @@
+"""
+Storage backends for `stored_banking_system.StoredBankingSystem`.
+
+A backend supplies the objects the Level 4 `BankingSystemImpl` keeps
+its state in, so the engine's own operation bodies run on that storage:
+  * `accounts`: account store with the handle interface of
+    `ColumnarAccountStore` (`create`, `remove`, the id <-> handle maps,
+    balance and creation-time columns)
+  * `payments`: payment ledger with the interface of `PaymentLedger`
+  * `histories`: handle -> balance history (`add`, `balance_at`,
+    `close`), or None for the engine's in-memory `BalanceHistory` list
+  * `spenders`: ranked outgoing totals like `SpenderLeaderboard`, or
+    None for the engine's in-memory leaderboard
+Pending refund schedules, merge links, spender windows and the
+monotonic clock stay in memory; they are bounded by the pending payments
+and merges rather than by the number of accounts, and are rebuilt from
+the storage when a book is reopened.
+
+`InMemoryBackend` uses the engine's own structures; `SqliteBackend`
+keeps accounts, payments and balance history in indexed tables of a
+SQLite database on local disk, so the book is bounded by disk rather
+than RAM.
+"""
+import sqlite3
+
+from columnar_account_store import ColumnarAccountStore
+from payment_ledger import CASHBACK_RECEIVED, IN_PROGRESS, PaymentLedger
+
+
+class StorageBackend:
+    """
+    State of a book of accounts, payments and balance histories, as the
+    objects described in the module docstring.
+    """
+
+    accounts = None
+    payments = None
+    histories = None
+    spenders = None
+
+    def end_operation(self):
+        # called after every operation, e.g. to commit a batch of them
+        pass
+
+    def flush(self):
+        # makes every change so far durable
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class InMemoryBackend(StorageBackend):
+    """
+    Backend keeping the book in the engine's own in-memory structures
+    (a `ColumnarAccountStore` and a `PaymentLedger` unless given).
+    """
+
+    def __init__(self, account_store=None, payment_ledger=None):
+        self.accounts = account_store if account_store is not None else ColumnarAccountStore()
+        self.payments = payment_ledger if payment_ledger is not None else PaymentLedger()
+
+
+# schema and statements of SqliteBackend; the statement texts are constants, so each is compiled once and
+# reused from the connection's statement cache
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    handle INTEGER PRIMARY KEY, -- the engine's handle, dense from 0
+    account_id TEXT NOT NULL,
+    created INTEGER NOT NULL,
+    balance INTEGER NOT NULL DEFAULT 0,
+    outgoing INTEGER NOT NULL DEFAULT 0,
+    live INTEGER NOT NULL DEFAULT 1, -- 0 once merged away
+    closed_at INTEGER -- end of its balance history (merge timestamp)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS accounts_live ON accounts (account_id) WHERE live = 1;
+CREATE INDEX IF NOT EXISTS accounts_spenders ON accounts (outgoing DESC, account_id) WHERE live = 1;
+
+CREATE TABLE IF NOT EXISTS payments (
+    ordinal INTEGER PRIMARY KEY,
+    owner INTEGER NOT NULL, -- handle of the paying account
+    status INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    cashback INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payments_by_owner ON payments (owner, ordinal);
+CREATE INDEX IF NOT EXISTS payments_pending ON payments (ordinal) WHERE status = 1;
+
+CREATE TABLE IF NOT EXISTS merges (
+    merged INTEGER PRIMARY KEY, -- handle of a merged-away account
+    parent INTEGER NOT NULL -- handle it was merged into
+);
+CREATE INDEX IF NOT EXISTS merges_by_parent ON merges (parent);
+
+CREATE TABLE IF NOT EXISTS history (
+    handle INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    balance INTEGER NOT NULL, -- balance after every change at or before timestamp
+    PRIMARY KEY (handle, timestamp)
+) WITHOUT ROWID;
+"""
+
+_ACCOUNT_COUNT = "SELECT count(*) FROM accounts"
+_INSERT_ACCOUNT = "INSERT INTO accounts (handle, account_id, created) VALUES (?, ?, ?)"
+_INSERT_CREATED = "INSERT INTO history (handle, timestamp, balance) VALUES (?, ?, 0)"
+_LIVE_HANDLE = "SELECT handle FROM accounts WHERE account_id = ? AND live = 1"
+_LIVE_HANDLES = "SELECT handle FROM accounts WHERE live = 1 ORDER BY handle"
+_LIVE_COUNT = "SELECT count(*) FROM accounts WHERE live = 1"
+_REMOVE_ACCOUNT = "UPDATE accounts SET live = 0 WHERE account_id = ? AND live = 1 RETURNING handle"
+_ADD_OUTGOING = "UPDATE accounts SET outgoing = outgoing + ? WHERE handle = ?"
+_TOP_SPENDERS = "SELECT account_id, outgoing FROM accounts WHERE live = 1 ORDER BY outgoing DESC, account_id LIMIT ?"
+
+_ADD_HISTORY = """
+INSERT INTO history (handle, timestamp, balance)
+VALUES (?1, ?2, coalesce((SELECT balance FROM history WHERE handle = ?1 AND timestamp < ?2
+                          ORDER BY timestamp DESC LIMIT 1), 0) + ?3)
+ON CONFLICT (handle, timestamp) DO UPDATE SET balance = balance + ?3
+"""
+_SHIFT_HISTORY = "UPDATE history SET balance = balance + ? WHERE handle = ? AND timestamp > ?" # a change in the past
+_LIFETIME = "SELECT created, closed_at FROM accounts WHERE handle = ?"
+_BALANCE_AT = "SELECT balance FROM history WHERE handle = ? AND timestamp <= ? ORDER BY timestamp DESC LIMIT 1"
+_CLOSE_HISTORY = "UPDATE accounts SET closed_at = ? WHERE handle = ?"
+_HISTORY_LENGTH = "SELECT count(*) FROM history WHERE handle = ?"
+_LATEST_CHANGE = "SELECT max(timestamp) FROM history"
+
+_NEXT_ORDINAL = "SELECT coalesce(max(ordinal), 0) + 1 FROM payments"
+_INSERT_PAYMENT = "INSERT INTO payments (ordinal, owner, status, timestamp, cashback) VALUES (?, ?, ?, ?, ?)"
+_PAYMENT_STATUS = "SELECT status FROM payments WHERE ordinal = ?"
+_PAYMENT_OWNER = "SELECT owner FROM payments WHERE ordinal = ?"
+_PAYMENT_TIMESTAMP = "SELECT timestamp FROM payments WHERE ordinal = ?"
+_PAYMENT_CASHBACK = "SELECT cashback FROM payments WHERE ordinal = ?"
+_COMPLETE_PAYMENT = f"UPDATE payments SET status = {CASHBACK_RECEIVED} WHERE ordinal = ?"
+_PENDING = f"SELECT ordinal FROM payments WHERE status = {IN_PROGRESS} ORDER BY ordinal"
+_PAYMENT_COUNT = "SELECT count(*) FROM payments"
+_INSERT_MERGE = "INSERT INTO merges (merged, parent) VALUES (?, ?)"
+_MERGES = "SELECT merged, parent FROM merges ORDER BY merged"
+_OWNERS = """
+WITH RECURSIVE owners(handle) AS (
+    SELECT ?1 UNION ALL SELECT merges.merged FROM merges JOIN owners ON merges.parent = owners.handle)
+"""
+_PAYMENTS_OF = _OWNERS + "SELECT ordinal FROM payments WHERE owner IN owners ORDER BY ordinal"
+_PAYMENTS_OF_STATUS = _OWNERS + "SELECT ordinal FROM payments WHERE owner IN owners AND status = ?2 ORDER BY ordinal"
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Backend keeping the book in a SQLite database at `path`: indexed
+    tables of accounts (live ids and a top spenders index), payments (per
+    owner and pending), merge links and balance history (balance after
+    each change, keyed by account and time). Every access the engine
+    makes is one indexed row; balance histories are kept whole.
+    Writes are grouped into transactions of `batch_size` operations (an
+    unflushed batch is lost on a crash, earlier ones are not); reopening
+    a database continues the book it holds.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, cache_size_mb: int = 64):
+        self._conn = sqlite3.connect(path, isolation_level=None) # transactions are managed here
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL") # WAL: committed batches survive a process crash
+        self._conn.execute(f"PRAGMA cache_size = -{cache_size_mb * 1024}")
+        self._conn.executescript(_SCHEMA)
+        self._batch_size = batch_size
+        self._operations = 0 # operations in the open transaction
+        self._count = self._conn.execute(_ACCOUNT_COUNT).fetchone()[0] # accounts ever created, the next handle
+
+        self.accounts = SqliteAccountStore(self)
+        self.payments = SqlitePaymentLedger(self)
+        self.histories = SqliteHistories(self)
+        self.spenders = SqliteSpenderLeaderboard(self)
+
+    def _read(self, sql: str, params: tuple = ()):
+        # first column of the first row, None if there is none
+        row = self._conn.execute(sql, params).fetchone()
+        return row[0] if row is not None else None
+
+    def _write(self, sql: str, params: tuple):
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN")
+        return self._conn.execute(sql, params)
+
+    def latest_timestamp(self) -> int:
+        # latest balance change or account creation in the book, 0 if it is empty
+        return self._read(_LATEST_CHANGE) or 0
+
+    def end_operation(self):
+        self._operations += 1
+        if self._operations >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._conn.in_transaction:
+            self._conn.execute("COMMIT")
+        self._operations = 0
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+class _AccountColumn:
+    # handle -> value of one column of the accounts table, one indexed row per access
+    __slots__ = ("_backend", "_select", "_update")
+
+    def __init__(self, backend: SqliteBackend, column: str):
+        self._backend = backend
+        self._select = f"SELECT {column} FROM accounts WHERE handle = ?"
+        self._update = f"UPDATE accounts SET {column} = ? WHERE handle = ?"
+
+    def __getitem__(self, handle: int):
+        return self._backend._read(self._select, (handle,))
+
+    def __setitem__(self, handle: int, value):
+        self._backend._write(self._update, (value, handle))
+
+    def __len__(self) -> int:
+        return self._backend._count
+
+
+class _LiveHandles:
+    # account_id -> handle of the live account with that id
+    __slots__ = ("_backend",)
+
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+
+    def get(self, account_id: str, default=None):
+        handle = self._backend._read(_LIVE_HANDLE, (account_id,))
+        return default if handle is None else handle
+
+    def values(self) -> list[int]:
+        return [handle for handle, in self._backend._conn.execute(_LIVE_HANDLES)]
+
+    def __contains__(self, account_id: str) -> bool:
+        return self.get(account_id) is not None
+
+    def __len__(self) -> int:
+        return self._backend._read(_LIVE_COUNT)
+
+
+class SqliteAccountStore:
+    """
+    Accounts of a `SqliteBackend` behind the handle interface of
+    `ColumnarAccountStore`: `create`, `remove`, the `_handles` and
+    `_account_ids` maps and the `_balances` and `_timestamps` columns.
+    """
+
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self._handles = _LiveHandles(backend)
+        self._account_ids = _AccountColumn(backend, "account_id")
+        self._balances = _AccountColumn(backend, "balance")
+        self._timestamps = _AccountColumn(backend, "created")
+
+    def create(self, account_id: str, timestamp: int) -> int | None:
+        # new account with balance 0, returns its handle (None if account_id is taken)
+        backend = self._backend
+        if account_id in self._handles:
+            return None
+        handle = backend._count
+        backend._write(_INSERT_ACCOUNT, (handle, account_id, timestamp))
+        backend._write(_INSERT_CREATED, (handle, timestamp))
+        backend._count += 1
+        return handle
+
+    def remove(self, account_id: str) -> int | None:
+        # the account's row stays, closed, for its balance history; returns its handle
+        row = self._backend._write(_REMOVE_ACCOUNT, (account_id,)).fetchone()
+        return row[0] if row is not None else None
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._handles
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+
+class SqliteBalanceHistory:
+    """
+    Balance history of one account of a `SqliteBackend`, with the
+    `add` / `balance_at` / `close` interface of `BalanceHistory`.
+    """
+
+    __slots__ = ("_backend", "_handle")
+
+    def __init__(self, backend: SqliteBackend, handle: int):
+        self._backend = backend
+        self._handle = handle
+
+    def add(self, timestamp: int, delta: int):
+        self._backend._write(_ADD_HISTORY, (self._handle, timestamp, delta))
+        self._backend._write(_SHIFT_HISTORY, (delta, self._handle, timestamp))
+
+    def balance_at(self, time_at: int) -> int | None:
+        created, closed_at = self._backend._conn.execute(_LIFETIME, (self._handle,)).fetchone()
+        if time_at < created or (closed_at is not None and time_at >= closed_at):
+            return None
+        return self._backend._read(_BALANCE_AT, (self._handle, time_at))
+
+    def close(self, timestamp: int):
+        self._backend._write(_CLOSE_HISTORY, (timestamp, self._handle))
+
+    @property
+    def closed_at(self) -> int | None:
+        return self._backend._conn.execute(_LIFETIME, (self._handle,)).fetchone()[1]
+
+    def __len__(self) -> int:
+        return self._backend._read(_HISTORY_LENGTH, (self._handle,))
+
+
+class SqliteHistories:
+    """
+    Handle -> `SqliteBalanceHistory` of every account of a
+    `SqliteBackend`; a history exists from its account's creation.
+    """
+
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+
+    def append(self, history):
+        pass # the creation row is written with the account
+
+    def __getitem__(self, handle: int) -> SqliteBalanceHistory:
+        return SqliteBalanceHistory(self._backend, handle)
+
+    def __len__(self) -> int:
+        return self._backend._count
+
+
+class SqliteSpenderLeaderboard:
+    """
+    Outgoing totals of the accounts of a `SqliteBackend`, ranked by the
+    partial index on live accounts, with the interface of
+    `SpenderLeaderboard` keyed by handle.
+    """
+
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self._outgoing = _AccountColumn(backend, "outgoing")
+
+    def add(self, key: int, outgoing: int = 0):
+        if outgoing:
+            self._outgoing[key] = outgoing
+
+    def add_outgoing(self, key: int, amount: int):
+        self._backend._write(_ADD_OUTGOING, (amount, key))
+
+    def remove(self, key: int) -> int:
+        outgoing = self._outgoing[key]
+        self._outgoing[key] = 0
+        return outgoing # total outgoing of the removed account
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        return self._backend._conn.execute(_TOP_SPENDERS, (max(n, 0),)).fetchall()
+
+    def __getitem__(self, key: int) -> int:
+        return self._outgoing[key]
+
+    def __len__(self) -> int:
+        return self._backend._read(_LIVE_COUNT)
+
+
+class SqlitePaymentLedger:
+    """
+    Payments of a `SqliteBackend` with the interface of `PaymentLedger`.
+    Rows are never compacted (completed payments cost disk, not RAM);
+    a merge is one link row, listed with the surviving account's
+    payments by a recursive query.
+    """
+
+    def __init__(self, backend: SqliteBackend):
+        self._backend = backend
+        self.account_ids = None # set by the engine, unused here
+        self.settled_through = None # lazy settlement watermark, unused here (no compaction)
+
+    def add(self, account: int, timestamp: int, cashback: int, ordinal: int | None = None, status: int = IN_PROGRESS) -> int:
+        if ordinal is None:
+            ordinal = self._backend._read(_NEXT_ORDINAL)
+        self._backend._write(_INSERT_PAYMENT, (ordinal, account, status, timestamp, cashback))
+        return ordinal
+
+    def add_many(self, accounts, timestamp: int, cashback) -> int:
+        first = self._backend._read(_NEXT_ORDINAL)
+        for ordinal, (account, owed) in enumerate(zip(accounts, cashback), first):
+            self._backend._write(_INSERT_PAYMENT, (ordinal, account, IN_PROGRESS, timestamp, owed))
+        return first
+
+    def status(self, ordinal: int) -> int:
+        return self._backend._read(_PAYMENT_STATUS, (ordinal,)) or 0 # 0: no such payment
+
+    def complete(self, ordinal: int):
+        self._backend._write(_COMPLETE_PAYMENT, (ordinal,))
+
+    def pending(self) -> list[int]:
+        # ordinals still waiting for their cashback, ascending
+        return [ordinal for ordinal, in self._backend._conn.execute(_PENDING)]
+
+    def owner(self, ordinal: int) -> int:
+        return self._backend._read(_PAYMENT_OWNER, (ordinal,))
+
+    def timestamp(self, ordinal: int) -> int:
+        return self._backend._read(_PAYMENT_TIMESTAMP, (ordinal,))
+
+    def cashback(self, ordinal: int) -> int:
+        return self._backend._read(_PAYMENT_CASHBACK, (ordinal,))
+
+    def merge(self, account: int, merged_account: int):
+        self._backend._write(_INSERT_MERGE, (merged_account, account))
+
+    def merges(self) -> list[tuple[int, int]]:
+        # (merged, parent) handle pairs, the engine's merge links when a book is reopened
+        return self._backend._conn.execute(_MERGES).fetchall()
+
+    def payments_of(self, account: int, status: int | None = None) -> list[int]:
+        if status is None:
+            rows = self._backend._conn.execute(_PAYMENTS_OF, (account,))
+        else:
+            rows = self._backend._conn.execute(_PAYMENTS_OF_STATUS, (account, status))
+        return [ordinal for ordinal, in rows]
+
+    def __len__(self) -> int:
+        return self._backend._read(_PAYMENT_COUNT)
@@ -0,0 +1,133 @@
+"""
+Level 4 `BankingSystemImpl` running on a pluggable
+`storage_backend.StorageBackend`.
+
+The backend supplies the engine's account store, payment ledger,
+balance histories and spender leaderboard, so the operations, their
+results and the engine's modes and extensions (lazy cashback, monotonic
+timestamps, spender windows, journal, metrics, bulk operations,
+`apply_batch`) are the engine's own. With a `SqliteBackend` the book
+lives on disk:
+
+    bank = StoredBankingSystem(SqliteBackend("bank.db"))
+    bank.create_account(1, "account1")
+    ...
+    bank.close() # commits the last batch of operations
+
+Snapshots need the in-memory backend; a SQLite book is saved by its
+database (`flush`, `close`) and continues when it is reopened. Spender
+windows are not stored and start empty in a reopened book.
+"""
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+from storage_backend import InMemoryBackend
+
+
+class StoredBankingSystem(BankingSystemImpl):
+    """
+    `BankingSystemImpl` on a storage backend (an `InMemoryBackend` by
+    default); other keyword arguments are the engine's. Operations are
+    committed by the backend in batches; `apply_batch` and `close` flush.
+    """
+
+    def __init__(self, backend=None, **kwargs):
+        backend = backend if backend is not None else InMemoryBackend()
+        if backend.histories is not None and kwargs.get("history_retention") is not None:
+            raise ValueError("history_retention applies to in-memory balance histories only")
+        super().__init__(account_store=backend.accounts, payment_ledger=backend.payments, **kwargs)
+        self._backend = backend
+        if backend.histories is not None:
+            self._histories = backend.histories
+        if backend.spenders is not None:
+            self._outgoing = backend.spenders
+        if len(self._account_ids):
+            self._reopen()
+
+    def _reopen(self):
+        # continues a book the backend already holds: merge links, closed histories, refund schedules and clock
+        self._merged_into = dict(self._payments.merges())
+        for handle in sorted(self._merged_into): # handles of one account_id are merged away in creation order
+            self._closed_histories.setdefault(self._account_ids[handle], []).append(self._histories[handle])
+        self._schedule_pending()
+        self._clock = self._backend.latest_timestamp()
+
+    def close(self):
+        self._backend.close()
+
+
+    def create_account(self, timestamp: int, account_id: str) -> bool:
+        result = super().create_account(timestamp, account_id)
+        self._backend.end_operation()
+        return result
+
+    def deposit(self, timestamp: int, account_id: str, amount: int) -> int | None:
+        result = super().deposit(timestamp, account_id, amount)
+        self._backend.end_operation()
+        return result
+
+    def transfer(self, timestamp: int, source_account_id: str, target_account_id: str, amount: int) -> int | None:
+        result = super().transfer(timestamp, source_account_id, target_account_id, amount)
+        self._backend.end_operation()
+        return result
+
+    def top_spenders(self, timestamp: int, n: int) -> list[str]:
+        result = super().top_spenders(timestamp, n)
+        self._backend.end_operation()
+        return result
+
+    def top_spenders_window(self, timestamp: int, n: int, window: int) -> list[str] | None:
+        result = super().top_spenders_window(timestamp, n, window)
+        self._backend.end_operation()
+        return result
+
+    def pay(self, timestamp: int, account_id: str, amount: int) -> str | None:
+        result = super().pay(timestamp, account_id, amount)
+        self._backend.end_operation()
+        return result
+
+    def get_payment_status(self, timestamp: int, account_id: str, payment: str) -> str | None:
+        result = super().get_payment_status(timestamp, account_id, payment)
+        self._backend.end_operation()
+        return result
+
+    def list_payments(self, timestamp: int, account_id: str, status: str | None = None) -> list[str] | None:
+        result = super().list_payments(timestamp, account_id, status)
+        self._backend.end_operation()
+        return result
+
+    def merge_accounts(self, timestamp: int, account_id_1: str, account_id_2: str) -> bool:
+        result = super().merge_accounts(timestamp, account_id_1, account_id_2)
+        self._backend.end_operation()
+        return result
+
+    def get_balance(self, timestamp: int, account_id: str, time_at: int) -> int | None:
+        result = super().get_balance(timestamp, account_id, time_at)
+        self._backend.end_operation()
+        return result
+
+    def bulk_deposit(self, timestamp: int, handles, amounts) -> list:
+        result = super().bulk_deposit(timestamp, handles, amounts)
+        self._backend.end_operation()
+        return result
+
+    def bulk_pay(self, timestamp: int, handles, amounts) -> list:
+        result = super().bulk_pay(timestamp, handles, amounts)
+        self._backend.end_operation()
+        return result
+
+    def apply_batch(self, ops, reorder: bool = False, return_exceptions: bool = False) -> list:
+        # the engine's apply_batch, flushing the backend at the end of the batch
+        results = super().apply_batch(ops, reorder, return_exceptions)
+        self._backend.flush()
+        return results
+
+    def save_snapshot(self, path: str) -> None:
+        self._check_snapshots()
+        super().save_snapshot(path)
+
+    def load_snapshot(self, path: str) -> int:
+        self._check_snapshots()
+        return super().load_snapshot(path)
+
+    def _check_snapshots(self):
+        if not isinstance(self._backend, InMemoryBackend):
+            raise ValueError("Snapshots need the in-memory backend, a stored book is saved by its backend")
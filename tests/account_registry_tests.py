@@ -0,0 +1,80 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import tempfile
+import unittest
+from account_registry import AccountRegistry
+from Level_4.level_4_banking_system_impl import Account, BankingSystemImpl
+
+
+class AccountRegistryTests(unittest.TestCase):
+    """
+    Tests for the hash-indexed account registry shared by every level.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.registry = AccountRegistry()
+
+    def test_add_and_get(self):
+        account = Account(1, 'account1')
+        self.assertTrue(self.registry.add(account))
+        self.assertIs(self.registry.get('account1'), account)
+        self.assertIsNone(self.registry.get('account2'))
+
+    def test_add_duplicate(self):
+        self.assertTrue(self.registry.add(Account(1, 'account1')))
+        self.assertFalse(self.registry.add(Account(2, 'account1')))
+        self.assertEqual(len(self.registry), 1)
+
+    def test_remove(self):
+        account = Account(1, 'account1')
+        self.registry.add(account)
+        self.assertIs(self.registry.remove('account1'), account)
+        self.assertNotIn('account1', self.registry)
+        self.assertIsNone(self.registry.remove('account1'))
+
+    def test_iterates_in_creation_order(self):
+        for i, account_id in enumerate(['account3', 'account1', 'account2']):
+            self.registry.add(Account(i, account_id))
+        self.registry.remove('account1')
+        self.registry.add(Account(4, 'account1'))
+        self.assertEqual([a._account_id for a in self.registry], ['account3', 'account2', 'account1'])
+
+    def test_banking_system_keeps_registry_accounts(self):
+        system = BankingSystemImpl(account_store=self.registry)
+        system.create_account(1, 'account1')
+        system.create_account(2, 'account2')
+        system.deposit(3, 'account2', 700)
+        self.assertEqual(system.pay(4, 'account2', 200), 'payment1')
+        self.assertIsInstance(self.registry.get('account2'), Account)
+        self.assertEqual(self.registry.get('account2')._balance, 500)
+        self.assertTrue(system.merge_accounts(5, 'account1', 'account2'))
+        self.assertEqual([a._account_id for a in self.registry], ['account1'])
+        self.assertEqual(system.deposit(4 + 86400000, 'account1', 100), 604)
+        self.assertEqual(system.get_balance(6 + 86400000, 'account2', 4), 500)
+
+    def test_banking_system_rejects_other_stores(self):
+        with self.assertRaises(TypeError):
+            BankingSystemImpl(account_store={})
+
+    def test_banking_system_restores_registry_snapshot(self):
+        system = BankingSystemImpl(account_store=self.registry)
+        system.create_account(1, 'account1')
+        system.create_account(2, 'account2')
+        system.deposit(3, 'account1', 400)
+        system.merge_accounts(4, 'account1', 'account2')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'state.snap')
+            system.save_snapshot(path)
+            restored = BankingSystemImpl(account_store=AccountRegistry())
+            restored.create_account(1, 'stale') # replaced by the snapshot
+            restored.load_snapshot(path)
+        self.assertEqual([a._account_id for a in restored._accounts], ['account1'])
+        self.assertEqual(restored.deposit(5, 'account1', 100), 500)
+        self.assertTrue(restored.create_account(6, 'account2'))
@@ -0,0 +1,75 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+def random_ops(seed: int, count: int) -> list:
+    rng = random.Random(seed)
+    ops = [("create_account", i, f"account{i}") for i in range(1, 11)]
+    timestamp = 10
+    for _ in range(count):
+        timestamp += rng.choice([0, 0, 1, 3600000, 43200000])
+        a, b = f"account{rng.randint(0, 11)}", f"account{rng.randint(1, 10)}"
+        kind = rng.random()
+        if kind < 0.3:
+            ops.append(("deposit", timestamp, a, rng.randint(-5, 1000)))
+        elif kind < 0.55:
+            ops.append(("transfer", timestamp, a, b, rng.randint(1, 600)))
+        elif kind < 0.8:
+            ops.append(("pay", timestamp, a, rng.randint(1, 600)))
+        elif kind < 0.9:
+            ops.append(("get_payment_status", timestamp, a, f"payment{rng.randint(1, 50)}"))
+        elif kind < 0.93:
+            ops.append(("merge_accounts", timestamp, a, b))
+        elif kind < 0.95:
+            ops.append(("create_account", timestamp, a))
+        elif kind < 0.98:
+            ops.append(("get_balance", timestamp, a, timestamp - rng.randint(0, 86400000)))
+        else:
+            ops.append(("top_spenders", timestamp, rng.randint(1, 5)))
+    return ops
+
+
+class ApplyBatchTests(unittest.TestCase):
+    """
+    Tests that apply_batch gives the same results as individual calls.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl()
+
+    def test_basic_batch(self):
+        results = self.system.apply_batch([
+            ("create_account", 1, "account1"),
+            ("create_account", 2, "account1"),
+            ("deposit", 3, "account1", 1000),
+            ("pay", 4, "account1", 500),
+            ("get_payment_status", 5, "account1", "payment1"),
+            ("deposit", 4 + 86400000, "account1", 10),
+            ("get_payment_status", 4 + 86400000, "account1", "payment1"),
+            ("top_spenders", 4 + 86400000, 1),
+        ])
+        self.assertEqual(results, [True, False, 1000, "payment1", "IN_PROGRESS", 520, "CASHBACK_RECEIVED", ["account1(500)"]])
+
+    def test_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            self.system.apply_batch([("withdraw", 1, "account1", 10)])
+
+    def test_unknown_operation_applies_nothing(self):
+        with self.assertRaises(ValueError):
+            self.system.apply_batch([("create_account", 1, "account1"), ("withdraw", 2, "account1", 10)])
+        self.assertTrue(self.system.create_account(3, "account1"))
+
+    def test_matches_individual_calls(self):
+        ops = random_ops(274, 3000)
+        expected = [getattr(self.system, op[0])(*op[1:]) for op in ops]
+        self.assertEqual(BankingSystemImpl().apply_batch(ops), expected)
@@ -0,0 +1,142 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import asyncio
+import unittest
+from async_banking_system import AsyncBankingSystem
+from concurrent_banking_system import ConcurrentBankingSystem
+from tests.apply_batch_tests import random_ops
+from Level_4.level_4_banking_system_impl import BankingSystemImpl, OutOfOrderTimestampError
+
+
+class RecordingSystem(BankingSystemImpl):
+    # remembers the size of every batch it was given
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+
+    def apply_batch(self, ops, **options) -> list:
+        self.batch_sizes.append(len(ops))
+        return super().apply_batch(ops, **options)
+
+
+class FailingSyncJournal:
+    # journal whose group commit fails after the batch was applied
+    sequence = 0
+
+    def append(self, op):
+        pass
+
+    def sync(self):
+        raise OSError('disk full')
+
+
+class AsyncBankingSystemTests(unittest.TestCase):
+    """
+    Tests for the asyncio front-end and its batching writer.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = RecordingSystem()
+
+    def test_matches_serial_results(self):
+        ops = random_ops(61, 2000)
+
+        async def run():
+            async with AsyncBankingSystem(self.system) as bank:
+                # all calls are queued before the writer runs, in call order
+                return await asyncio.gather(*(getattr(bank, op[0])(*op[1:]) for op in ops))
+
+        results = asyncio.run(run())
+        self.assertEqual(results, BankingSystemImpl().apply_batch(ops))
+        self.assertEqual(sum(self.system.batch_sizes), len(ops))
+        self.assertLess(len(self.system.batch_sizes), 10) # coalesced into a few batches
+
+    def test_sequential_calls_and_linger(self):
+        async def run():
+            async with AsyncBankingSystem(self.system, linger=0.01) as bank:
+                self.assertTrue(await bank.create_account(1, 'account1'))
+                self.assertEqual(await bank.deposit(2, 'account1', 1000), 1000)
+                payment = await bank.pay(3, 'account1', 500)
+                status, spenders = await asyncio.gather(bank.get_payment_status(4, 'account1', payment),
+                                                        bank.top_spenders(5, 1))
+                return payment, status, spenders
+
+        self.assertEqual(asyncio.run(run()), ('payment1', 'IN_PROGRESS', ['account1(500)']))
+        self.assertEqual(self.system.batch_sizes, [1, 1, 1, 2])
+
+    def test_engine_errors_reach_callers(self):
+        def broken(ops, **options):
+            raise RuntimeError('engine failure')
+
+        async def run():
+            async with AsyncBankingSystem(self.system) as bank:
+                self.system.apply_batch = broken
+                with self.assertRaises(RuntimeError):
+                    await bank.create_account(1, 'account1')
+                del self.system.apply_batch # the writer keeps going with the next batch
+                return await bank.create_account(2, 'account1')
+
+        self.assertTrue(asyncio.run(run()))
+
+    def test_failing_command_fails_only_its_caller(self):
+        async def run():
+            async with AsyncBankingSystem(BankingSystemImpl(monotonic=True)) as bank:
+                return await asyncio.gather(bank.create_account(5, 'account1'),
+                                            bank.deposit(3, 'account1', 100), # out of order
+                                            bank.deposit(6, 'account1', 10),
+                                            return_exceptions=True)
+
+        created, rejected, balance = asyncio.run(run())
+        self.assertTrue(created)
+        self.assertIsInstance(rejected, OutOfOrderTimestampError)
+        self.assertEqual(balance, 10)
+
+    def test_concurrent_engine_batches(self):
+        system = ConcurrentBankingSystem(stripes=4)
+
+        async def run():
+            async with AsyncBankingSystem(system) as bank:
+                return await asyncio.gather(bank.create_account(1, 'account1'),
+                                            bank.deposit(2, 'account1', 'x'),
+                                            bank.deposit(3, 'account1', 100),
+                                            bank.pay(4, 'account1', 40),
+                                            return_exceptions=True)
+
+        created, rejected, balance, payment = asyncio.run(run())
+        self.assertEqual((created, balance, payment), (True, 100, 'payment1'))
+        self.assertIsInstance(rejected, TypeError)
+        self.assertEqual(system.get_balance(5, 'account1', 5), 60)
+
+    def test_batch_failing_after_it_ran_is_not_run_again(self):
+        self.system.set_journal(FailingSyncJournal())
+
+        async def run():
+            async with AsyncBankingSystem(self.system) as bank:
+                return await asyncio.gather(bank.create_account(1, 'account1'), bank.deposit(2, 'account1', 100),
+                                            return_exceptions=True)
+
+        results = asyncio.run(run())
+        self.assertEqual([type(result) for result in results], [OSError, OSError])
+        self.assertEqual(self.system.batch_sizes, [2])
+        self.system.set_journal(None)
+        self.assertEqual(self.system.get_balance(3, 'account1', 3), 100) # deposited once
+
+    def test_windowed_top_spenders(self):
+        system = BankingSystemImpl(spender_windows=(1000,))
+
+        async def run():
+            async with AsyncBankingSystem(system) as bank:
+                await asyncio.gather(bank.create_account(1, 'account1'), bank.create_account(2, 'account2'),
+                                     bank.deposit(3, 'account1', 500), bank.pay(4, 'account1', 100),
+                                     bank.transfer(2000, 'account1', 'account2', 50))
+                return await asyncio.gather(bank.top_spenders_window(2001, 2, 1000),
+                                            bank.top_spenders_window(2001, 2, 60000))
+
+        self.assertEqual(asyncio.run(run()), [['account1(50)'], None])
@@ -0,0 +1,83 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import unittest
+from balance_history import CHECKPOINT_INTERVAL, BalanceHistory
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+def naive_balance(changes, time_at):
+    return sum(delta for timestamp, delta in changes if timestamp <= time_at)
+
+
+class BalanceHistoryTests(unittest.TestCase):
+    """
+    Tests for the checkpointed balance log behind get_balance.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.history = BalanceHistory(10)
+
+    def test_before_creation_and_after_close(self):
+        self.history.add(12, 500)
+        self.assertIsNone(self.history.balance_at(9))
+        self.assertEqual(self.history.balance_at(10), 0)
+        self.assertEqual(self.history.balance_at(12), 500)
+        self.history.close(20)
+        self.assertEqual(self.history.balance_at(19), 500)
+        self.assertIsNone(self.history.balance_at(20))
+
+    def test_matches_naive_sum(self):
+        rng = random.Random(274)
+        changes, timestamp = [], 10
+        for _ in range(10 * CHECKPOINT_INTERVAL):
+            timestamp += rng.choice([0, 1, 5])
+            delta = rng.randint(-100, 100)
+            changes.append((timestamp, delta))
+            self.history.add(timestamp, delta)
+        for _ in range(20): # out-of-order changes take the slow path
+            late = (rng.randint(11, timestamp), rng.randint(-100, 100))
+            changes.append(late)
+            self.history.add(*late)
+        for time_at in range(10, timestamp + 2):
+            self.assertEqual(self.history.balance_at(time_at), naive_balance(changes, time_at))
+        self.assertEqual(self.history.balance, naive_balance(changes, timestamp))
+
+    def test_retention_bounds_storage(self):
+        history = BalanceHistory(0, retention=100)
+        for timestamp in range(1, 10 * CHECKPOINT_INTERVAL):
+            history.add(timestamp, 1)
+        self.assertLessEqual(len(history), 100 + CHECKPOINT_INTERVAL + 1)
+        last = 10 * CHECKPOINT_INTERVAL - 1
+        self.assertEqual(history.balance_at(last - 100), last - 100)
+        self.assertIsNone(history.balance_at(1))
+
+    def test_get_balance_reflects_cashback_at_due_time(self):
+        system = BankingSystemImpl()
+        self.assertTrue(system.create_account(1, 'account1'))
+        self.assertEqual(system.deposit(2, 'account1', 1000), 1000)
+        self.assertEqual(system.pay(3, 'account1', 500), 'payment1')
+        self.assertEqual(system.get_balance(4, 'account1', 3), 500)
+        self.assertEqual(system.get_balance(86400010, 'account1', 86400002), 500)
+        self.assertEqual(system.get_balance(86400011, 'account1', 86400003), 510)
+        self.assertIsNone(system.get_balance(86400012, 'account2', 5))
+
+    def test_untouched_account_has_no_history(self):
+        system = BankingSystemImpl()
+        self.assertTrue(system.create_account(5, 'account1'))
+        self.assertTrue(system.create_account(6, 'account2'))
+        self.assertIsNone(system._histories[0])
+        self.assertIsNone(system.get_balance(7, 'account1', 4))
+        self.assertEqual(system.get_balance(7, 'account1', 5), 0)
+        self.assertTrue(system.merge_accounts(8, 'account2', 'account1'))
+        self.assertTrue(system.create_account(9, 'account1'))
+        self.assertEqual(system.get_balance(10, 'account1', 7), 0) # the merged-away account1
+        self.assertIsNone(system.get_balance(10, 'account1', 8))
+        self.assertEqual(system.get_balance(10, 'account1', 9), 0)
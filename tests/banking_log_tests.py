@@ -0,0 +1,47 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import io
+import json
+import unittest
+from banking_log import JsonLinesEventSink
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class BankingLogTests(unittest.TestCase):
+    """
+    Tests for the silent default logging and the structured event sink.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl()
+
+    def test_silent_by_default(self):
+        stdout = io.StringIO()
+        sys.stdout, saved = stdout, sys.stdout
+        try:
+            self.assertTrue(self.system.create_account(1, 'account1'))
+            self.assertEqual(self.system.deposit(2, 'account1', 100), 100)
+            self.assertIsNone(self.system.deposit(3, 'account2', 100))
+        finally:
+            sys.stdout = saved
+        self.assertEqual(stdout.getvalue(), '')
+
+    def test_event_sink(self):
+        stream = io.StringIO()
+        self.system.set_event_sink(JsonLinesEventSink(stream))
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.system.deposit(2, 'account1', 1000), 1000)
+        self.assertEqual(self.system.pay(3, 'account1', 100), 'payment1')
+        self.assertIsNone(self.system.deposit(4, 'account2', 100))
+        self.assertEqual(self.system.deposit(3 + 86400000, 'account1', 1), 903)
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([e['event'] for e in events], ['create_account', 'deposit', 'pay', 'cashback', 'deposit'])
+        self.assertEqual(events[2]['payment_id'], 'payment1')
+        self.assertEqual(events[3]['amount'], 2)
@@ -0,0 +1,93 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import tempfile
+import unittest
+from banking_metrics import BankingMetrics
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class BankingMetricsTests(unittest.TestCase):
+    """
+    Tests for operation metrics and the Prometheus text output.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl()
+        cls.metrics = BankingMetrics()
+        cls.system.set_metrics(cls.metrics)
+
+    def test_counts_operations_and_sweeps(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.system.deposit(2, 'account1', 1000), 1000)
+        self.assertIsNone(self.system.deposit(3, 'account2', 100))
+        self.assertEqual(self.system.pay(4, 'account1', 100), 'payment1')
+        self.assertEqual(self.system.pay(5, 'account1', 100), 'payment2')
+        self.assertEqual(self.system.get_metrics()['cashback_queue_depth'], 2)
+        self.assertEqual(self.system.top_spenders(6, 3), ['account1(200)'])
+        self.assertEqual(self.system.apply_batch([('get_balance', 5 + 86400000, 'account1', 5 + 86400000),
+                                                  ('create_account', 6 + 86400000, 'account1')]), [804, False])
+
+        metrics = self.system.get_metrics()
+        self.assertEqual(metrics['operations']['create_account']['count'], 2) # including the batched one
+        self.assertEqual(metrics['operations']['create_account']['failures'], 1)
+        self.assertEqual(metrics['operations']['deposit']['count'], 2)
+        self.assertEqual(metrics['operations']['deposit']['failures'], 1)
+        self.assertEqual(metrics['operations']['pay']['count'], 2)
+        self.assertEqual(metrics['operations']['get_balance']['count'], 1)
+        self.assertEqual(metrics['operations']['merge_accounts']['count'], 0)
+        self.assertEqual(metrics['cashback_sweep']['count'], 5) # deposit x2, pay x2, batch
+        self.assertEqual(metrics['cashback_sweep']['refunds'], 2)
+        self.assertEqual(metrics['cashback_queue_depth'], 0)
+        self.assertEqual(metrics['top_spenders_requested'], 3)
+
+    def test_queue_depth_in_lazy_mode(self):
+        system = BankingSystemImpl(lazy_cashback=True)
+        system.set_metrics(BankingMetrics())
+        for i in (1, 2):
+            system.create_account(i, f'account{i}')
+            system.deposit(3, f'account{i}', 1000)
+            system.pay(4, f'account{i}', 100)
+        self.assertEqual(system.get_metrics()['cashback_queue_depth'], 2)
+        self.assertEqual(system.get_balance(4 + 86400000, 'account1', 4 + 86400000), 902)
+        self.assertEqual(system.get_metrics()['cashback_queue_depth'], 1)
+
+    def test_off_by_default_and_removable(self):
+        system = BankingSystemImpl()
+        self.assertIsNone(system.get_metrics())
+        self.assertNotIn('_deposit', system.__dict__)
+        self.system.set_metrics(None)
+        self.assertNotIn('_deposit', self.system.__dict__)
+        self.assertNotIn('_process_cash_back', self.system.__dict__)
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.metrics.operations['create_account'].count, 0)
+
+    def test_prometheus_text(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.system.deposit(2, 'account1', 1000), 1000)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.prom')
+            self.metrics.write_prometheus(path)
+            with open(path) as prom:
+                lines = prom.read().splitlines()
+        self.assertIn('# TYPE banking_operation_seconds histogram', lines)
+        self.assertIn('banking_operation_seconds_bucket{operation="deposit",le="+Inf"} 1', lines)
+        self.assertIn('banking_operation_seconds_count{operation="create_account"} 1', lines)
+        self.assertIn('banking_cashback_sweep_refunds_bucket{le="0"} 1', lines)
+        self.assertIn('banking_cashback_queue_depth 0', lines)
+        self.assertIn('# HELP banking_cashback_queue_depth Refunds scheduled and not yet credited.', lines)
+
+    def test_windowed_top_spenders(self):
+        system = BankingSystemImpl(spender_windows=(1000,))
+        system.set_metrics(BankingMetrics())
+        self.assertTrue(system.create_account(1, 'account1'))
+        self.assertEqual(system.top_spenders_window(2, 1, 1000), [])
+        self.assertIsNone(system.top_spenders_window(3, 1, 60000))
+        operations = system.get_metrics()['operations']
+        self.assertEqual((operations['top_spenders_window']['count'], operations['top_spenders_window']['failures']), (2, 1))
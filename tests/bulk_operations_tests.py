@@ -0,0 +1,86 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import unittest
+import bulk_operations
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+def build(system):
+    # accounts with uneven balances, one merged away and one re-created, plus pending refunds
+    for i in range(30):
+        system.create_account(i, f'account{i}')
+        system.deposit(100, f'account{i}', i * 50)
+    system.pay(200, 'account5', 10)
+    system.merge_accounts(300, 'account1', 'account2')
+    system.create_account(400, 'account2')
+    return system
+
+
+class BulkOperationsTests(unittest.TestCase):
+    """
+    Tests that bulk deposits and payments give the same results as row-by-row calls.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.numpy = bulk_operations.np
+
+    def tearDown(self):
+        bulk_operations.np = self.numpy
+
+    def check_against_rows(self, seed: int):
+        rng = random.Random(seed)
+        bulk, serial = build(BankingSystemImpl()), build(BankingSystemImpl())
+        ids = [f'account{i}' for i in range(32)]
+        timestamp = 1000
+        for _ in range(20):
+            timestamp += rng.choice([1, 43200000])
+            rows = [rng.choice(ids) for _ in range(rng.randint(0, 60))]
+            amounts = [rng.randint(-20, 400) for _ in rows]
+            handles = bulk.account_handles(rows)
+            if rows and rng.random() < 0.5:
+                handles[0:1] = [2] # handle of the merged-away account2
+                rows[0:1] = [None]
+            kind = rng.choice(['deposit', 'pay'])
+            if kind == 'deposit':
+                results = bulk.bulk_deposit(timestamp, handles, amounts)
+            else:
+                results = bulk.bulk_pay(timestamp, handles, amounts)
+            expected = [None if account_id is None else getattr(serial, kind)(timestamp, account_id, amount)
+                        for account_id, amount in zip(rows, amounts)]
+            self.assertEqual(results, expected)
+
+        timestamp += 86400000
+        for account_id in ids:
+            self.assertEqual(bulk.list_payments(timestamp, account_id), serial.list_payments(timestamp, account_id))
+            self.assertEqual(bulk.get_balance(timestamp, account_id, timestamp - 86400000),
+                             serial.get_balance(timestamp, account_id, timestamp - 86400000))
+        self.assertEqual(bulk.top_spenders(timestamp, 10), serial.top_spenders(timestamp, 10))
+
+    @unittest.skipIf(bulk_operations.np is None, 'NumPy is not installed')
+    def test_vectorized_matches_rows(self):
+        for seed in range(10):
+            self.check_against_rows(seed)
+
+    def test_fallback_matches_rows(self):
+        bulk_operations.np = None
+        for seed in range(5):
+            self.check_against_rows(seed)
+
+    def test_payment_ids_are_sequential(self):
+        system = BankingSystemImpl()
+        for i in range(3):
+            system.create_account(i, f'account{i}')
+            system.deposit(10, f'account{i}', 100)
+        handles = system.account_handles(['account0', 'account1', 'account0', 'missing', 'account2', 'account0'])
+        self.assertEqual(handles[3], -1)
+        self.assertEqual(system.bulk_pay(20, handles, [60, 10, 50, 5, 100, 40]),
+                         ['payment1', 'payment2', None, None, 'payment3', 'payment4'])
+        self.assertEqual(system.pay(21, 'account1', 1), 'payment5')
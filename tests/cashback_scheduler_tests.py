@@ -0,0 +1,69 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import unittest
+from cashback_scheduler import CASHBACK_DELAY, CashbackQueue, CashbackScheduler
+
+
+class CashbackSchedulerTests(unittest.TestCase):
+    """
+    Tests for the due-time ordered cashback scheduler.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.scheduler = CashbackScheduler()
+
+    def test_nothing_due(self):
+        self.scheduler.schedule(1 + CASHBACK_DELAY, 1, 'payment1')
+        self.assertEqual(self.scheduler.pop_due(CASHBACK_DELAY), [])
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_pops_only_due_refunds(self):
+        self.scheduler.schedule(1 + CASHBACK_DELAY, 1, 'payment1')
+        self.scheduler.schedule(5 + CASHBACK_DELAY, 2, 'payment2')
+        self.assertEqual(self.scheduler.pop_due(1 + CASHBACK_DELAY), ['payment1'])
+        self.assertEqual(self.scheduler.pop_due(4 + CASHBACK_DELAY), [])
+        self.assertEqual(self.scheduler.pop_due(5 + CASHBACK_DELAY), ['payment2'])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_due_refunds_returned_in_payment_order(self):
+        self.scheduler.schedule(7, 1, 'payment1')
+        self.scheduler.schedule(3, 2, 'payment2')
+        self.scheduler.schedule(5, 3, 'payment3')
+        self.assertEqual(self.scheduler.pop_due(10), ['payment1', 'payment2', 'payment3'])
+
+
+class CashbackQueueTests(unittest.TestCase):
+    """
+    Tests for the FIFO cashback queue of monotonic mode.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.queue = CashbackQueue()
+
+    def test_pops_only_due_refunds(self):
+        self.queue.schedule(1 + CASHBACK_DELAY, 1, 'payment1')
+        self.queue.schedule_many([(5 + CASHBACK_DELAY, 2, 'payment2'), (5 + CASHBACK_DELAY, 3, 'payment3')])
+        self.assertEqual(self.queue.next_due(), 1 + CASHBACK_DELAY)
+        self.assertEqual(self.queue.pop_due(4 + CASHBACK_DELAY), ['payment1'])
+        self.assertEqual(self.queue.pop_due(5 + CASHBACK_DELAY), ['payment2', 'payment3'])
+        self.assertEqual(self.queue.next_due(), None)
+
+    def test_merge_keeps_due_order(self):
+        other = CashbackQueue()
+        self.queue.schedule(1, 1, 'payment1')
+        other.schedule(2, 2, 'payment2')
+        self.queue.schedule(3, 3, 'payment3')
+        self.queue.merge(other)
+        self.assertEqual(len(other), 0)
+        self.assertEqual(self.queue.pop_due(3), ['payment1', 'payment2', 'payment3'])
@@ -0,0 +1,62 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import unittest
+from columnar_account_store import ColumnarAccountStore
+from Level_4.level_4_banking_system_impl import Account, BankingSystemImpl
+
+
+class ColumnarAccountStoreTests(unittest.TestCase):
+    """
+    Tests for the array-backed account store and its use by the Level 4 system.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.store = ColumnarAccountStore()
+
+    def test_views_read_and_write_columns(self):
+        self.assertTrue(self.store.add(Account(1, 'account1')))
+        self.assertFalse(self.store.add(Account(2, 'account1')))
+        account = self.store.get('account1')
+        account._balance += 250
+        self.assertEqual(self.store.get('account1')._balance, 250)
+        self.assertEqual(self.store.get('account1')._timestamp, 1)
+        self.assertEqual(account, self.store.get('account1'))
+        self.assertIsNone(self.store.get('account2'))
+
+    def test_remove_keeps_handles_dense(self):
+        self.store.add(Account(1, 'account1'))
+        self.store.add(Account(2, 'account2'))
+        self.assertIsNotNone(self.store.remove('account1'))
+        self.store.add(Account(3, 'account1'))
+        self.assertEqual(self.store.handle('account1'), 2)
+        self.assertEqual([a._account_id for a in self.store], ['account2', 'account1'])
+        self.assertEqual(self.store.get('account1')._balance, 0)
+
+    def test_banking_system_with_columnar_store(self):
+        system = BankingSystemImpl(account_store=self.store)
+        self.assertTrue(system.create_account(1, 'account1'))
+        self.assertTrue(system.create_account(2, 'account2'))
+        self.assertEqual(system.deposit(3, 'account1', 2000), 2000)
+        self.assertIsNone(system.transfer(4, 'account1', 'account1', 100))
+        self.assertEqual(system.transfer(5, 'account1', 'account2', 500), 1500)
+        self.assertEqual(system.pay(6, 'account2', 300), 'payment1')
+        self.assertEqual(system.top_spenders(7, 2), ['account1(500)', 'account2(300)'])
+        self.assertEqual(system.deposit(6 + 86400000, 'account2', 100), 306)
+
+    def test_banking_system_indexes_store_columns(self):
+        system = BankingSystemImpl(account_store=self.store)
+        system.create_account(1, 'account1')
+        system.create_account(2, 'account2')
+        system.deposit(3, 'account2', 700)
+        self.assertIs(system._handles, self.store._handles)
+        self.assertEqual(list(self.store._balances), [0, 700])
+        system.merge_accounts(4, 'account1', 'account2')
+        self.assertEqual(list(self.store._handles), ['account1'])
+        self.assertEqual(self.store.get('account1')._balance, 700)
@@ -0,0 +1,160 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import threading
+import unittest
+from concurrent_banking_system import ConcurrentBankingSystem
+
+
+class ConcurrentBankingSystemTests(unittest.TestCase):
+    """
+    Stress tests for the striped-lock concurrent engine.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = ConcurrentBankingSystem(stripes=8)
+        cls.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6) # switch threads as often as possible
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def run_threads(self, worker, count: int) -> list:
+        totals = [None] * count
+        threads = [threading.Thread(target=worker, args=(i, totals)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return totals
+
+    def test_monotonic_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ConcurrentBankingSystem(monotonic=True)
+
+    def test_batch_options_match_serial_engine(self):
+        ops = [('create_account', 2, 'account1'), ('deposit', 3, 'account1', 'x'), ('deposit', 3, 'account1', 500),
+               ('create_account', 1, 'account2'), ('pay', 4, 'account1', 200), ('top_spenders', 5, 2)]
+        results = self.system.apply_batch(ops, reorder=True, return_exceptions=True)
+        self.assertIsInstance(results[1], TypeError)
+        self.assertEqual(results[:1] + results[2:], [True, 500, True, 'payment1', ['account1(200)', 'account2(0)']])
+
+    def test_money_is_conserved(self):
+        accounts = [f'account{i}' for i in range(20)]
+        for i, account_id in enumerate(accounts):
+            self.assertTrue(self.system.create_account(i, account_id))
+            self.assertEqual(self.system.deposit(100, account_id, 10000), 10000)
+
+        def worker(seed, totals):
+            rng = random.Random(seed)
+            deposited, paid, cashback, transferred, payment_ids = 0, 0, 0, 0, []
+            for step in range(3000):
+                timestamp = 1000 + step
+                a, b = rng.choice(accounts), rng.choice(accounts)
+                amount = rng.randint(1, 300)
+                kind = rng.random()
+                if kind < 0.3:
+                    if self.system.deposit(timestamp, a, amount) is not None:
+                        deposited += amount
+                elif kind < 0.8:
+                    if self.system.transfer(timestamp, a, b, amount) is not None:
+                        transferred += amount
+                elif kind < 0.95:
+                    payment_id = self.system.pay(timestamp, a, amount)
+                    if payment_id is not None:
+                        paid += amount
+                        cashback += amount * 2 // 100
+                        payment_ids.append((payment_id, a))
+                elif kind < 0.99:
+                    self.system.get_balance(timestamp, a, timestamp)
+                else:
+                    self.system.top_spenders(timestamp, 3)
+            totals[seed] = (deposited, paid, cashback, transferred, payment_ids)
+
+        totals = self.run_threads(worker, 8)
+        deposited = 20 * 10000 + sum(t[0] for t in totals)
+        paid = sum(t[1] for t in totals)
+        cashback = sum(t[2] for t in totals)
+        outgoing = sum(t[1] + t[3] for t in totals)
+        payments = [payment for t in totals for payment in t[4]]
+
+        # payment numbers are unique and gapless
+        self.assertEqual(sorted(p for p, _ in payments), sorted(f'payment{i}' for i in range(1, len(payments) + 1)))
+
+        balances = [self.system.deposit(10 ** 9, account_id, 1) - 1 for account_id in accounts] # settles every refund
+        self.assertTrue(all(balance >= 0 for balance in balances))
+        self.assertEqual(sum(balances), deposited - paid + cashback)
+
+        spenders = self.system.top_spenders(10 ** 9, len(accounts))
+        self.assertEqual(sum(int(s[s.index('(') + 1:-1]) for s in spenders), outgoing)
+        for payment_id, account_id in payments:
+            self.assertEqual(self.system.get_payment_status(10 ** 9, account_id, payment_id), 'CASHBACK_RECEIVED')
+
+    def test_concurrent_creates_and_merges(self):
+        def worker(seed, totals):
+            for i in range(200):
+                self.system.create_account(i, f'account{seed}_{i}')
+                self.system.deposit(i, f'account{seed}_{i}', 10)
+            merged = sum(self.system.merge_accounts(1000 + i, f'account{seed}_0', f'account{seed}_{i}') for i in range(1, 200))
+            totals[seed] = merged
+
+        totals = self.run_threads(worker, 6)
+        self.assertEqual(totals, [199] * 6)
+        self.assertEqual(len(self.system._accounts), 6)
+        for seed in range(6):
+            self.assertEqual(self.system.get_balance(2000, f'account{seed}_0', 2000), 2000)
+
+    def test_windowed_spending_is_not_lost(self):
+        self.system = ConcurrentBankingSystem(stripes=8, spender_windows=(10 ** 9,))
+        accounts = [f'account{i}' for i in range(20)]
+        for i, account_id in enumerate(accounts):
+            self.system.create_account(i, account_id)
+            self.system.deposit(100, account_id, 10 ** 6)
+
+        def worker(seed, totals):
+            rng = random.Random(seed)
+            spent = 0
+            for i in range(500):
+                source, target = rng.sample(accounts, 2)
+                if self.system.transfer(1000 + i, source, target, 7) is not None:
+                    spent += 7
+                if self.system.pay(1000 + i, source, 3) is not None:
+                    spent += 3
+            totals[seed] = spent
+
+        spent = sum(self.run_threads(worker, 6))
+        spenders = self.system.top_spenders_window(2000, len(accounts), 10 ** 9)
+        self.assertEqual(sum(int(s[s.index('(') + 1:-1]) for s in spenders), spent)
+        self.assertEqual(self.system.apply_batch([('top_spenders_window', 2000, len(accounts), 10 ** 9)]), [spenders])
+
+    def test_bulk_operations_are_not_lost(self):
+        accounts = [f'account{i}' for i in range(20)]
+        for i, account_id in enumerate(accounts):
+            self.system.create_account(i, account_id)
+            self.system.deposit(100, account_id, 10 ** 6)
+        handles = self.system.account_handles(accounts)
+
+        def worker(seed, totals):
+            rng = random.Random(seed)
+            paid = 0
+            for i in range(200):
+                if seed % 2:
+                    rows = rng.sample(handles, 5)
+                    self.system.bulk_deposit(1000 + i, rows, [10] * 5)
+                    paid -= 50
+                    paid += 3 * sum(result is not None for result in self.system.bulk_pay(1000 + i, rows, [3] * 5))
+                else:
+                    source, target = rng.sample(accounts, 2)
+                    self.system.transfer(1000 + i, source, target, 7)
+            totals[seed] = paid
+
+        net_paid = sum(self.run_threads(worker, 6))
+        balances = [self.system.get_balance(2000, account_id, 2000) for account_id in accounts]
+        self.assertEqual(sum(balances), 20 * 10 ** 6 - net_paid)
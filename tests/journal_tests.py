@@ -0,0 +1,96 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import tempfile
+import time
+import unittest
+from journal import OperationJournal, read_journal, recover
+from tests.apply_batch_tests import random_ops
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class JournalTests(unittest.TestCase):
+    """
+    Tests for the write-ahead journal and crash recovery.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.journal_path = os.path.join(cls.tmp.name, 'bank.journal')
+        cls.snapshot_path = os.path.join(cls.tmp.name, 'bank.snap')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_recover_from_journal(self):
+        ops = random_ops(91, 3000)
+        system = BankingSystemImpl()
+        journal = recover(system, self.journal_path)
+        for op in ops[:2000]:
+            getattr(system, op[0])(*op[1:])
+        journal.sync() # everything before the "crash" is durable
+
+        restored = BankingSystemImpl()
+        restored_journal = recover(restored, self.journal_path)
+        self.assertEqual(restored.apply_batch(ops[2000:]), system.apply_batch(ops[2000:]))
+        journal.close()
+        restored_journal.close()
+
+    def test_recover_from_snapshot_and_journal(self):
+        ops = random_ops(92, 3000)
+        system = BankingSystemImpl()
+        journal = recover(system, self.journal_path, self.snapshot_path)
+        system.apply_batch(ops[:1000])
+        system.save_snapshot(self.snapshot_path)
+        journal.truncate()
+        system.apply_batch(ops[1000:2000])
+        system.save_snapshot(self.snapshot_path) # journal not truncated: recovery skips what the snapshot covers
+        system.apply_batch(ops[2000:2500])
+
+        restored = BankingSystemImpl()
+        restored_journal = recover(restored, self.journal_path, self.snapshot_path)
+        self.assertEqual(restored_journal.sequence, journal.sequence)
+        self.assertEqual(restored.apply_batch(ops[2500:]), system.apply_batch(ops[2500:]))
+        journal.close()
+        restored_journal.close()
+
+    def test_group_commit(self):
+        journal = OperationJournal(self.journal_path, group_size=3, sync_interval=3600)
+        journal.append(('create_account', 1, 'account1'))
+        journal.append(('deposit', 2, 'account1', 10))
+        self.assertEqual(list(read_journal(self.journal_path)), [])
+        journal.append(('deposit', 3, 'account1', 20))
+        self.assertEqual(len(list(read_journal(self.journal_path))), 3)
+        self.assertEqual(list(read_journal(self.journal_path, after=2)), [('deposit', 3, 'account1', 20)])
+        journal.close()
+
+    def test_idle_group_is_synced(self):
+        journal = OperationJournal(self.journal_path, group_size=512, sync_interval=0.01)
+        journal.append(('create_account', 1, 'account1'))
+        time.sleep(0.5) # no further appends
+        self.assertEqual(list(read_journal(self.journal_path)), [('create_account', 1, 'account1')])
+        journal.close()
+
+    def test_batch_journals_each_command_once(self):
+        system = BankingSystemImpl()
+        journal = recover(system, self.journal_path)
+        ops = [('create_account', 1, 'account1'), ('create_account', 2, 'account1'), ('deposit', 3, 'account1', 5)]
+        system.apply_batch(ops)
+        journal.close()
+        self.assertEqual(list(read_journal(self.journal_path)), ops)
+
+    def test_torn_record_is_dropped(self):
+        with open(self.journal_path, 'wb') as f:
+            f.write(b'[1,"create_account",1,"account1"]\n[2,"deposit",2,"acc')
+        system = BankingSystemImpl()
+        journal = recover(system, self.journal_path)
+        self.assertEqual(journal.sequence, 1)
+        self.assertEqual(system.deposit(3, 'account1', 5), 5)
+        journal.close()
+        self.assertEqual(list(read_journal(self.journal_path)), [('create_account', 1, 'account1'), ('deposit', 3, 'account1', 5)])
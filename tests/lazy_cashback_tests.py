@@ -0,0 +1,96 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import tempfile
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+from payment_ledger import PaymentLedger
+from tests.apply_batch_tests import random_ops
+
+
+def with_listings(ops: list, seed: int) -> list:
+    # random_ops plus list_payments calls, which read payment statuses
+    rng = random.Random(seed)
+    result = []
+    for op in ops:
+        result.append(op)
+        if rng.random() < 0.1:
+            result.append(('list_payments', op[1], f'account{rng.randint(1, 10)}',
+                           rng.choice([None, 'IN_PROGRESS', 'CASHBACK_RECEIVED'])))
+    return result
+
+
+class LazyCashbackTests(unittest.TestCase):
+    """
+    Tests that lazy cashback settlement gives the same results as the eager sweep.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl(lazy_cashback=True)
+
+    def test_matches_eager_settlement(self):
+        for seed in range(5):
+            ops = with_listings(random_ops(seed, 3000), seed)
+            expected = BankingSystemImpl().apply_batch(ops)
+            self.assertEqual(BankingSystemImpl(lazy_cashback=True).apply_batch(ops), expected)
+            lazy = BankingSystemImpl(lazy_cashback=True)
+            self.assertEqual([getattr(lazy, op[0])(*op[1:]) for op in ops], expected)
+
+    def test_other_accounts_are_not_settled(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertEqual(self.system.deposit(3, 'account2', 1000), 1000)
+        for i in range(5):
+            self.assertEqual(self.system.pay(4 + i, 'account2', 100), f'payment{i + 1}')
+
+        timestamp = 10 + 86400000
+        self.assertEqual(self.system.deposit(timestamp, 'account1', 10), 10)
+        self.assertEqual(len(self.system._refunds[1]), 5) # account2's refunds still wait for account2
+        self.assertEqual(self.system.get_payment_status(timestamp, 'account2', 'payment3'), 'CASHBACK_RECEIVED')
+        self.assertEqual(len(self.system._refunds[1]), 5)
+        self.assertEqual(self.system.get_balance(timestamp, 'account2', timestamp), 510)
+        self.assertEqual(len(self.system._refunds[1]), 0)
+        self.assertEqual(self.system.get_balance(timestamp, 'account2', 6 + 86400000), 506)
+
+    def test_snapshot_keeps_unsettled_refunds(self):
+        ops = random_ops(7, 2000)
+        expected = BankingSystemImpl().apply_batch(ops)
+        half = len(ops) // 2
+        self.assertEqual(self.system.apply_batch(ops[:half]), expected[:half])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.snap')
+            self.system.save_snapshot(path)
+            restored = BankingSystemImpl(lazy_cashback=True)
+            restored.load_snapshot(path)
+        self.assertEqual(restored.apply_batch(ops[half:]), expected[half:])
+
+    def test_dormant_account_does_not_pin_compaction(self):
+        self.system = BankingSystemImpl(lazy_cashback=True, payment_ledger=PaymentLedger(compact_threshold=100))
+        self.system.create_account(1, 'account1')
+        self.system.create_account(2, 'account2')
+        self.system.deposit(3, 'account1', 1000)
+        self.assertEqual(self.system.pay(4, 'account1', 100), 'payment1') # account1 is never touched again
+        self.system.deposit(5, 'account2', 10 ** 9)
+        timestamp = 5
+        for _ in range(1000):
+            timestamp += 100000
+            self.system.pay(timestamp, 'account2', 10)
+        self.assertGreater(self.system._payments._watermark, 1)
+        self.assertEqual(self.system.get_payment_status(timestamp, 'account1', 'payment1'), 'CASHBACK_RECEIVED')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.snap')
+            self.system.save_snapshot(path)
+            restored = BankingSystemImpl()
+            restored.load_snapshot(path)
+        for system in (self.system, restored):
+            self.assertEqual(system.get_balance(timestamp, 'account1', timestamp), 902)
+            self.assertEqual(system.get_balance(timestamp, 'account1', 3 + 86400000), 900)
+            self.assertEqual(system.get_balance(timestamp, 'account1', 4 + 86400000), 902)
@@ -0,0 +1,59 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import unittest
+from columnar_account_store import ColumnarAccountStore
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class MergeAccountsTests(unittest.TestCase):
+    """
+    Tests for merge_accounts with lazily resolved account aliases.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl()
+
+    def test_recreated_account_does_not_inherit_payments(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertEqual(self.system.deposit(3, 'account2', 1000), 1000)
+        self.assertEqual(self.system.pay(4, 'account2', 500), 'payment1')
+        self.assertTrue(self.system.merge_accounts(5, 'account1', 'account2'))
+        self.assertTrue(self.system.create_account(6, 'account2'))
+        self.assertIsNone(self.system.get_payment_status(7, 'account2', 'payment1'))
+        self.assertEqual(self.system.get_payment_status(8, 'account1', 'payment1'), 'IN_PROGRESS')
+        self.assertEqual(self.system.deposit(4 + 86400000, 'account2', 1), 1)
+        self.assertEqual(self.system.deposit(4 + 86400000, 'account1', 1), 511)
+        self.assertEqual(self.system.get_balance(86400010, 'account2', 4), 500)
+        self.assertIsNone(self.system.get_balance(86400011, 'account2', 5))
+        self.assertEqual(self.system.get_balance(86400012, 'account2', 6), 0)
+
+    def test_chained_merges_resolve_to_survivor(self):
+        for i in range(1, 6):
+            self.assertTrue(self.system.create_account(i, f'account{i}'))
+            self.assertEqual(self.system.deposit(10 + i, f'account{i}', 100), 100)
+            self.assertEqual(self.system.pay(20 + i, f'account{i}', 50), f'payment{i}')
+        for i in range(5, 1, -1):
+            self.assertTrue(self.system.merge_accounts(30 + i, f'account{i - 1}', f'account{i}'))
+        for i in range(1, 6):
+            self.assertEqual(self.system.get_payment_status(40, 'account1', f'payment{i}'), 'IN_PROGRESS')
+        self.assertEqual(self.system.top_spenders(41, 3), ['account1(250)'])
+        self.assertEqual(self.system.deposit(25 + 86400000, 'account1', 1), 256)
+
+    def test_merge_with_columnar_store(self):
+        system = BankingSystemImpl(account_store=ColumnarAccountStore())
+        self.assertTrue(system.create_account(1, 'account1'))
+        self.assertTrue(system.create_account(2, 'account2'))
+        self.assertEqual(system.deposit(3, 'account2', 1000), 1000)
+        self.assertEqual(system.pay(4, 'account2', 100), 'payment1')
+        self.assertTrue(system.merge_accounts(5, 'account1', 'account2'))
+        self.assertFalse(system.merge_accounts(6, 'account1', 'account2'))
+        self.assertEqual(system.get_payment_status(4 + 86400000, 'account1', 'payment1'), 'CASHBACK_RECEIVED')
+        self.assertEqual(system.deposit(4 + 86400000, 'account1', 8), 910)
@@ -0,0 +1,93 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import tempfile
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl, OutOfOrderTimestampError
+from tests.apply_batch_tests import random_ops
+from tests.lazy_cashback_tests import with_listings
+
+
+class MonotonicTests(unittest.TestCase):
+    """
+    Tests for monotonic mode: same results on ordered feeds, rejected out-of-order timestamps.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl(monotonic=True)
+
+    def test_matches_default_mode(self):
+        for seed in range(4):
+            ops = with_listings(random_ops(seed, 3000), seed)
+            expected = BankingSystemImpl().apply_batch(ops)
+            for lazy_cashback in (False, True):
+                self.assertEqual(BankingSystemImpl(monotonic=True, lazy_cashback=lazy_cashback).apply_batch(ops), expected)
+                system = BankingSystemImpl(monotonic=True, lazy_cashback=lazy_cashback)
+                self.assertEqual([getattr(system, op[0])(*op[1:]) for op in ops], expected)
+
+    def test_rejects_earlier_timestamp(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.system.deposit(5, 'account1', 100), 100)
+        with self.assertRaises(OutOfOrderTimestampError):
+            self.system.deposit(4, 'account1', 100)
+        with self.assertRaises(ValueError):
+            self.system.top_spenders(3, 1)
+        self.assertEqual(self.system.get_balance(5, 'account1', 5), 100) # equal timestamps are in order
+
+    def test_batch_rejected_as_a_whole(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        with self.assertRaises(OutOfOrderTimestampError):
+            self.system.apply_batch([('deposit', 2, 'account1', 100), ('deposit', 1, 'account1', 100)])
+        self.assertEqual(self.system.deposit(2, 'account1', 10), 10)
+
+    def test_failing_batch_still_advances_clock(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertEqual(self.system.deposit(2, 'account1', 1000), 1000)
+        with self.assertRaises(TypeError): # applied up to the failing command, clock at the end of the batch
+            self.system.apply_batch([('pay', 1000, 'account1', 100), ('deposit', 1001, 'account1')])
+        with self.assertRaises(OutOfOrderTimestampError):
+            self.system.pay(500, 'account1', 100)
+        self.assertEqual(self.system.get_payment_status(1000 + 86400000, 'account1', 'payment1'), 'CASHBACK_RECEIVED')
+
+    def test_reorder(self):
+        ops = with_listings(random_ops(9, 2000), 9)
+        expected = BankingSystemImpl().apply_batch(ops)
+
+        # runs of equal timestamps in shuffled order: out of order, but each timestamp's commands keep theirs
+        runs = []
+        for index, op in enumerate(ops):
+            if runs and ops[runs[-1][-1]][1] == op[1]:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+        random.Random(9).shuffle(runs)
+        order = [index for run in runs for index in run]
+
+        results = self.system.apply_batch([ops[index] for index in order], reorder=True)
+        self.assertEqual(results, [expected[index] for index in order])
+
+    def test_snapshot_keeps_clock(self):
+        ops = random_ops(3, 1000)
+        self.system.apply_batch(ops)
+        self.assertTrue(self.system.create_account(ops[-1][1], 'account99')) # the snapshot's latest change
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.snap')
+            self.system.save_snapshot(path)
+            restored = BankingSystemImpl(monotonic=True)
+            restored.load_snapshot(path)
+        with self.assertRaises(OutOfOrderTimestampError):
+            restored.deposit(ops[-1][1] - 1, 'account1', 10)
+        more = random_ops(4, 1000)
+        later = [(op[0], op[1] + ops[-1][1], *op[2:]) for op in more]
+        self.assertEqual(restored.apply_batch(later), self.system.apply_batch(later))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import tempfile
+import unittest
+from payment_ledger import CASHBACK_RECEIVED, IN_PROGRESS, CsvPaymentArchive, PaymentLedger, parse_payment_id
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class PaymentLedgerTests(unittest.TestCase):
+    """
+    Tests for the per-account payment index, list_payments and compaction.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = BankingSystemImpl()
+
+    def test_parse_payment_id(self):
+        self.assertEqual(parse_payment_id('payment12'), 12)
+        self.assertIsNone(parse_payment_id('payment012'))
+        self.assertIsNone(parse_payment_id('payment'))
+        self.assertIsNone(parse_payment_id('transfer1'))
+        self.assertIsNone(self.system.get_payment_status(1, 'account1', 'payment-1'))
+
+    def test_list_payments_by_status(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertEqual(self.system.deposit(3, 'account1', 1000), 1000)
+        self.assertEqual(self.system.deposit(4, 'account2', 1000), 1000)
+        self.assertEqual(self.system.pay(5, 'account1', 100), 'payment1')
+        self.assertEqual(self.system.pay(6, 'account2', 100), 'payment2')
+        self.assertEqual(self.system.pay(7, 'account1', 100), 'payment3')
+        self.assertEqual(self.system.list_payments(8, 'account1'), ['payment1', 'payment3'])
+        self.assertEqual(self.system.list_payments(5 + 86400000, 'account1', 'CASHBACK_RECEIVED'), ['payment1'])
+        self.assertEqual(self.system.list_payments(5 + 86400000, 'account1', 'IN_PROGRESS'), ['payment3'])
+        self.assertIsNone(self.system.list_payments(5 + 86400000, 'account1', 'DONE'))
+        self.assertIsNone(self.system.list_payments(5 + 86400000, 'account3'))
+
+    def test_list_payments_after_merge(self):
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertTrue(self.system.create_account(3, 'account3'))
+        for i, account_id in enumerate(['account2', 'account1', 'account3', 'account2'], start=1):
+            self.system.deposit(10 + i, account_id, 100)
+            self.assertEqual(self.system.pay(20 + i, account_id, 50), f'payment{i}')
+        self.assertTrue(self.system.merge_accounts(30, 'account3', 'account2'))
+        self.assertTrue(self.system.merge_accounts(31, 'account1', 'account3'))
+        self.assertEqual(self.system.list_payments(32, 'account1'), ['payment1', 'payment2', 'payment3', 'payment4'])
+        self.assertTrue(self.system.create_account(33, 'account2'))
+        self.assertEqual(self.system.list_payments(34, 'account2'), [])
+
+    def test_compaction_keeps_status(self):
+        ledger = PaymentLedger(compact_threshold=2)
+        ordinals = [ledger.add(i, 10 + i, i) for i in range(1, 6)]
+        ledger.complete(ordinals[1])
+        ledger.complete(ordinals[0]) # compacts payments 1 and 2
+        self.assertEqual(ledger._watermark, 2)
+        self.assertEqual(len(ledger._status), 4)
+        ledger.complete(ordinals[3])
+        ledger.complete(ordinals[4]) # payment 3 is still pending, nothing to compact
+        self.assertEqual(ledger._watermark, 2)
+        self.assertEqual([ledger.status(o) for o in ordinals], [CASHBACK_RECEIVED, CASHBACK_RECEIVED, IN_PROGRESS, CASHBACK_RECEIVED, CASHBACK_RECEIVED])
+        self.assertEqual((ledger.timestamp(3), ledger.cashback(3)), (13, 3))
+        self.assertEqual(ledger.status(6), 0)
+        self.assertEqual(ledger.payments_of(1, CASHBACK_RECEIVED), [1])
+
+    def test_compaction_archive(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'payments.csv')
+            ledger = PaymentLedger(compact_threshold=0, archive=CsvPaymentArchive(path))
+            ledger.account_ids = ['account0', 'account1', 'account2', 'account3']
+            for i in range(1, 4):
+                ledger.add(i, 10 * i, i)
+            ledger.complete(1)
+            ledger.complete(2)
+            ledger.compact()
+            with open(path) as archive:
+                self.assertEqual(archive.read().splitlines(), ['1,account1,10,1', '2,account2,20,2'])
+            self.assertEqual(ledger.status(1), CASHBACK_RECEIVED)
+
+    def test_get_payment_status_after_compaction(self):
+        self.system = BankingSystemImpl(payment_ledger=PaymentLedger(compact_threshold=1))
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertEqual(self.system.deposit(3, 'account1', 1000), 1000)
+        self.assertEqual(self.system.pay(4, 'account1', 100), 'payment1')
+        self.assertEqual(self.system.pay(5, 'account1', 200), 'payment2')
+        self.assertEqual(self.system.get_balance(4 + 86400000, 'account1', 4 + 86400000), 702)
+        self.assertEqual(self.system.get_payment_status(5 + 86400000, 'account1', 'payment1'), 'CASHBACK_RECEIVED')
+        self.assertEqual(self.system.get_payment_status(5 + 86400000, 'account1', 'payment2'), 'CASHBACK_RECEIVED')
+        self.assertIsNone(self.system.get_payment_status(5 + 86400000, 'account2', 'payment1'))
+        self.assertEqual(self.system._payments._watermark, 2)
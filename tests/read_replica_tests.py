@@ -0,0 +1,75 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import tempfile
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+from read_replica import ReadReplica
+from tests.apply_batch_tests import random_ops
+from tests.lazy_cashback_tests import with_listings
+
+
+READS = ("top_spenders", "get_payment_status", "list_payments", "get_balance")
+
+
+class ReadReplicaTests(unittest.TestCase):
+    """
+    Tests that a read replica answers reporting queries like its primary.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'replica.snap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def check_reads(self, primary, replica, ops):
+        # every read is answered on the replica too, after the primary served it
+        for op in ops:
+            result = getattr(primary, op[0])(*op[1:])
+            if op[0] in READS:
+                self.assertEqual(getattr(replica, op[0])(*op[1:]), result, op)
+
+    def test_matches_primary(self):
+        for seed in range(3):
+            primary = BankingSystemImpl()
+            replica = ReadReplica.fork(primary, self.path)
+            self.check_reads(primary, replica, with_listings(random_ops(seed, 2000), seed))
+            replica.stop()
+            self.assertEqual(replica.lag(), 0)
+
+    def test_fork_of_used_primary(self):
+        ops = with_listings(random_ops(11, 3000), 11)
+        half = len(ops) // 2
+        primary = BankingSystemImpl(lazy_cashback=True)
+        primary.apply_batch(ops[:half])
+        replica = ReadReplica.fork(primary, self.path)
+        self.check_reads(primary, replica, ops[half:])
+        replica.stop()
+
+    def test_existing_sink_keeps_its_events(self):
+        events = []
+        primary = BankingSystemImpl()
+        primary.set_event_sink(events.append)
+        replica = ReadReplica.fork(primary, self.path, max_lag=100)
+        self.assertTrue(primary.create_account(1, 'account1'))
+        self.assertEqual(primary.deposit(2, 'account1', 500), 500)
+        self.assertEqual(primary.pay(3, 'account1', 200), 'payment1')
+        self.assertEqual(len(events), 3)
+        replica.sync()
+        self.assertEqual(replica.lag(), 0)
+        self.assertEqual(replica.top_spenders(4, 1), ['account1(200)'])
+        self.assertEqual(replica.get_balance(3 + 86400000, 'account1', 3 + 86400000), 304)
+        self.assertEqual(primary.get_balance(3 + 86400000, 'account1', 3 + 86400000), 304)
+        replica.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import io
+import json
+import unittest
+from replay import iter_operations, replay
+
+
+class ReplayTests(unittest.TestCase):
+    """
+    Tests for streaming operation logs through the banking system.
+    """
+
+    failureException = Exception
+
+    def test_parse_csv(self):
+        lines = ["operation,timestamp,arg1,arg2,arg3\n", "create_account,1,123\n", "\n", "transfer,4,123,account2,500\n"]
+        ops = list(iter_operations(lines, "csv"))
+        self.assertEqual(ops, [("create_account", 1, "123"), ("transfer", 4, "123", "account2", 500)])
+
+    def test_parse_csv_optional_and_window_arguments(self):
+        lines = ["list_payments,5,account1\n", "list_payments,6,account1,IN_PROGRESS\n", "top_spenders_window,7,3,3600000\n"]
+        ops = list(iter_operations(lines, "csv"))
+        self.assertEqual(ops, [("list_payments", 5, "account1", None), ("list_payments", 6, "account1", "IN_PROGRESS"),
+                               ("top_spenders_window", 7, 3, 3600000)])
+
+    def test_parse_csv_unknown_operation(self):
+        with self.assertRaises(ValueError):
+            list(iter_operations(["withdraw,1,account1,5\n"], "csv"))
+
+    def test_replay_jsonl_in_small_batches(self):
+        log = io.StringIO(
+            '["create_account", 1, "account1"]\n'
+            '["deposit", 2, "account1", 1000]\n'
+            '["pay", 3, "account1", 400]\n'
+            '\n'
+            '["get_payment_status", 86400003, "account1", "payment1"]\n'
+            '["top_spenders", 86400004, 1]\n'
+        )
+        output = io.StringIO()
+        self.assertEqual(replay(iter_operations(log), output=output, batch_size=2), 5)
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(results, [True, 1000, "payment1", "CASHBACK_RECEIVED", ["account1(400)"]])
@@ -0,0 +1,66 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+from sharded_banking_system import ShardedBankingSystem
+from tests.apply_batch_tests import random_ops
+
+
+class ShardedBankingSystemTests(unittest.TestCase):
+    """
+    Tests that the sharded engine gives the same results as the serial one.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.system = ShardedBankingSystem(shards=3)
+
+    def tearDown(self):
+        self.system.close()
+
+    def test_random_batches_match_serial_engine(self):
+        for seed in range(5):
+            ops = random_ops(seed, 2000)
+            expected = BankingSystemImpl().apply_batch(ops)
+            self.system.close()
+            self.system = ShardedBankingSystem(shards=3)
+            self.assertEqual(self.system.apply_batch(ops), expected)
+
+    def test_batch_options_match_serial_engine(self):
+        # account1 and account2 are on different shards, so the transfer is two-phase
+        ops = [('create_account', 2, 'account1'), ('create_account', 1, 'account2'), ('deposit', 3, 'account1', 500),
+               ('transfer', 4, 'account1', 'account2', 'x'), ('pay', 5, 'account1', 'x'), ('pay', 5, 'account1', 100),
+               ('transfer', 6, 'account1', 'account2', 100), ('top_spenders', 7, 2)]
+        expected = BankingSystemImpl().apply_batch(ops, reorder=True, return_exceptions=True)
+        results = self.system.apply_batch(ops, reorder=True, return_exceptions=True)
+        self.assertEqual([type(result) for result in results], [type(result) for result in expected])
+        self.assertEqual([r for r in results if not isinstance(r, Exception)], [r for r in expected if not isinstance(r, Exception)])
+
+    def test_unsupported_modes_are_rejected(self):
+        for options in ({'monotonic': True}, {'lazy_cashback': True}, {'spender_windows': (1000,)}):
+            with self.assertRaises(ValueError):
+                ShardedBankingSystem(shards=2, **options)
+
+    def test_cross_shard_merge_moves_payments(self):
+        # account1 and account2 hash to different shards of 3
+        self.assertNotEqual(self.system._shard('account1'), self.system._shard('account2'))
+        self.assertTrue(self.system.create_account(1, 'account1'))
+        self.assertTrue(self.system.create_account(2, 'account2'))
+        self.assertEqual(self.system.deposit(3, 'account2', 1000), 1000)
+        self.assertEqual(self.system.pay(4, 'account2', 500), 'payment1')
+        self.assertEqual(self.system.transfer(5, 'account2', 'account1', 100), 400)
+        self.assertEqual(self.system.pay(6, 'account2', 100), 'payment2')
+        self.assertTrue(self.system.merge_accounts(7, 'account1', 'account2'))
+
+        self.assertEqual(self.system.list_payments(8, 'account1'), ['payment1', 'payment2'])
+        self.assertIsNone(self.system.list_payments(8, 'account2'))
+        self.assertEqual(self.system.top_spenders(9, 2), ['account1(700)'])
+        self.assertEqual(self.system.get_payment_status(4 + 86400000, 'account1', 'payment1'), 'CASHBACK_RECEIVED')
+        self.assertEqual(self.system.get_balance(86400006, 'account1', 86400006), 412)
+        self.assertEqual(self.system.get_balance(86400006, 'account2', 6), 300)
@@ -0,0 +1,72 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import tempfile
+import unittest
+from tests.apply_batch_tests import random_ops
+from columnar_account_store import ColumnarAccountStore
+from payment_ledger import PaymentLedger
+from snapshot import read_snapshot
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+
+
+class SnapshotTests(unittest.TestCase):
+    """
+    Tests for save_snapshot and load_snapshot.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, 'state.snap')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_restore(self, make_system):
+        ops = random_ops(513, 4000)
+        system = make_system()
+        system.apply_batch(ops[:2500])
+        system.save_snapshot(self.path)
+
+        restored = make_system()
+        restored.create_account(1, 'stale') # replaced by the snapshot
+        restored.load_snapshot(self.path)
+        self.assertEqual(restored.apply_batch(ops[2500:]), system.apply_batch(ops[2500:]))
+        self.assertEqual([a._account_id for a in restored._accounts], [a._account_id for a in system._accounts])
+
+    def test_restore_continues_identically(self):
+        self.check_restore(BankingSystemImpl)
+
+    def test_restore_columnar_compacted(self):
+        self.check_restore(lambda: BankingSystemImpl(account_store=ColumnarAccountStore(),
+                                                     payment_ledger=PaymentLedger(compact_threshold=8)))
+
+    def test_pending_refund_and_merged_history(self):
+        system = BankingSystemImpl()
+        system.create_account(1, 'account1')
+        system.create_account(2, 'account2')
+        system.deposit(3, 'account2', 1000)
+        self.assertEqual(system.pay(4, 'account2', 500), 'payment1')
+        self.assertTrue(system.merge_accounts(5, 'account1', 'account2'))
+        system.save_snapshot(self.path)
+
+        restored = BankingSystemImpl()
+        restored.load_snapshot(self.path)
+        self.assertEqual(restored.get_payment_status(6, 'account1', 'payment1'), 'IN_PROGRESS')
+        self.assertEqual(restored.get_balance(7, 'account2', 4), 500)
+        self.assertIsNone(restored.get_balance(7, 'account2', 5))
+        self.assertEqual(restored.deposit(4 + 86400000, 'account1', 1), 511)
+        self.assertEqual(restored.top_spenders(4 + 86400000, 1), ['account1(500)'])
+        self.assertEqual(restored.pay(4 + 86400000, 'account1', 1), 'payment2')
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'hello world')
+        with self.assertRaises(ValueError):
+            read_snapshot(self.path)
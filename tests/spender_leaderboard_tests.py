@@ -0,0 +1,67 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import unittest
+from spender_leaderboard import SpenderLeaderboard
+
+
+class SpenderLeaderboardTests(unittest.TestCase):
+    """
+    Tests for the incrementally maintained top spenders ranking.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.leaderboard = SpenderLeaderboard(load=4)
+
+    def test_ordering_and_ties(self):
+        for account_id in ['account3', 'account1', 'account2']:
+            self.leaderboard.add(account_id)
+        self.leaderboard.add_outgoing('account2', 100)
+        self.leaderboard.add_outgoing('account3', 100)
+        expected = [('account2', 100), ('account3', 100), ('account1', 0)]
+        self.assertEqual(self.leaderboard.top(5), expected)
+        self.assertEqual(self.leaderboard.top(1), expected[:1])
+        self.assertEqual(self.leaderboard.top(0), [])
+
+    def test_remove(self):
+        self.leaderboard.add('account1')
+        self.leaderboard.add('account2', 50)
+        self.assertEqual(self.leaderboard.remove('account2'), 50)
+        self.assertNotIn('account2', self.leaderboard)
+        self.assertEqual(self.leaderboard.top(5), [('account1', 0)])
+
+    def test_matches_full_sort(self):
+        rng = random.Random(274)
+        totals = {}
+        for i in range(200):
+            account_id = f'account{i}'
+            totals[account_id] = 0
+            self.leaderboard.add(account_id)
+        for _ in range(2000):
+            account_id = rng.choice(list(totals))
+            amount = rng.randint(1, 50)
+            totals[account_id] += amount
+            self.leaderboard.add_outgoing(account_id, amount)
+            if rng.random() < 0.01:
+                self.assertEqual(self.leaderboard.remove(account_id), totals.pop(account_id))
+        expected = sorted(totals.items(), key=lambda x: (-x[1], x[0]))
+        self.assertEqual(self.leaderboard.top(len(totals)), expected)
+        self.assertEqual(self.leaderboard.top(3), expected[:3])
+
+    def test_handle_keys_rank_by_name(self):
+        names = ['account3', 'account1', 'account2']
+        leaderboard = SpenderLeaderboard(load=4, names=names)
+        for handle in range(3):
+            leaderboard.add(handle)
+        leaderboard.add_outgoing(0, 100)
+        leaderboard.add_outgoing(2, 100)
+        self.assertEqual(leaderboard.top(5), [('account2', 100), ('account3', 100), ('account1', 0)])
+        self.assertEqual(leaderboard.remove(2), 100)
+        self.assertEqual(leaderboard[0], 100)
@@ -0,0 +1,120 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import tempfile
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl, OutOfOrderTimestampError
+from storage_backend import InMemoryBackend, SqliteBackend
+from stored_banking_system import StoredBankingSystem
+from tests.apply_batch_tests import random_ops
+from tests.lazy_cashback_tests import with_listings
+
+
+def edge_ops(seed: int, count: int) -> list:
+    # random_ops and listings plus commands each business rule must reject
+    rng = random.Random(seed)
+    result = []
+    for op in with_listings(random_ops(seed, count), seed):
+        result.append(op)
+        if rng.random() < 0.1:
+            timestamp, a, b = op[1], f'account{rng.randint(0, 11)}', f'account{rng.randint(0, 11)}'
+            result.append(rng.choice([
+                ('deposit', timestamp, a, rng.choice([0, -1])),
+                ('transfer', timestamp, a, b, rng.choice([0, -1, 10 ** 9])),
+                ('transfer', timestamp, a, a, 1),
+                ('pay', timestamp, a, rng.choice([0, 10 ** 9])),
+                ('get_payment_status', timestamp, a, rng.choice(['payment0', 'payment01', 'pay1', 'payment10000'])),
+                ('list_payments', timestamp, a, 'REFUNDED'),
+                ('merge_accounts', timestamp, a, a),
+                ('get_balance', timestamp, a, -1),
+                ('top_spenders', timestamp, rng.choice([0, 50])),
+            ]))
+    return result
+
+
+class StoredBankingSystemTests(unittest.TestCase):
+    """
+    Tests that the engine on storage backends gives the same results as the Level 4 engine.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'bank.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_in_memory_backend_matches_engine(self):
+        for seed in range(3):
+            ops = with_listings(random_ops(seed, 3000), seed)
+            self.assertEqual(StoredBankingSystem(InMemoryBackend()).apply_batch(ops), BankingSystemImpl().apply_batch(ops))
+
+    def test_sqlite_backend_matches_engine(self):
+        ops = with_listings(random_ops(3, 3000), 3)
+        system = StoredBankingSystem(SqliteBackend(self.path, batch_size=100))
+        self.assertEqual([getattr(system, op[0])(*op[1:]) for op in ops], BankingSystemImpl().apply_batch(ops))
+        system.close()
+
+    def test_engine_modes_match_on_every_backend(self):
+        # the stored system runs the engine's own bodies, so its modes carry over to the backend
+        ops = edge_ops(5, 2000)
+        ops += [('top_spenders_window', op[1], 3, 86400000) for op in ops[::50]]
+        ops.sort(key=lambda op: op[1]) # stable, keeps every timestamp's commands in order
+        for i, options in enumerate(({}, {'lazy_cashback': True}, {'monotonic': True})):
+            expected = BankingSystemImpl(spender_windows=(86400000,), **options).apply_batch(ops)
+            backend = SqliteBackend(os.path.join(self.directory.name, f'modes{i}.db'))
+            system = StoredBankingSystem(backend, spender_windows=(86400000,), **options)
+            self.assertEqual([getattr(system, op[0])(*op[1:]) for op in ops], expected)
+            system.close()
+
+    def test_sqlite_bulk_operations_and_batch_options(self):
+        system = StoredBankingSystem(SqliteBackend(self.path))
+        engine = BankingSystemImpl()
+        for bank in (system, engine):
+            bank.apply_batch([('create_account', 1, 'account1'), ('create_account', 2, 'account2')])
+        for bank in (system, engine):
+            handles = bank.account_handles(['account1', 'account2', 'missing'])
+            self.assertEqual(bank.bulk_deposit(3, handles, [500, 300, 10]), [500, 300, None])
+            self.assertEqual(bank.bulk_pay(4, handles * 2, [200, 100, 1, 400, 100, 1]),
+                             ['payment1', 'payment2', None, None, 'payment3', None])
+        ops = [('get_balance', 5, 'account1', 4), ('deposit', 5, 'account1', 'x'), ('top_spenders', 6, 2)]
+        results = system.apply_batch(ops, return_exceptions=True)
+        self.assertIsInstance(results[1], TypeError)
+        self.assertEqual([results[0], results[2]], [300, ['account1(200)', 'account2(200)']])
+        self.assertEqual(system.apply_batch(ops[::2], reorder=True), engine.apply_batch(ops[::2], reorder=True))
+        self.assertEqual(system.get_balance(4 + 86400000, 'account2', 4 + 86400000), engine.get_balance(4 + 86400000, 'account2', 4 + 86400000))
+        with self.assertRaises(ValueError):
+            system.save_snapshot(os.path.join(self.directory.name, 'state.snap'))
+        system.close()
+
+    def test_sqlite_book_survives_reopening(self):
+        ops = with_listings(random_ops(4, 2000), 4)
+        expected = BankingSystemImpl().apply_batch(ops)
+        half = len(ops) // 2
+        system = StoredBankingSystem(SqliteBackend(self.path))
+        self.assertEqual(system.apply_batch(ops[:half]), expected[:half])
+        system.close()
+        system = StoredBankingSystem(SqliteBackend(self.path))
+        self.assertEqual(system.apply_batch(ops[half:]), expected[half:])
+        system.close()
+
+    def test_sqlite_book_reopens_lazy_and_monotonic(self):
+        ops = edge_ops(6, 2000)
+        options = {'lazy_cashback': True, 'monotonic': True}
+        expected = BankingSystemImpl(**options).apply_batch(ops)
+        half = len(ops) // 2
+        for part in (slice(None, half), slice(half, None)):
+            system = StoredBankingSystem(SqliteBackend(self.path, batch_size=7), **options)
+            self.assertEqual(system.apply_batch(ops[part]), expected[part])
+            system.close()
+        system = StoredBankingSystem(SqliteBackend(self.path), **options)
+        with self.assertRaises(OutOfOrderTimestampError):
+            system.deposit(ops[half][1] - 1, 'account1', 1)
+        system.close()
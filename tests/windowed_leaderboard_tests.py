@@ -0,0 +1,104 @@
+import inspect, os, sys
+current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+parent_dir = os.path.dirname(current_dir)
+sys.path.insert(0, parent_dir)
+
+import random
+import tempfile
+import unittest
+from Level_4.level_4_banking_system_impl import BankingSystemImpl
+from tests.apply_batch_tests import random_ops
+from windowed_leaderboard import WindowedLeaderboard
+
+
+HOUR, DAY = 3600000, 86400000
+
+
+def with_window_queries(ops: list, seed: int) -> list:
+    # random_ops plus top_spenders_window calls over both windows
+    rng = random.Random(seed)
+    result = []
+    for op in ops:
+        result.append(op)
+        if rng.random() < 0.1:
+            result.append(('top_spenders_window', op[1], rng.randint(1, 12), rng.choice([HOUR, DAY])))
+    return result
+
+
+class WindowedLeaderboardTests(unittest.TestCase):
+    """
+    Tests for top spenders over sliding, bucketed time windows.
+    """
+
+    failureException = Exception
+
+
+    @classmethod
+    def setUp(cls):
+        cls.leaderboard = WindowedLeaderboard(100, buckets=10) # buckets of 10 ms
+
+    def test_buckets_expire(self):
+        self.leaderboard.add_outgoing('a', 5, 30)
+        self.leaderboard.add_outgoing('b', 50, 20)
+        self.assertEqual(self.leaderboard.top(99, 2), [('a', 30), ('b', 20)])
+        self.assertEqual(self.leaderboard.top(100, 2), [('b', 20)]) # a's bucket [0, 10) left the window
+        self.leaderboard.add_outgoing('a', 3, 10) # older than the window, ignored
+        self.assertEqual(self.leaderboard['a'], 0)
+        self.leaderboard.merge('b', 'a')
+        self.assertEqual(self.leaderboard.top(149, 2), [('b', 20)])
+        self.assertEqual(self.leaderboard.top(150, 2), [])
+
+    def test_matches_rescan(self):
+        for seed in range(3):
+            events = []
+            system = BankingSystemImpl(spender_windows=(HOUR, DAY))
+            system.set_event_sink(events.append)
+            for op in with_window_queries(random_ops(seed, 3000), seed):
+                result = getattr(system, op[0])(*op[1:])
+                if op[0] == 'top_spenders_window':
+                    self.assertEqual(result, self.rescan(events, op[1], op[2], op[3]), op)
+
+    def rescan(self, events: list, timestamp: int, n: int, window: int) -> list:
+        # ranking rebuilt from every event, counting spending in the window's buckets (60 per window)
+        width = window // 60
+        horizon = timestamp // width - 60
+        totals = {}
+        for event in events:
+            kind = event['event']
+            if kind == 'create_account':
+                totals[event['account_id']] = 0
+            elif kind in ('transfer', 'pay') and event['timestamp'] // width > horizon:
+                spender = event['source_account_id'] if kind == 'transfer' else event['account_id']
+                totals[spender] += event['amount']
+            elif kind == 'merge_accounts':
+                totals[event['account_id_1']] += totals.pop(event['account_id_2'])
+        ranked = sorted(((account_id, amount) for account_id, amount in totals.items() if amount),
+                        key=lambda entry: (-entry[1], entry[0]))[:n]
+        return [f'{account_id}({amount})' for account_id, amount in ranked]
+
+    def test_apply_batch_and_snapshot(self):
+        ops = with_window_queries(random_ops(5, 3000), 5)
+        expected = self.system_with_windows().apply_batch(ops)
+        system = self.system_with_windows()
+        self.assertEqual([getattr(system, op[0])(*op[1:]) for op in ops], expected)
+
+        half = len(ops) // 2
+        system = self.system_with_windows()
+        self.assertEqual(system.apply_batch(ops[:half]), expected[:half])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bank.snap')
+            system.save_snapshot(path)
+            restored = self.system_with_windows()
+            restored.load_snapshot(path)
+        self.assertEqual(restored.apply_batch(ops[half:]), expected[half:])
+
+    def test_unknown_window(self):
+        self.assertIsNone(self.system_with_windows().top_spenders_window(1, 3, 1000))
+
+    @staticmethod
+    def system_with_windows() -> BankingSystemImpl:
+        return BankingSystemImpl(spender_windows=(HOUR, DAY))
+
+
+if __name__ == "__main__":
+    unittest.main()
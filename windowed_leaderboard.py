@@ -0,0 +1,113 @@
+from array import array
+
+from spender_leaderboard import SpenderLeaderboard
+
+
+DEFAULT_BUCKETS = 60 # buckets per window, e.g. one per minute of an hour
+
+
+class WindowedLeaderboard:
+    """
+    Outgoing amount per account over a sliding time window, ranked like
+    `SpenderLeaderboard` (outgoing descending, then `account_id`); only
+    accounts that spent within the window are ranked.
+    Time is cut into buckets of `window / buckets`; each bucket holds a
+    counter per account that spent in it, and when a bucket leaves the
+    window its counters are subtracted from the ranked totals. Updates
+    and queries never rescan past transactions, and an account holds at
+    most `buckets` counters. The oldest bucket leaves whole, so the
+    window covers between `window - window / buckets` and `window`.
+    Windows move forward only: spending older than the window is
+    ignored, and a query at an earlier timestamp than one already seen
+    answers for the latest one.
+    """
+
+    def __init__(self, window: int, buckets: int = DEFAULT_BUCKETS, names=None):
+        if window <= 0 or buckets <= 0:
+            raise ValueError(f"Invalid window {window} or bucket count {buckets}")
+        self.window = window
+        self._width = -(-window // buckets) # ceil, so buckets * width covers the window
+        self._count = buckets
+        self._buckets = {} # dict(key: bucket index (timestamp // width); value: dict(account key: outgoing))
+        self._current = None # latest bucket index seen
+        self._ranking = SpenderLeaderboard(names=names)
+
+    def add_outgoing(self, key, timestamp: int, amount: int):
+        index = timestamp // self._width
+        self.advance(timestamp)
+        if index <= self._current - self._count: # already out of the window
+            return
+        bucket = self._buckets.get(index)
+        if bucket is None:
+            bucket = self._buckets[index] = {}
+        bucket[key] = bucket.get(key, 0) + amount
+        self._credit(key, amount)
+
+    def merge(self, key_1, key_2):
+        # key_1 takes over key_2's spending in every bucket, key_2 leaves the ranking
+        for bucket in self._buckets.values():
+            if key_2 in bucket:
+                bucket[key_1] = bucket.get(key_1, 0) + bucket.pop(key_2)
+        if key_2 in self._ranking:
+            self._credit(key_1, self._ranking.remove(key_2))
+
+    def advance(self, timestamp: int):
+        # moves the window to end at timestamp, expiring the buckets that left it
+        index = timestamp // self._width
+        if self._current is not None and index <= self._current:
+            return
+        self._current = index
+        horizon = index - self._count
+        for expired in [bucket_index for bucket_index in self._buckets if bucket_index <= horizon]:
+            for key, amount in self._buckets.pop(expired).items():
+                self._credit(key, -amount)
+
+    def top(self, timestamp: int, n: int) -> list[tuple[str, int]]:
+        """
+        Returns up to `n` `(account_id, outgoing in the window)` pairs in
+        ranking order for the window ending at `timestamp`.
+        """
+        self.advance(timestamp)
+        return self._ranking.top(n)
+
+    def __getitem__(self, key) -> int:
+        return self._ranking[key] if key in self._ranking else 0
+
+    def _credit(self, key, amount: int):
+        # moves key's windowed total by amount; a total back at 0 leaves the ranking
+        ranking = self._ranking
+        if not amount:
+            return
+        if key not in ranking:
+            ranking.add(key, amount)
+        elif ranking[key] + amount:
+            ranking.add_outgoing(key, amount)
+        else:
+            ranking.remove(key)
+
+    def state(self) -> array:
+        # flat int64 column for snapshots: latest bucket index, then (bucket index, key, outgoing) triples
+        if self._current is None:
+            return array("q")
+        flat = array("q", [self._current])
+        for index, bucket in self._buckets.items():
+            for key, amount in bucket.items():
+                flat.extend((index, key, amount))
+        return flat
+
+    def load(self, state: array):
+        """
+        Replaces the contents with the bucket counters of a `state()`
+        column; totals are recomputed.
+        """
+        self._buckets = {}
+        self._current = state[0] if state else None
+        totals = {}
+        for i in range(1, len(state), 3):
+            index, key, amount = state[i], state[i + 1], state[i + 2]
+            bucket = self._buckets.get(index)
+            if bucket is None:
+                bucket = self._buckets[index] = {}
+            bucket[key] = amount
+            totals[key] = totals.get(key, 0) + amount
+        self._ranking.load({key: total for key, total in totals.items() if total})